@@ -1,15 +1,19 @@
 import os
-from flask import Flask, send_from_directory
+import click
+from flask import Flask
 from extensions import db, migrate, jwt, cors
 from dotenv import load_dotenv
 from config import DevConfig
 from src.models import DPResult
 from src.auth.routes import auth_bp
 from src.rbac.routes import rbac_bp
-from src.audit.logger import init_audit
+from src.audit.logger import init_audit, skip_audit
 from src.audit.routes import audit_bp
 from src.api.routes import api_bp
 from src.dp.routes import dp_bp 
+from src.dp.budget import init_privacy_budget
+from src.utils.metrics import init_metrics
+from src.utils.frontend import FrontendManifest
 
 
 def create_app():
@@ -25,9 +29,6 @@ def create_app():
     migrate.init_app(app, db)
     jwt.init_app(app)
 
-    with app.app_context():
-        db.create_all()
-
     # Blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(rbac_bp)
@@ -39,24 +40,50 @@ def create_app():
     # Auditing after_request hook & file logging
     init_audit(app)
 
+    # Per-user / per-dataset epsilon accounting for the DP endpoints
+    init_privacy_budget(app)
+
+    # Request/stage timings: Server-Timing header, timing log lines and /metrics
+    init_metrics(app, db)
+
+    # Schema setup is a deploy step, not something every worker does on
+    # start: `flask db upgrade` (the release step) applies the migrations and
+    # also bootstraps an empty database. `flask create-db` is the shortcut for
+    # local databases: current tables straight from the models, stamped at
+    # the latest revision so later upgrades apply cleanly.
+    @app.cli.command("create-db")
+    def create_db():
+        from flask_migrate import stamp
+
+        db.create_all()
+        stamp()
+        click.echo("Database tables created")
+
     # Optional API info endpoint
     @app.get("/api/info")
     def index():
         return {"name": "SecurePy", "features": ["auth", "rbac", "audit", "dp"]}
 
-    # Serve React frontend
+    # Serve React frontend from a manifest of dist/ built once at startup
+    frontend = FrontendManifest(os.path.join(os.path.dirname(__file__), "dist"),
+                                memory_max_bytes=app.config.get("STATIC_MEMORY_MAX_BYTES", 1024 * 1024))
+    app.extensions["frontend"] = frontend
+
     @app.route("/", defaults={"path": ""})
     @app.route("/<path:path>")
     def serve_frontend(path):
-        dist_path = os.path.join(os.path.dirname(__file__), "dist")
-        if path != "" and os.path.exists(os.path.join(dist_path, path)):
-            return send_from_directory(dist_path, path)
-        else:
-            return send_from_directory(dist_path, "index.html")
+        # Only real dist/ files skip the audit trail; SPA fallbacks (unknown
+        # paths, scanner probes) are logged like any other request
+        if path in frontend.assets:
+            skip_audit()
+        return frontend.response(path)
 
     return app
 
 app = create_app()
 
 if __name__ == "__main__":
+    # Development server only; production runs gunicorn (gunicorn.conf.py)
+    with app.app_context():
+        db.create_all()
     app.run(debug=True)
@@ -0,0 +1,67 @@
+# Login throughput under concurrency, and latency of a cheap request served
+# alongside the login burst, with bcrypt inline vs in the hashing pool.
+# Run from the repo root:  python -m benchmarks.bench_login [threads [logins [rounds]]]
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tempfile.mkdtemp()}/bench_login.db"
+os.environ.setdefault("AUDIT_ASYNC", "true")
+
+from app import app, db  # noqa: E402
+from src.utils.security import configure_hashing  # noqa: E402
+
+
+def burst(client, threads, logins):
+    done = []
+    probe_latencies = []
+    stop = threading.Event()
+
+    def login_worker():
+        for _ in range(logins // threads):
+            r = client.post("/auth/login", json={"email": "bench@x.io", "password": "pw"})
+            assert r.status_code == 200, r.json
+            done.append(1)
+
+    def probe():
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get("/api/info")
+            probe_latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    workers = [threading.Thread(target=login_worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+    probe_latencies.sort()
+    p99 = probe_latencies[int(len(probe_latencies) * 0.99) - 1] if probe_latencies else 0.0
+    return len(done) / elapsed, p99
+
+
+def main(threads=8, logins=64, rounds=12):
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    configure_hashing(rounds=rounds, workers=0)
+    client.post("/auth/register", json={"email": "bench@x.io", "password": "pw"})
+
+    print(f"{'hashing':<12}{'threads':>8}{'logins/s':>12}{'p99 /api/info ms':>20}")
+    for label, workers in (("inline", 0), ("pool", os.cpu_count() or 1)):
+        configure_hashing(rounds=rounds, workers=workers)
+        rate, p99 = burst(client, threads, logins)
+        print(f"{label:<12}{threads:>8}{rate:>12.1f}{p99 * 1000:>20.1f}")
+    configure_hashing(rounds=rounds, workers=0)
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,40 @@
+# Laplace draws/sec: the per-call secrets/math sampler src/utils/dp.py used
+# before, scalar draws from the pooled sampler, and one array draw.
+# Run from the repo root:  python -m benchmarks.bench_noise [draws]
+import math
+import secrets
+import sys
+import time
+from src.utils import noise
+
+
+def old_laplace(scale):
+    u = secrets.randbits(64) / 2**64 - 0.5
+    return -scale * math.copysign(1.0, u) * math.log(1 - 2 * abs(u))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(n=200_000):
+    cases = [
+        ("secrets per call", lambda: [old_laplace(1.0) for _ in range(n)]),
+        ("pooled scalar", lambda: [noise.laplace(scale=1.0) for _ in range(n)]),
+        ("pooled geometric", lambda: [noise.geometric(scale=1.0) for _ in range(n)]),
+        ("pooled array", lambda: noise.laplace(n, 1.0)),
+        ("gaussian array", lambda: noise.gaussian(n, 1.0)),
+        ("geometric array", lambda: noise.geometric(n, 1.0)),
+    ]
+    base = None
+    print(f"{'sampler':<18}{'draws/s':>16}{'vs secrets':>12}")
+    for label, fn in cases:
+        rate = n / timed(fn)
+        base = base or rate
+        print(f"{label:<18}{rate:>16,.0f}{rate / base:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
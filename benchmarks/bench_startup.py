@@ -0,0 +1,61 @@
+# Cold start of a worker: wall time and peak RSS to import the app, then to
+# warm up the DP stack, each measured in a fresh interpreter, plus the
+# heaviest top-level imports from `python -X importtime`.
+# Run from the repo root:  python -m benchmarks.bench_startup [runs]
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if "--warmup" in sys.argv:
+    import wsgi
+    wsgi.warmup()
+print(imported, time.perf_counter() - start, rss, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def probe(env, warmup):
+    args = [sys.executable, "-c", PROBE] + (["--warmup"] if warmup else [])
+    out = subprocess.check_output(args, env=env, stderr=subprocess.DEVNULL, text=True)
+    imported, warm, rss, warm_rss = out.split()
+    return float(imported), float(warm), int(rss) / 1024, int(warm_rss) / 1024
+
+
+def top_imports(env, n=8):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], env=env,
+                            capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # direct imports of app.py only (two spaces of nesting)
+        if name.startswith("   ") and not name.startswith("    "):
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def main(runs=5):
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URI=f"sqlite:///{tempfile.mkdtemp()}/bench_startup.db")
+    cold = [probe(env, warmup=False) for _ in range(runs)]
+    warm = [probe(env, warmup=True) for _ in range(runs)]
+
+    print(f"import app        {statistics.median(r[0] for r in cold) * 1000:>8.0f} ms"
+          f"   peak RSS {statistics.median(r[2] for r in cold):>6.0f} MiB")
+    print(f"+ DP warmup       {statistics.median(r[1] for r in warm) * 1000:>8.0f} ms"
+          f"   peak RSS {statistics.median(r[3] for r in warm):>6.0f} MiB")
+    print("heaviest imports from app.py:")
+    for cumulative, name in top_imports(env):
+        print(f"  {name:<28}{cumulative / 1000:>8.0f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,28 @@
+# Synthetic datasets for the benchmarks: `columns` columns, a `numeric`
+# fraction of them numeric (with some missing cells), the rest categorical
+# with `cardinality` distinct values drawn with a skewed (Zipf-like)
+# frequency, like real survey/HR data.
+import numpy as np
+import pandas as pd
+
+
+def synthetic_frame(rows, columns=10, numeric=0.5, cardinality=20, seed=0):
+    rng = np.random.default_rng(seed)
+    n_numeric = int(round(columns * numeric))
+    data = {}
+    for i in range(n_numeric):
+        values = rng.normal(1000 * (i + 1), 250 * (i + 1), rows).round(2)
+        values[rng.random(rows) < 0.02] = np.nan
+        data[f"num_{i}"] = values
+
+    weights = 1.0 / np.arange(1, cardinality + 1)
+    weights /= weights.sum()
+    categories = np.array([f"cat_{k}" for k in range(cardinality)], dtype=object)
+    for i in range(columns - n_numeric):
+        data[f"cat_{i}"] = categories[rng.choice(cardinality, size=rows, p=weights)]
+    return pd.DataFrame(data)
+
+
+def write_csv(path, rows, **kwargs):
+    synthetic_frame(rows, **kwargs).to_csv(path, index=False)
+    return path
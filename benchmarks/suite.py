@@ -0,0 +1,240 @@
+# Benchmark suite: times each stage of /dp/analyze on synthetic datasets and
+# the login, /auth/me and audited-request paths through the Flask test client
+# against a throwaway SQLite database. Results are JSON so a run can be kept
+# as a baseline and compared against later.
+#
+#   python -m benchmarks.suite run [--quick] [--out results.json]
+#   python -m benchmarks.suite compare baseline.json results.json [--threshold 0.2]
+#
+# compare exits with status 1 if any case's median got slower by more than
+# the threshold (default 20%).
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="securepy-bench-")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{WORKDIR}/bench.db"
+
+import pandas as pd  # noqa: E402
+from app import app, db  # noqa: E402
+from src.dp.datasets import dataset_cache  # noqa: E402
+from src.dp.formats import TableWriter  # noqa: E402
+from src.dp.pipeline import output_store, plot_store, upload_store, privatize_column_series  # noqa: E402
+from src.dp.releases import release_cache  # noqa: E402
+from src.dp.plots import histogram_summary, render_histogram  # noqa: E402
+from src.utils.security import configure_hashing  # noqa: E402
+from .datagen import synthetic_frame  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+DATASETS = {
+    "full": [
+        dict(rows=10_000, columns=10, numeric=0.5, cardinality=20),
+        dict(rows=100_000, columns=10, numeric=0.5, cardinality=20),
+        dict(rows=100_000, columns=10, numeric=1.0, cardinality=20),
+        dict(rows=100_000, columns=10, numeric=0.0, cardinality=1000),
+        dict(rows=20_000, columns=50, numeric=0.5, cardinality=50),
+    ],
+    "quick": [
+        dict(rows=5_000, columns=6, numeric=0.5, cardinality=20),
+    ],
+}
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        "median_s": statistics.median(times),
+        "p95_s": times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))],
+        "min_s": times[0],
+        "runs": repeat,
+    }
+
+
+def dataset_name(spec):
+    return "rows={rows},cols={columns},numeric={numeric},card={cardinality}".format(**spec)
+
+
+def bench_analyze(client, spec, repeat):
+    df = synthetic_frame(**spec)
+    csv_bytes = df.to_csv(index=False).encode()
+    name = dataset_name(spec)
+    results = {}
+
+    results[f"analyze.parse[{name}]"] = measure(lambda: pd.read_csv(io.BytesIO(csv_bytes)), repeat)
+
+    privatized = {}
+
+    def privatize():
+        for col in df.columns:
+            privatized[col] = privatize_column_series(df[col], "laplace", 1.0, 1e-5, auto=True)
+
+    results[f"analyze.privatize[{name}]"] = measure(privatize, repeat)
+
+    summaries = {}
+
+    def histograms():
+        for col in df.columns:
+            summaries[col] = histogram_summary(df[col], privatized[col])
+
+    results[f"analyze.histogram[{name}]"] = measure(histograms, repeat)
+
+    out = df.copy()
+    for col, series in privatized.items():
+        out[col] = series
+    path = os.path.join(WORKDIR, "out.csv")
+
+    def write():
+        with TableWriter(path, "csv") as writer:
+            writer.write(out)
+
+    results[f"analyze.write[{name}]"] = measure(write, repeat)
+
+    first = df.columns[0]
+    results[f"analyze.plot[{name}]"] = measure(lambda: render_histogram(summaries[first], first), repeat)
+
+    def end_to_end():
+        form = {"file": (io.BytesIO(csv_bytes), "bench.csv"), "scope": "whole_file"}
+        r = client.post("/dp/analyze", data=form, content_type="multipart/form-data")
+        assert r.status_code == 200, r.get_data(as_text=True)[:200]
+
+    results[f"analyze.request[{name}]"] = measure(end_to_end, repeat)
+    return results
+
+
+def bench_auth(client, repeat):
+    client.post("/auth/register", json={"email": "bench@x.io", "password": "pw"})
+    results = {}
+    token = {}
+
+    def login():
+        r = client.post("/auth/login", json={"email": "bench@x.io", "password": "pw"})
+        assert r.status_code == 200
+        token["value"] = r.json["access_token"]
+
+    results["auth.login"] = measure(login, repeat)
+    headers = {"Authorization": f"Bearer {token['value']}"}
+    results["auth.me"] = measure(lambda: client.get("/auth/me", headers=headers), repeat * 20)
+    # cheapest route: what's left is mostly the after_request audit hook
+    results["audit.request"] = measure(lambda: client.get("/health"), repeat * 20)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def isolate_storage():
+    # Every artifact goes to WORKDIR instead of the repo's uploads/, outputs/,
+    # plots/ and cache/. The release and dataset caches are also off, so each
+    # repeated request privatizes and parses again instead of timing a cache hit.
+    for name, store in (("uploads", upload_store), ("outputs", output_store), ("plots", plot_store),
+                        ("releases", release_cache.store)):
+        store.folder = os.path.join(WORKDIR, name)
+        os.makedirs(store.folder)
+    dataset_cache.folder = os.path.join(WORKDIR, "datasets")
+    os.makedirs(dataset_cache.folder)
+    release_cache.max_bytes = 0
+    dataset_cache.max_bytes = 0
+
+
+def run(args):
+    # Disable the privacy budget so repeated runs over the same data never hit it
+    app.extensions["privacy_budget"].limits = {"user": 0, "dataset": 0}
+    isolate_storage()
+    rounds = app.config.get("BCRYPT_ROUNDS", 12)
+    configure_hashing(rounds=rounds, workers=0)
+    with app.app_context():
+        db.create_all()
+
+    client = app.test_client()
+    profile = "quick" if args.quick else "full"
+    repeat = args.repeat or (3 if args.quick else 5)
+    results = {}
+    for spec in DATASETS[profile]:
+        print(f"[bench] {dataset_name(spec)}", file=sys.stderr)
+        results.update(bench_analyze(client, spec, repeat))
+    results.update(bench_auth(client, repeat))
+
+    report = {
+        "meta": {
+            "created_at": datetime.datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "profile": profile,
+            "bcrypt_rounds": rounds,
+        },
+        "results": results,
+    }
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    for name, r in results.items():
+        print(f"{name:<70}{r['median_s'] * 1000:>12.2f} ms")
+    print(f"[bench] wrote {out}", file=sys.stderr)
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    with open(args.current) as f:
+        current = json.load(f)["results"]
+
+    regressions = 0
+    print(f"{'case':<70}{'baseline ms':>13}{'current ms':>13}{'change':>9}")
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            print(f"{name:<70}{'(only in one run)':>35}")
+            continue
+        old, new = baseline[name]["median_s"], current[name]["median_s"]
+        change = new / old - 1 if old else 0.0
+        flag = ""
+        if change > args.threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{name:<70}{old * 1000:>13.2f}{new * 1000:>13.2f}{change:>+9.0%}{flag}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run")
+    run_parser.add_argument("--quick", action="store_true", help="one small dataset, fewer repeats")
+    run_parser.add_argument("--repeat", type=int, default=None)
+    run_parser.add_argument("--out", default=None)
+    compare_parser = sub.add_parser("compare")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+        return 0
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,7 +11,69 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-jwt-secret")
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    # /metrics: off unless enabled; with a token, only for scrapers sending
+    # "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    # Password hashing: cost factor (older hashes are upgraded on login) and the
+    # process pool that runs it (0 workers = hash on the request thread)
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+    # Per-process cache of user profile/role data (/auth/me); with
+    # AUTH_ME_FROM_CLAIMS=true, /auth/me answers from the JWT alone
+    AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+    AUTH_ME_FROM_CLAIMS = os.getenv("AUTH_ME_FROM_CLAIMS", "false").lower() in ("1", "true", "yes")
+    # Seconds before a logout or deactivated user made in another worker
+    # process is seen by this one (same process: immediately)
+    AUTH_REVOCATION_SYNC_INTERVAL = float(os.getenv("AUTH_REVOCATION_SYNC_INTERVAL", "30"))
+    # Role -> permission map reload interval; RBAC_JWT_PERMISSIONS=true embeds
+    # the role's permission bitmask in tokens (checked without the map, but
+    # only refreshed when a new token is issued)
+    RBAC_PERMISSIONS_TTL = float(os.getenv("RBAC_PERMISSIONS_TTL", "60"))
+    RBAC_JWT_PERMISSIONS = os.getenv("RBAC_JWT_PERMISSIONS", "false").lower() in ("1", "true", "yes")
     DP_EPSILON = float(os.getenv("DP_EPSILON", "1.0"))
+    # Privacy budget: epsilon each user / each dataset may spend in total (0 = no limit)
+    PRIVACY_BUDGET_USER_EPSILON = float(os.getenv("PRIVACY_BUDGET_USER_EPSILON", "100.0"))
+    PRIVACY_BUDGET_DATASET_EPSILON = float(os.getenv("PRIVACY_BUDGET_DATASET_EPSILON", "100.0"))
+    PRIVACY_BUDGET_FLUSH_INTERVAL = float(os.getenv("PRIVACY_BUDGET_FLUSH_INTERVAL", "1.0"))
+    PRIVACY_BUDGET_SYNC_INTERVAL = float(os.getenv("PRIVACY_BUDGET_SYNC_INTERVAL", "30.0"))
+    DP_JOB_WORKERS = int(os.getenv("DP_JOB_WORKERS", "2"))
+    # Processes for per-column work in whole_file scope (1 = run in the request thread)
+    DP_COLUMN_WORKERS = int(os.getenv("DP_COLUMN_WORKERS", str(min(4, os.cpu_count() or 1))))
+    DP_STREAM_CHUNKSIZE = int(os.getenv("DP_STREAM_CHUNKSIZE", "100000"))
+    DP_DATASET_CACHE_MAX_BYTES = int(os.getenv("DP_DATASET_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    # Exact per-column statistics kept in memory for /dp/aggregate
+    DP_STATS_CACHE_ENTRIES = int(os.getenv("DP_STATS_CACHE_ENTRIES", "256"))
+    # Artifact storage: seconds since last use before uploads/outputs/plots are
+    # deleted (0 = never), and a size cap over all three with LRU eviction
+    DP_UPLOAD_TTL = int(os.getenv("DP_UPLOAD_TTL", str(7 * 24 * 3600)))
+    DP_OUTPUT_TTL = int(os.getenv("DP_OUTPUT_TTL", str(7 * 24 * 3600)))
+    DP_PLOT_TTL = int(os.getenv("DP_PLOT_TTL", str(7 * 24 * 3600)))
+    DP_ARTIFACT_MAX_BYTES = int(os.getenv("DP_ARTIFACT_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+    DP_ARTIFACT_SWEEP_INTERVAL = float(os.getenv("DP_ARTIFACT_SWEEP_INTERVAL", "600"))
+    # /dp/synthesize: bins per numeric column and the largest sample per request
+    DP_SYNTH_BINS = int(os.getenv("DP_SYNTH_BINS", "20"))
+    DP_SYNTH_MAX_ROWS = int(os.getenv("DP_SYNTH_MAX_ROWS", "1000000"))
+    # Published DP releases reused for identical requests; 0 disables reuse
+    DP_RELEASE_CACHE_MAX_BYTES = int(os.getenv("DP_RELEASE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+    # dist/ files up to this size are held in memory (with gzip/brotli copies)
+    STATIC_MEMORY_MAX_BYTES = int(os.getenv("STATIC_MEMORY_MAX_BYTES", str(1024 * 1024)))
+
+    # Audit trail: batched background writer (AUDIT_ASYNC=false writes inline)
+    AUDIT_ASYNC = os.getenv("AUDIT_ASYNC", "true").lower() in ("1", "true", "yes")
+    AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+    AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+    AUDIT_BODY_MAX_BYTES = int(os.getenv("AUDIT_BODY_MAX_BYTES", str(64 * 1024)))
+    # Endpoints never written to the audit trail (scrapes); static frontend
+    # files are left out by the frontend view itself
+    AUDIT_SKIP_ENDPOINTS = [e for e in os.getenv("AUDIT_SKIP_ENDPOINTS", "metrics").split(",") if e]
+    # `flask audit prune`: raw logs older than this are archived (if a dir is set) and deleted
+    AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "90"))
+    AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "")
+    AUDIT_ROLLUP_HOURLY_RETENTION_DAYS = int(os.getenv("AUDIT_ROLLUP_HOURLY_RETENTION_DAYS", "30"))
 
 class DevConfig(Config):
     DEBUG = True
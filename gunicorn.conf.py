@@ -0,0 +1,36 @@
+# gunicorn settings, all overridable from the environment:
+#   gunicorn -c gunicorn.conf.py wsgi:application
+import os
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(4, (os.cpu_count() or 1) * 2))))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))  # synchronous /dp/analyze on large files
+# Import the app once in the master and fork workers from it, so code and
+# the warmed-up DP stack are shared copy-on-write instead of loaded per worker
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+warmup = os.getenv("DP_WARMUP", "true").lower() in ("1", "true", "yes")
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+
+
+def when_ready(server):
+    if preload_app and warmup:
+        import wsgi
+        wsgi.warmup()
+        server.log.info("DP stack preloaded in master")
+
+
+def post_fork(server, worker):
+    # Never share pooled DB connections opened in the master with a worker
+    if preload_app:
+        from wsgi import application
+        from extensions import db
+        with application.app_context():
+            db.engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # Without preload each worker warms itself before taking requests
+    if warmup and not preload_app:
+        import wsgi
+        wsgi.warmup()
@@ -0,0 +1,93 @@
+"""baseline schema
+
+Revision ID: 0c1e5a7b3d90
+Revises: 
+Create Date: 2026-10-18 18:40:12.310457
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c1e5a7b3d90'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The tables as db.create_all() made them before migrations existed, so
+    # `flask db upgrade` can bootstrap an empty database. Databases created
+    # that way already have them and are left alone.
+    op.create_table(
+        'dp_results',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('file_id', sa.String(length=128), nullable=False),
+        sa.Column('columns', sa.Text(), nullable=True),
+        sa.Column('mechanism', sa.String(length=64), nullable=True),
+        sa.Column('epsilon', sa.Float(), nullable=True),
+        sa.Column('delta', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'roles',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('description', sa.String(length=256), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'permissions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('code', sa.String(length=64), nullable=False),
+        sa.Column('description', sa.String(length=256), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('code'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'role_permissions',
+        sa.Column('role_id', sa.Integer(), nullable=False),
+        sa.Column('permission_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['permission_id'], ['permissions.id']),
+        sa.ForeignKeyConstraint(['role_id'], ['roles.id']),
+        sa.PrimaryKeyConstraint('role_id', 'permission_id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('role_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['role_id'], ['roles.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'audit_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('event', sa.String(length=128), nullable=False),
+        sa.Column('route', sa.String(length=255), nullable=True),
+        sa.Column('method', sa.String(length=10), nullable=True),
+        sa.Column('ip', sa.String(length=64), nullable=True),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    for table in ('audit_logs', 'users', 'role_permissions', 'permissions', 'roles', 'dp_results'):
+        op.drop_table(table, if_exists=True)
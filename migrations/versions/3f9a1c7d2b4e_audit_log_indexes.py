@@ -0,0 +1,36 @@
+"""audit log indexes
+
+Revision ID: 3f9a1c7d2b4e
+Revises: 0c1e5a7b3d90
+Create Date: 2026-10-18 17:59:56.508214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c7d2b4e'
+down_revision = '0c1e5a7b3d90'
+branch_labels = None
+depends_on = None
+
+# (created_at, id) backs the keyset-paginated /audit/logs listing; the other
+# indexes serve its user/route/status filters, each ordered by time.
+INDEXES = [
+    ('ix_audit_logs_created_at_id', ['created_at', 'id']),
+    ('ix_audit_logs_user_id_created_at', ['user_id', 'created_at']),
+    ('ix_audit_logs_route_created_at', ['route', 'created_at']),
+    ('ix_audit_logs_status_code_created_at', ['status_code', 'created_at']),
+]
+
+
+def upgrade():
+    # db.create_all() from the model may have created these indexes already
+    for name, columns in INDEXES:
+        op.create_index(name, 'audit_logs', columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='audit_logs', if_exists=True)
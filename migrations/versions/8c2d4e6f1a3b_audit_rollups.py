@@ -0,0 +1,38 @@
+"""audit rollups
+
+Revision ID: 8c2d4e6f1a3b
+Revises: 3f9a1c7d2b4e
+Create Date: 2026-10-18 18:02:33.331870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2d4e6f1a3b'
+down_revision = '3f9a1c7d2b4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'audit_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(length=8), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('route', sa.String(length=255), nullable=False),
+        sa.Column('method', sa.String(length=10), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('granularity', 'bucket_start', 'route', 'method', 'status_code', 'user_id',
+                            name='uq_audit_rollups_key'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('audit_rollups', if_exists=True)
@@ -0,0 +1,55 @@
+"""privacy budget ledger
+
+Revision ID: b7e1f04c9d2a
+Revises: 8c2d4e6f1a3b
+Create Date: 2026-10-18 18:08:46.127934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e1f04c9d2a'
+down_revision = '8c2d4e6f1a3b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'privacy_budgets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scope', sa.String(length=16), nullable=False),
+        sa.Column('key', sa.String(length=128), nullable=False),
+        sa.Column('epsilon_limit', sa.Float(), nullable=True),
+        sa.Column('epsilon_spent', sa.Float(), nullable=False),
+        sa.Column('delta_spent', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('scope', 'key', name='uq_privacy_budgets_scope_key'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'privacy_ledger',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('dataset_id', sa.String(length=128), nullable=True),
+        sa.Column('operation', sa.String(length=64), nullable=False),
+        sa.Column('reference', sa.String(length=128), nullable=True),
+        sa.Column('epsilon', sa.Float(), nullable=False),
+        sa.Column('delta', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_privacy_ledger_user_id', 'privacy_ledger', ['user_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_privacy_ledger_dataset_id', 'privacy_ledger', ['dataset_id'], unique=False,
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_privacy_ledger_dataset_id', table_name='privacy_ledger', if_exists=True)
+    op.drop_index('ix_privacy_ledger_user_id', table_name='privacy_ledger', if_exists=True)
+    op.drop_table('privacy_ledger', if_exists=True)
+    op.drop_table('privacy_budgets', if_exists=True)
@@ -0,0 +1,51 @@
+"""dp_results job state and content hash
+
+Revision ID: c8f2b6d41e93
+Revises: a5d3f9c2e817
+Create Date: 2026-10-18 18:40:31.218840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f2b6d41e93'
+down_revision = 'a5d3f9c2e817'
+branch_labels = None
+depends_on = None
+
+# Async job state for /dp/analyze (rows written before jobs existed were
+# all synchronous, finished analyses) and the content hash of the upload.
+COLUMNS = [
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('status', sa.String(length=16), nullable=True, server_default='finished'),
+    sa.Column('progress_done', sa.Integer(), nullable=True, server_default='0'),
+    sa.Column('progress_total', sa.Integer(), nullable=True, server_default='0'),
+    sa.Column('result', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+]
+INDEXES = [
+    ('ix_dp_results_file_id', ['file_id']),
+    ('ix_dp_results_content_hash', ['content_hash']),
+]
+
+
+def upgrade():
+    # db.create_all() from the current model may have created some of these already
+    existing = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('dp_results')}
+    with op.batch_alter_table('dp_results') as batch_op:
+        for column in COLUMNS:
+            if column.name not in existing:
+                batch_op.add_column(column)
+    for name, columns in INDEXES:
+        op.create_index(name, 'dp_results', columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='dp_results', if_exists=True)
+    with op.batch_alter_table('dp_results') as batch_op:
+        for column in reversed(COLUMNS):
+            batch_op.drop_column(column.name)
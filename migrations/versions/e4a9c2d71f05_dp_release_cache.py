@@ -0,0 +1,49 @@
+"""dp release cache
+
+Revision ID: e4a9c2d71f05
+Revises: b7e1f04c9d2a
+Create Date: 2026-10-18 18:28:33.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9c2d71f05'
+down_revision = 'b7e1f04c9d2a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'dp_releases',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=True),
+        sa.Column('column', sa.String(length=255), nullable=False),
+        sa.Column('mechanism', sa.String(length=64), nullable=True),
+        sa.Column('epsilon', sa.Float(), nullable=True),
+        sa.Column('delta', sa.Float(), nullable=True),
+        sa.Column('file_id', sa.String(length=128), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('summary', sa.Text(), nullable=True),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=True),
+        sa.Column('hits', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('key'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_dp_releases_content_hash', 'dp_releases', ['content_hash'], unique=False,
+                    if_not_exists=True)
+    op.create_index('ix_dp_releases_last_used_at', 'dp_releases', ['last_used_at'], unique=False,
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_dp_releases_last_used_at', table_name='dp_releases', if_exists=True)
+    op.drop_index('ix_dp_releases_content_hash', table_name='dp_releases', if_exists=True)
+    op.drop_table('dp_releases', if_exists=True)
@@ -38,6 +38,7 @@ def link_admin_perms(admin, perms):
 
 if __name__ == "__main__":
     with app.app_context():
+        db.create_all()
         admin_role, user_role = ensure_roles()
         perms = ensure_permissions()
         link_admin_perms(admin_role, perms)
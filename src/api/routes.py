@@ -1,25 +1,45 @@
 from flask import Blueprint, jsonify, request, current_app
-from flask_jwt_extended import jwt_required
-from ..utils.dp import dp_count, dp_sum
+from flask_jwt_extended import get_jwt_identity
+from ..auth.tokens import token_required
+from ..dp.budget import BudgetExceeded, get_accountant
 
 api_bp = Blueprint("api", __name__)
 
 SAMPLE_DATA = [5, 7, 3, 9, 2, 10, 4]  
+SAMPLE_DATASET_ID = "sample"
 
 @api_bp.get("/health")
 def health():
     return jsonify(status="ok")
 
 @api_bp.get("/privacy/count")
-@jwt_required()
+@token_required()
 def privacy_count():
+    from ..utils.dp import dp_count
+
     eps = current_app.config.get("DP_EPSILON", 1.0)
+    try:
+        get_accountant().charge(get_jwt_identity(), SAMPLE_DATASET_ID, eps, operation="privacy.count")
+    except BudgetExceeded as e:
+        return jsonify({"error": str(e)}), 403
     noisy = dp_count(SAMPLE_DATA, eps)
     return jsonify({"epsilon": eps, "noisy_count": noisy})
 
 @api_bp.get("/privacy/sum")
-@jwt_required()
+@token_required()
 def privacy_sum():
+    from ..utils.dp import dp_sum
+
     eps = current_app.config.get("DP_EPSILON", 1.0)
+    try:
+        get_accountant().charge(get_jwt_identity(), SAMPLE_DATASET_ID, eps, operation="privacy.sum")
+    except BudgetExceeded as e:
+        return jsonify({"error": str(e)}), 403
     noisy = dp_sum(SAMPLE_DATA, eps, sensitivity=10.0)
-    return jsonify({"epsilon": eps, "noisy_sum": noisy})
\ No newline at end of file
+    return jsonify({"epsilon": eps, "noisy_sum": noisy})
+
+@api_bp.get("/privacy/budget")
+@token_required()
+def privacy_budget():
+    # Remaining epsilon for the caller, and for ?dataset_id= if given
+    return jsonify(get_accountant().remaining(get_jwt_identity(), request.args.get("dataset_id")))
\ No newline at end of file
@@ -1,8 +1,152 @@
+import atexit
 import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
 from logging.handlers import RotatingFileHandler
-from flask import request
+from flask import g, request
+from sqlalchemy import insert
 from ..models import db, AuditLog
-from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from .rollups import apply_rollups
+from .retention import register_cli
+from ..auth.tokens import current_claims
+
+MESSAGE_MAX_CHARS = 500
+
+
+class AuditWriter:
+    # Background audit pipeline: the after_request hook only enqueues a small
+    # dict, and one writer thread per process bulk-inserts batches when
+    # batch_size records are waiting or flush_interval seconds have passed.
+    # A full queue drops the record (counted) instead of blocking the request.
+
+    def __init__(self, app, queue_size=10000, batch_size=200, flush_interval=1.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._flush_requested = threading.Event()
+        self._processed = threading.Condition()
+
+    def _ensure_thread(self):
+        # Started lazily, and again after a fork (preloading servers)
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, record):
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(record)
+            with self._lock:
+                self.enqueued += 1
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    if self._flush_requested.is_set():
+                        batch.append(self.queue.get_nowait())
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _insert(self, rows):
+        try:
+            write_records(rows)
+            db.session.commit()
+            return True
+        except Exception:
+            db.session.rollback()
+            return False
+
+    def _write(self, batch):
+        written = 0
+        with self.app.app_context():
+            try:
+                if self._insert(batch):
+                    written = len(batch)
+                else:
+                    # One bad row (e.g. a user_id that no longer exists) must
+                    # not lose the whole batch: retry row by row.
+                    written = sum(self._insert([row]) for row in batch)
+                    self.app.logger.warning("Audit batch failed, %d/%d rows written individually",
+                                            written, len(batch))
+            finally:
+                db.session.remove()
+        with self._processed:
+            self.written += written
+            self.failed += len(batch) - written
+            self._processed.notify_all()
+
+    def flush(self, timeout=5.0):
+        # Block until everything queued so far is written (tests, shutdown)
+        if self._thread is None or self._pid != os.getpid():
+            return
+        target = self.enqueued
+        self._flush_requested.set()
+        with self._processed:
+            self._processed.wait_for(lambda: self.written + self.failed >= target, timeout)
+        self._flush_requested.clear()
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+def write_records(records):
+    # Raw rows plus their hourly/daily rollup counts, in the caller's transaction
+    db.session.execute(insert(AuditLog), [{k: v for k, v in r.items() if k != "rule"} for r in records])
+    apply_rollups(records)
+
+
+def skip_audit():
+    # Keeps the current request out of the audit trail (e.g. static frontend files)
+    g.audit_skip = True
+
+
+def _response_message(resp, max_body_bytes):
+    # Never pull streamed/file responses (send_file) into memory just to log them
+    if resp.direct_passthrough or resp.is_streamed:
+        return ""
+    length = resp.calculate_content_length()
+    if length is None or length > max_body_bytes:
+        return ""
+    body = resp.get_data()[:MESSAGE_MAX_CHARS * 4]
+    return body.decode("utf-8", errors="replace")[:MESSAGE_MAX_CHARS]
+
 
 def init_audit(app):
     # File logger
@@ -10,32 +154,52 @@ def init_audit(app):
     handler.setLevel(app.config.get("LOG_LEVEL", "INFO"))
     handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
     app.logger.addHandler(handler)
+    # Module loggers (src.*, also used where there is no app context) write to the same file
+    package_logger = logging.getLogger("src")
+    if not any(getattr(h, "baseFilename", None) == handler.baseFilename for h in package_logger.handlers):
+        package_logger.setLevel(handler.level)
+        package_logger.addHandler(handler)
+
+    writer = None
+    if app.config.get("AUDIT_ASYNC", True):
+        writer = AuditWriter(
+            app,
+            queue_size=app.config.get("AUDIT_QUEUE_SIZE", 10000),
+            batch_size=app.config.get("AUDIT_BATCH_SIZE", 200),
+            flush_interval=app.config.get("AUDIT_FLUSH_INTERVAL", 1.0),
+        )
+        atexit.register(writer.flush)
+    app.extensions["audit_writer"] = writer
+    register_cli(app)
+    max_body_bytes = app.config.get("AUDIT_BODY_MAX_BYTES", 64 * 1024)
+    skip_endpoints = set(app.config.get("AUDIT_SKIP_ENDPOINTS", ()))
 
     @app.after_request
     def after(resp):
+        if request.endpoint in skip_endpoints or g.get("audit_skip"):
+            return resp
         try:
-            # If there is no valid JWT, we continue and log with user_id = None.
-            user_id = None
-            try:
-                verify_jwt_in_request()
-                claims = get_jwt()
-                # identity is normally in the "sub" claim
-                user_id = claims.get("sub")
-            except Exception:
-                # no JWT or invalid token — that's ok for auditing
-                user_id = None
-
-            log = AuditLog(
+            # Claims the view already verified; no valid JWT logs user_id = None
+            claims = current_claims()
+            user_id = claims.get("sub") if claims else None
+
+            record = dict(
                 user_id=int(user_id) if user_id else None,
                 event="http_request",
                 route=request.path,
                 method=request.method,
                 ip=request.remote_addr,
                 status_code=resp.status_code,
-                message=(resp.get_data(as_text=True) or "")[:500]
+                message=_response_message(resp, max_body_bytes),
+                created_at=datetime.utcnow(),
+                # rollups group by URL rule so per-id paths don't explode cardinality
+                rule=request.url_rule.rule if request.url_rule else "<unmatched>",
             )
-            db.session.add(log)
-            db.session.commit()
+            if writer is not None:
+                writer.enqueue(record)
+            else:
+                write_records([record])
+                db.session.commit()
         except Exception:
             db.session.rollback()
         return resp
@@ -0,0 +1,109 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, select
+from ..models import db, AuditLog, AuditRollup
+
+PRUNE_BATCH_SIZE = 5000
+
+
+def _archive(archive_dir, logs):
+    # One gzipped NDJSON file per UTC day; appending adds a gzip member, which
+    # every gzip reader concatenates transparently.
+    by_day = {}
+    for log in logs:
+        by_day.setdefault(log.created_at.strftime("%Y-%m-%d"), []).append(log)
+    for day, rows in by_day.items():
+        path = os.path.join(archive_dir, f"audit_logs_{day}.ndjson.gz")
+        with gzip.open(path, "at", encoding="utf-8") as out:
+            for log in rows:
+                out.write(json.dumps({
+                    "id": log.id,
+                    "user_id": log.user_id,
+                    "event": log.event,
+                    "route": log.route,
+                    "method": log.method,
+                    "ip": log.ip,
+                    "status_code": log.status_code,
+                    "message": log.message,
+                    "created_at": log.created_at.isoformat(),
+                }) + "\n")
+
+
+def prune_audit_logs(before, archive_dir=None, batch_size=PRUNE_BATCH_SIZE):
+    # Deletes raw logs older than `before` oldest-first in small batches, each
+    # its own transaction, walking the (created_at, id) index so no batch scans
+    # the table or holds long locks. Rollups are untouched, so /audit/stats keeps
+    # the full history. Returns the number of rows removed.
+    if archive_dir:
+        os.makedirs(archive_dir, exist_ok=True)
+    removed = 0
+    while True:
+        logs = db.session.execute(
+            select(AuditLog)
+            .where(AuditLog.created_at < before)
+            .order_by(AuditLog.created_at, AuditLog.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not logs:
+            return removed
+        if archive_dir:
+            _archive(archive_dir, logs)
+        db.session.execute(delete(AuditLog).where(AuditLog.id.in_([l.id for l in logs])))
+        db.session.commit()
+        removed += len(logs)
+
+
+def _old_rollups(granularity, before):
+    return (AuditRollup.granularity == granularity, AuditRollup.bucket_start < before)
+
+
+def prune_rollups(granularity, before):
+    result = db.session.execute(delete(AuditRollup).where(*_old_rollups(granularity, before)))
+    db.session.commit()
+    return result.rowcount
+
+
+def count_prunable(before, hourly_before):
+    # What `flask audit prune --dry-run` reports: (raw logs, hourly rollups)
+    logs = db.session.scalar(select(func.count()).select_from(AuditLog).where(AuditLog.created_at < before))
+    hourly = db.session.scalar(select(func.count()).select_from(AuditRollup)
+                               .where(*_old_rollups("hour", hourly_before)))
+    return logs, hourly
+
+
+audit_cli = AppGroup("audit", help="Audit log maintenance.")
+
+
+@audit_cli.command("prune")
+@click.option("--days", type=int, default=None, help="Keep this many days of raw logs (AUDIT_RETENTION_DAYS).")
+@click.option("--archive-dir", default=None, help="Write pruned rows here first (AUDIT_ARCHIVE_DIR).")
+@click.option("--dry-run", is_flag=True, help="Only count what would be pruned.")
+def prune_command(days, archive_dir, dry_run):
+    # Meant for cron: `flask audit prune`
+    config = current_app.config
+    days = days if days is not None else config.get("AUDIT_RETENTION_DAYS", 90)
+    archive_dir = archive_dir or config.get("AUDIT_ARCHIVE_DIR") or None
+    hourly_days = config.get("AUDIT_ROLLUP_HOURLY_RETENTION_DAYS", 30)
+    now = datetime.utcnow()
+    before, hourly_before = now - timedelta(days=days), now - timedelta(days=hourly_days)
+
+    if dry_run:
+        logs, hourly = count_prunable(before, hourly_before)
+        click.echo(f"Would prune {logs} audit log rows older than {days} days")
+        click.echo(f"Would prune {hourly} hourly rollups older than {hourly_days} days")
+        return
+
+    removed = prune_audit_logs(before, archive_dir)
+    click.echo(f"Pruned {removed} audit log rows older than {days} days")
+
+    removed = prune_rollups("hour", hourly_before)
+    click.echo(f"Pruned {removed} hourly rollups older than {hourly_days} days")
+
+
+def register_cli(app):
+    app.cli.add_command(audit_cli)
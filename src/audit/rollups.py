@@ -0,0 +1,74 @@
+from collections import Counter
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from ..models import db, AuditRollup
+
+GRANULARITIES = ("hour", "day")
+ROLLUP_DIMENSIONS = ("route", "method", "status_code", "user_id")
+
+
+def bucket_start(ts, granularity):
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_counts(records):
+    # records: audit rows as dicts, with "rule" (the matched URL rule) if known
+    counts = Counter()
+    for r in records:
+        route = (r.get("rule") or r["route"] or "")[:255]
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(r["created_at"], granularity), route,
+                   r["method"] or "", r["status_code"] or 0, r["user_id"] or 0)
+            counts[key] += 1
+    return counts
+
+
+def apply_rollups(records):
+    # Adds the records to the hourly/daily counters in the current transaction
+    # (one upsert per distinct bucket/key, not per record).
+    counts = rollup_counts(records)
+    if not counts:
+        return
+    rows = [dict(zip(("granularity", "bucket_start", "route", "method", "status_code", "user_id"), key),
+                 count=n) for key, n in counts.items()]
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(AuditRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["granularity", "bucket_start", "route", "method", "status_code", "user_id"],
+            set_={"count": AuditRollup.count + stmt.excluded.count},
+        )
+        db.session.execute(stmt, rows)
+        return
+
+    for row in rows:
+        existing = AuditRollup.query.filter_by(**{k: v for k, v in row.items() if k != "count"}).first()
+        if existing:
+            existing.count += row["count"]
+        else:
+            db.session.add(AuditRollup(**row))
+
+
+def query_stats(granularity, since=None, until=None, group_by=ROLLUP_DIMENSIONS, filters=None):
+    # Reads only audit_rollups, so cost depends on buckets x keys, not raw log volume
+    group_cols = [getattr(AuditRollup, dim) for dim in group_by]
+    stmt = select(AuditRollup.bucket_start, *group_cols, func.sum(AuditRollup.count).label("count")) \
+        .where(AuditRollup.granularity == granularity)
+    if since is not None:
+        stmt = stmt.where(AuditRollup.bucket_start >= bucket_start(since, granularity))
+    if until is not None:
+        stmt = stmt.where(AuditRollup.bucket_start < until)
+    for dim, value in (filters or {}).items():
+        stmt = stmt.where(getattr(AuditRollup, dim) == value)
+    stmt = stmt.group_by(AuditRollup.bucket_start, *group_cols).order_by(AuditRollup.bucket_start)
+
+    return [
+        {"bucket_start": row.bucket_start.isoformat(),
+         **{dim: getattr(row, dim) for dim in group_by},
+         "count": int(row.count)}
+        for row in db.session.execute(stmt)
+    ]
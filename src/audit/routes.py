@@ -1,14 +1,24 @@
-from flask import Blueprint, jsonify
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from flask import Blueprint, jsonify, current_app, request, Response, stream_with_context
+from sqlalchemy import and_, or_, select
 from ..models import db, AuditLog
 from ..rbac.decorators import role_required
+from .rollups import GRANULARITIES, ROLLUP_DIMENSIONS, query_stats
 
 audit_bp = Blueprint("audit", __name__, url_prefix="/audit")
 
-@audit_bp.get("/logs")
-@role_required("admin")
-def logs():
-    logs = AuditLog.query.order_by(AuditLog.created_at.desc()).limit(100).all()
-    return jsonify([{
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = ["id", "user_id", "event", "route", "method", "ip", "status_code", "message", "created_at"]
+
+
+def _log_dict(l):
+    return {
         "id": l.id,
         "user_id": l.user_id,
         "event": l.event,
@@ -18,4 +28,145 @@ def logs():
         "status_code": l.status_code,
         "message": l.message,
         "created_at": l.created_at.isoformat()
-    } for l in logs])
+    }
+
+
+def _encode_cursor(log):
+    raw = f"{log.created_at.isoformat()}|{log.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    created_at, log_id = raw.rsplit("|", 1)
+    return datetime.fromisoformat(created_at), int(log_id)
+
+
+def _filters(args):
+    # Server-side filters shared by /logs and /export; raises ValueError on bad input
+    conds = []
+    if args.get("user_id"):
+        conds.append(AuditLog.user_id == int(args["user_id"]))
+    if args.get("route"):
+        route = args["route"]
+        if route.endswith("*"):
+            conds.append(AuditLog.route.startswith(route[:-1], autoescape=True))
+        else:
+            conds.append(AuditLog.route == route)
+    if args.get("method"):
+        conds.append(AuditLog.method == args["method"].upper())
+    if args.get("status"):
+        status = args["status"].lower()
+        if status.endswith("xx"):
+            low = int(status[0]) * 100
+            conds.append(AuditLog.status_code.between(low, low + 99))
+        else:
+            conds.append(AuditLog.status_code == int(status))
+    if args.get("since"):
+        conds.append(AuditLog.created_at >= datetime.fromisoformat(args["since"]))
+    if args.get("until"):
+        conds.append(AuditLog.created_at < datetime.fromisoformat(args["until"]))
+    return conds
+
+
+def _newest_first(query):
+    return query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+
+
+@audit_bp.get("/logs")
+@role_required("admin")
+def logs():
+    # Keyset pagination on (created_at, id): pass the X-Next-Cursor header of a
+    # page back as ?cursor= to get the next (older) page.
+    try:
+        conds = _filters(request.args)
+        limit = max(1, min(int(request.args.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        if request.args.get("cursor"):
+            created_at, log_id = _decode_cursor(request.args["cursor"])
+            conds.append(or_(AuditLog.created_at < created_at,
+                             and_(AuditLog.created_at == created_at, AuditLog.id < log_id)))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
+
+    logs = _newest_first(AuditLog.query.filter(*conds)).limit(limit + 1).all()
+    headers = {}
+    if len(logs) > limit:
+        logs = logs[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(logs[-1])
+    return jsonify([_log_dict(l) for l in logs]), 200, headers
+
+
+@audit_bp.get("/export")
+@role_required("admin")
+def export():
+    # Streams every matching row as NDJSON (default) or CSV; rows are fetched
+    # in batches so the result set is never held in memory.
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    try:
+        conds = _filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
+
+    stmt = _newest_first(select(AuditLog).where(*conds)).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    def rows():
+        for log in db.session.execute(stmt).scalars():
+            yield _log_dict(log)
+
+    def generate():
+        if fmt == "ndjson":
+            for row in rows():
+                yield json.dumps(row) + "\n"
+            return
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for row in rows():
+            writer.writerow(row)
+            if buf.tell() > 64 * 1024:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename=audit_logs.{fmt}"})
+
+
+@audit_bp.get("/stats")
+@role_required("admin")
+def stats():
+    # Request counts per hour/day bucket from the rollup table, e.g.
+    # ?granularity=hour&group_by=route,status_code&since=2026-01-01
+    granularity = request.args.get("granularity", "hour")
+    if granularity not in GRANULARITIES:
+        return jsonify({"error": "granularity must be hour or day"}), 400
+    group_by = [d for d in request.args.get("group_by", ",".join(ROLLUP_DIMENSIONS)).split(",") if d]
+    if any(d not in ROLLUP_DIMENSIONS for d in group_by):
+        return jsonify({"error": f"group_by must be a subset of {', '.join(ROLLUP_DIMENSIONS)}"}), 400
+    try:
+        since = datetime.fromisoformat(request.args["since"]) if request.args.get("since") else None
+        until = datetime.fromisoformat(request.args["until"]) if request.args.get("until") else None
+        filters = {}
+        for dim in ROLLUP_DIMENSIONS:
+            if request.args.get(dim):
+                value = request.args[dim]
+                filters[dim] = int(value) if dim in ("status_code", "user_id") else value
+        if "method" in filters:
+            filters["method"] = filters["method"].upper()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
+
+    return jsonify(query_stats(granularity, since, until, group_by, filters))
+
+
+@audit_bp.get("/writer")
+@role_required("admin")
+def writer_stats():
+    writer = current_app.extensions.get("audit_writer")
+    if writer is None:
+        return jsonify({"mode": "sync"})
+    return jsonify({"mode": "async", **writer.stats()})
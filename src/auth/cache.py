@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+from ..models import db, User, Role
+
+
+class ProfileCache:
+    # In-process TTL + LRU of user profile/role data keyed by user id. Each
+    # worker process has its own copy: commits in this process invalidate it
+    # right away, changes made elsewhere are picked up within ttl seconds.
+
+    def __init__(self, max_entries=10000, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user_id, profile):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, profile)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+profile_cache = ProfileCache()
+
+
+def profile_dict(user):
+    return {
+        "id": user.id,
+        "email": user.email,
+        "role": user.role.name if user.role else None,
+        "is_active": user.is_active,
+    }
+
+
+def get_profile(user_id):
+    # Cached profile, or one query (user joined with role) on a miss
+    user_id = int(user_id)
+    profile = profile_cache.get(user_id)
+    if profile is None:
+        user = db.session.get(User, user_id, options=[joinedload(User.role)])
+        if user is None:
+            return None
+        profile = profile_dict(user)
+        profile_cache.put(user_id, profile)
+    return profile
+
+
+# Invalidation: remember which users/roles a flush touched and drop them once
+# the transaction commits. Bulk query.update()/delete() bypass the ORM and are
+# only picked up by the TTL.
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            session.info.setdefault("profile_cache_users", set()).add(obj.id)
+        elif isinstance(obj, Role):
+            session.info["profile_cache_clear"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    if session.info.pop("profile_cache_clear", False):
+        profile_cache.clear()
+    for user_id in session.info.pop("profile_cache_users", ()):
+        profile_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("profile_cache_clear", None)
+    session.info.pop("profile_cache_users", None)
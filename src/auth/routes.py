@@ -1,10 +1,33 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity
 from ..models import db, User
+from ..rbac.decorators import role_required
+from ..utils.security import HashingBusy, configure_hashing
+from .cache import profile_cache, get_profile
 from .service import register_user, authenticate
+from .tokens import refresh_claims, revocation_list, token_required
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
+
+@auth_bp.record_once
+def configure(state):
+    config = state.app.config
+    configure_hashing(
+        rounds=config.get("BCRYPT_ROUNDS", 12),
+        workers=config.get("PASSWORD_HASH_WORKERS", 0),
+        max_pending=config.get("PASSWORD_HASH_MAX_PENDING", 64),
+    )
+    profile_cache.ttl = config.get("AUTH_CACHE_TTL", 300.0)
+    profile_cache.max_entries = config.get("AUTH_CACHE_MAX_ENTRIES", 10000)
+    revocation_list.ttl = config.get("AUTH_REVOCATION_SYNC_INTERVAL", 30.0)
+
+
+@auth_bp.errorhandler(HashingBusy)
+def hashing_busy(e):
+    return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+
+
 @auth_bp.post("/register")
 def register():
     data = request.get_json() or {}
@@ -21,6 +44,8 @@ def register():
     try:
         user = register_user(email, password, role)
         return jsonify({"message": "registered", "user": {"id": user.id, "email": user.email, "role": user.role.name}}), 201
+    except HashingBusy:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
@@ -35,9 +60,59 @@ def login():
         return jsonify({"error": "Invalid credentials"}), 401
     return jsonify(res), 200
 
+@auth_bp.post("/logout")
+@token_required()
+def logout():
+    # Revokes the access token used for this request and, if sent, the
+    # caller's refresh token, in one commit. A refresh token that is not the
+    # caller's revokes nothing.
+    access = get_jwt()
+    tokens = [access]
+    refresh_token = (request.get_json(silent=True) or {}).get("refresh_token")
+    if refresh_token:
+        refresh = refresh_claims(refresh_token, access["sub"])
+        if refresh is None:
+            return jsonify({"error": "Invalid refresh token"}), 400
+        tokens.append(refresh)
+    revocation_list.revoke(*tokens)
+    return jsonify({"message": "logged out"}), 200
+
 @auth_bp.get("/me")
-@jwt_required()
+@token_required()
 def me():
     uid = get_jwt_identity()
-    user = User.query.get(int(uid))
-    return jsonify({"id": user.id, "email": user.email, "role": user.role.name if user.role else None})
+    claims = get_jwt()
+    if current_app.config.get("AUTH_ME_FROM_CLAIMS") and "email" in claims:
+        # No database access at all; reflects the user as of token issue
+        return jsonify({"id": int(uid), "email": claims["email"], "role": claims.get("role")})
+    profile = get_profile(uid)
+    if profile is None:
+        return jsonify({"error": "User not found"}), 404
+    return jsonify({"id": profile["id"], "email": profile["email"], "role": profile["role"]})
+
+
+@auth_bp.put("/users/<int:user_id>/active")
+@role_required("admin")
+def set_user_active(user_id):
+    # {"active": false} disables the account; its existing tokens stop working too
+    data = request.get_json() or {}
+    if not isinstance(data.get("active"), bool):
+        return jsonify({"error": "active (true/false) required"}), 400
+    user = db.session.get(User, user_id)
+    if user is None:
+        return jsonify({"error": "User not found"}), 404
+    user.is_active = data["active"]
+    db.session.commit()
+    return jsonify({"id": user.id, "email": user.email, "is_active": user.is_active}), 200
+
+
+@auth_bp.get("/cache")
+@role_required("admin")
+def cache_stats():
+    return jsonify(profile_cache.stats())
+
+
+@auth_bp.get("/revocations")
+@role_required("admin")
+def revocation_stats():
+    return jsonify(revocation_list.stats())
@@ -1,7 +1,10 @@
 from flask import current_app
 from flask_jwt_extended import create_access_token, create_refresh_token
-from ..utils.security import hash_password, verify_password
+from ..utils.security import hash_password, verify_and_update_password
+from sqlalchemy.orm import joinedload
 from ..models import db, User, Role
+from ..rbac.permissions import permission_map
+from .cache import profile_cache, profile_dict
 
 def register_user(email: str, password: str, role_name: str = "user"):
     role = Role.query.filter_by(name=role_name).first()
@@ -16,9 +19,21 @@ def register_user(email: str, password: str, role_name: str = "user"):
     return user
 
 def authenticate(email: str, password: str):
-    user = User.query.filter_by(email=email).first()
-    if user and verify_password(password, user.password_hash) and user.is_active:
-        claims = {"role": user.role.name if user.role else "user"}
+    user = User.query.options(joinedload(User.role)).filter_by(email=email).first()
+    if not user:
+        return None
+    ok, new_hash = verify_and_update_password(password, user.password_hash)
+    if ok and new_hash:
+        # stored hash predates the current BCRYPT_ROUNDS: upgrade it in place
+        user.password_hash = new_hash
+        db.session.commit()
+    if ok and user.is_active:
+        profile = profile_dict(user)
+        profile_cache.put(user.id, profile)
+        claims = {"role": profile["role"] or "user", "email": user.email}
+        if current_app.config.get("RBAC_JWT_PERMISSIONS"):
+            claims["perms"] = permission_map.mask(claims["role"])
+            claims["perms_sig"] = permission_map.signature()
         return {
             "access_token": create_access_token(identity=str(user.id), additional_claims=claims),
             "refresh_token": create_refresh_token(identity=str(user.id), additional_claims=claims),
@@ -0,0 +1,164 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from flask import current_app, g, request
+from flask_jwt_extended import decode_token, verify_jwt_in_request
+from flask_jwt_extended.exceptions import NoAuthorizationError
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from extensions import jwt
+from ..models import db, RevokedToken, User
+
+_UNSET = object()
+
+
+# Verified claims are decoded once per request and kept on g; the view
+# decorators, the audit hook and the DP endpoints all read them from there.
+# A request without an Authorization header never attempts a decode.
+def current_claims():
+    # The request's verified claims, or None (no token, or an invalid one)
+    claims = g.get("jwt_claims", _UNSET)
+    if claims is _UNSET:
+        claims = None
+        if _has_token():
+            try:
+                verified = verify_jwt_in_request(optional=True)
+                claims = verified[1] if verified else None
+            except Exception as e:
+                g.jwt_error = e
+        g.jwt_claims = claims
+    return claims
+
+
+def require_claims():
+    # Like verify_jwt_in_request(): raises the flask_jwt_extended error the
+    # JWTManager turns into a 401/422 response
+    claims = current_claims()
+    if claims is None:
+        error = g.get("jwt_error")
+        if error is not None:
+            raise error
+        raise NoAuthorizationError(f"Missing {current_app.config.get('JWT_HEADER_NAME', 'Authorization')} Header")
+    return claims
+
+
+def _has_token():
+    locations = current_app.config.get("JWT_TOKEN_LOCATION", ("headers",))
+    if isinstance(locations, str):
+        locations = (locations,)
+    if tuple(locations) != ("headers",):
+        return True  # cookies/query string: let flask_jwt_extended look
+    return bool(request.headers.get(current_app.config.get("JWT_HEADER_NAME", "Authorization")))
+
+
+def token_required():
+    # Drop-in for flask_jwt_extended.jwt_required() that shares the per-request claims
+    def wrapper(fn):
+        @wraps(fn)
+        def decorated(*args, **kwargs):
+            require_claims()
+            return fn(*args, **kwargs)
+        return decorated
+    return wrapper
+
+
+class RevocationList:
+    # Revoked token ids and deactivated user ids, loaded from the database in
+    # one go and swapped atomically, so the check on every decode is two set
+    # lookups. Like the permission map, commits in this process take effect
+    # on the next check; other processes pick them up after ttl seconds.
+
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self.version = 0
+        self._loaded = None  # (version, expires_at, jtis, inactive user ids)
+        self._lock = threading.Lock()
+
+    def _snapshot(self):
+        loaded = self._loaded
+        if loaded is not None and loaded[0] == self.version and loaded[1] > time.monotonic():
+            return loaded
+        with self._lock:
+            loaded = self._loaded
+            if loaded is None or loaded[0] != self.version or loaded[1] <= time.monotonic():
+                version = self.version
+                jtis = frozenset(jti for (jti,) in db.session.query(RevokedToken.jti)
+                                 .filter(RevokedToken.expires_at > datetime.utcnow()))
+                inactive = frozenset(uid for (uid,) in db.session.query(User.id).filter(User.is_active.is_(False)))
+                loaded = self._loaded = (version, time.monotonic() + self.ttl, jtis, inactive)
+            return loaded
+
+    def is_revoked(self, claims):
+        _, _, jtis, inactive = self._snapshot()
+        return claims.get("jti") in jtis or _user_id(claims) in inactive
+
+    def revoke(self, *tokens):
+        # Revokes tokens (access or refresh claims) until they would have
+        # expired anyway, all in one commit
+        now = datetime.utcnow()
+        for claims in tokens:
+            expires_at = datetime.fromtimestamp(claims["exp"], timezone.utc).replace(tzinfo=None) \
+                if claims.get("exp") else now + timedelta(days=365)
+            if not RevokedToken.query.filter_by(jti=claims["jti"]).first():
+                db.session.add(RevokedToken(jti=claims["jti"], user_id=_user_id(claims), expires_at=expires_at))
+        RevokedToken.query.filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+        db.session.commit()
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+
+    def stats(self):
+        _, _, jtis, inactive = self._snapshot()
+        return {"revoked_tokens": len(jtis), "inactive_users": len(inactive), "ttl": self.ttl}
+
+
+def _user_id(claims):
+    try:
+        return int(claims.get("sub"))
+    except (TypeError, ValueError):
+        return None
+
+
+revocation_list = RevocationList()
+
+
+@jwt.token_in_blocklist_loader
+def _token_revoked(jwt_header, jwt_payload):
+    return revocation_list.is_revoked(jwt_payload)
+
+
+def refresh_claims(encoded, subject):
+    # Claims of an encoded refresh token issued to subject, or None if it is
+    # not one (bad signature, an access token, another user's token)
+    try:
+        claims = decode_token(encoded, allow_expired=True)
+    except Exception:
+        return None
+    if claims.get("type") != "refresh" or claims.get("sub") != subject:
+        return None
+    return claims
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, RevokedToken):
+            session.info["revocation_list_stale"] = True
+            return
+    for obj in session.dirty:
+        if isinstance(obj, User) and inspect(obj).attrs.is_active.history.has_changes():
+            session.info["revocation_list_stale"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    if session.info.pop("revocation_list_stale", False):
+        revocation_list.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("revocation_list_stale", None)
@@ -1,3 +1,4 @@
-from .models import db, Role, User, Permission, RolePermission, AuditLog
+from .models import db, Role, User, Permission, RolePermission, AuditLog, AuditRollup, PrivacyBudget, PrivacyLedgerEntry, RevokedToken
 
-__all__ = ["db", "Role", "User", "Permission", "RolePermission", "AuditLog"]
+__all__ = ["db", "Role", "User", "Permission", "RolePermission", "AuditLog", "AuditRollup",
+           "PrivacyBudget", "PrivacyLedgerEntry", "RevokedToken"]
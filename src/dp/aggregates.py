@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+from .mechanisms import label_counts, laplace_noise_array, noisy_labels
+from .plots import HIST_BINS, HIST_MAX_CATEGORIES, OTHER_CATEGORY
+
+# Noisy count / sum / mean / histogram over one column of an uploaded dataset,
+# optionally per group of a categorical column. Exact aggregates for every
+# group come from one factorize + bincount pass; the Laplace noise for all
+# groups and measures is drawn as one array. Groups are disjoint (parallel
+# composition), while the requested measures split epsilon evenly
+# (sequential composition); a mean is post-processed from its noisy sum and
+# count.
+#
+# Group labels and categorical histogram labels are published, so they are
+# either public (groups / categories from the caller) or found with
+# DOMAIN_SHARE of epsilon by noisy thresholding (see noisy_labels): a group
+# or label held by a handful of rows, such as an ID or an email, is left out.
+# Rows outside the domain are counted under "(other)".
+AGGREGATES = ("count", "sum", "mean", "histogram")
+MISSING_GROUP = "(missing)"
+DOMAIN_SHARE = 0.2
+DOMAIN_DELTA = 1e-6
+
+
+class AggregateError(ValueError):
+    pass
+
+
+def measures_for(aggregates):
+    measures = set()
+    for agg in aggregates:
+        if agg not in AGGREGATES:
+            raise AggregateError(f"Unsupported aggregate: {agg}")
+        measures.update(("count", "sum") if agg == "mean" else (agg,))
+    return tuple(sorted(measures))
+
+
+def _is_numeric(values, series):
+    return values.notna().sum() >= 0.8 * max(1, series.notna().sum())
+
+
+def is_numeric_column(df, column):
+    if column not in df.columns:
+        raise AggregateError(f"Unknown column: {column}")
+    return _is_numeric(pd.to_numeric(df[column], errors="coerce"), df[column])
+
+
+def group_label_counts(df, group_by):
+    if group_by not in df.columns:
+        raise AggregateError(f"Unknown group_by column: {group_by}")
+    return label_counts(df[group_by])
+
+
+def domains_to_find(measures, group_by, groups, categories, numeric):
+    # Which label sets are not public and need part of epsilon
+    found = []
+    if group_by and groups is None:
+        found.append("groups")
+    if "histogram" in measures and categories is None and not numeric:
+        found.append("categories")
+    return found
+
+
+def find_domains(counts, found, epsilon, delta=DOMAIN_DELTA, rng=None):
+    # Noisy label sets for the domains in `found` ({name: exact label counts}),
+    # DOMAIN_SHARE of epsilon split over them. Returns (labels, epsilon spent).
+    if not found:
+        return {}, 0.0
+    share = epsilon * DOMAIN_SHARE
+    limits = {"groups": None, "categories": HIST_MAX_CATEGORIES - 1}
+    labels = {name: noisy_labels(counts[name], share / len(found), delta, limits[name], rng) for name in found}
+    return labels, share
+
+
+def _with_other(labels):
+    return list(dict.fromkeys(str(label) for label in labels if str(label) != OTHER_CATEGORY)) + [OTHER_CATEGORY]
+
+
+def exact_stats(df, column, measures, group_by=None, bounds=None, bins=HIST_BINS, groups=None, categories=None):
+    # {"groups", "count", "sum", "histogram", "bins"}; values are NumPy arrays.
+    # groups / categories are the published label sets (public or noisy).
+    if column not in df.columns:
+        raise AggregateError(f"Unknown column: {column}")
+    if group_by and group_by not in df.columns:
+        raise AggregateError(f"Unknown group_by column: {group_by}")
+
+    series = df[column]
+    values = pd.to_numeric(series, errors="coerce")
+    if group_by:
+        if groups is None:
+            raise AggregateError("group_by needs its group labels")
+        groups = _with_other(groups) + [MISSING_GROUP]
+        keys = df[group_by].astype("string")
+        keys = keys.where(keys.isin(groups) | keys.isna(), OTHER_CATEGORY).fillna(MISSING_GROUP)
+        codes = pd.Categorical(keys, categories=groups).codes.astype(np.intp)
+    else:
+        codes, groups = np.zeros(len(df), dtype=np.intp), [None]
+    n_groups = len(groups)
+
+    stats = {"groups": groups}
+    if "count" in measures:
+        # non-missing values of the column, like SQL COUNT(column)
+        present = series.notna().to_numpy()
+        stats["count"] = np.bincount(codes[present], minlength=n_groups).astype(float)
+
+    if "sum" in measures:
+        if bounds is None:
+            raise AggregateError("sum and mean need bounds: [lower, upper]")
+        if not _is_numeric(values, series):
+            raise AggregateError(f"Column {column} is not numeric")
+        clipped = values.clip(bounds[0], bounds[1]).fillna(0.0).to_numpy(dtype=float)
+        stats["sum"] = np.bincount(codes, weights=clipped, minlength=n_groups)
+
+    if "histogram" in measures:
+        if categories is None and _is_numeric(values, series):
+            if bounds is None:
+                raise AggregateError("numeric histograms need bounds: [lower, upper]")
+            edges = np.linspace(bounds[0], bounds[1], bins + 1)
+            arr = values.to_numpy(dtype=float)
+            keep = ~np.isnan(arr)
+            bin_idx = np.clip(np.searchsorted(edges, arr[keep], side="right") - 1, 0, bins - 1)
+            labels = [float(e) for e in edges]
+            n_bins = bins
+            hist_codes = codes[keep]
+        else:
+            if categories is None:
+                raise AggregateError("categorical histograms need their category labels")
+            labels = _with_other(categories)
+            cats = series.astype("string")
+            cats = cats.where(cats.isin(labels) | cats.isna(), OTHER_CATEGORY)
+            keep = cats.notna().to_numpy()
+            bin_idx = pd.Categorical(cats[keep], categories=labels).codes.astype(np.intp)
+            n_bins = len(labels)
+            hist_codes = codes[keep]
+        flat = np.bincount(hist_codes * n_bins + bin_idx, minlength=n_groups * n_bins)
+        stats["histogram"] = flat.reshape(n_groups, n_bins).astype(float)
+        stats["bins"] = labels
+    return stats
+
+
+def noisy_release(stats, measures, epsilon, bounds=None, rng=None):
+    # Adds Laplace noise to every measure of every group in one batched draw
+    if epsilon <= 0:
+        raise AggregateError("epsilon must be positive")
+    eps_each = epsilon / len(measures)
+    parts = []
+    for measure in measures:
+        exact = stats[measure]
+        sensitivity = max(abs(bounds[0]), abs(bounds[1])) if measure == "sum" else 1.0
+        parts.append((measure, exact, sensitivity / eps_each))
+
+    scales = np.concatenate([np.full(exact.size, scale) for _, exact, scale in parts])
+    noise = laplace_noise_array(scales.size, 1.0, rng) * scales
+
+    out = {}
+    offset = 0
+    for measure, exact, _ in parts:
+        noisy = exact + noise[offset:offset + exact.size].reshape(exact.shape)
+        offset += exact.size
+        out[measure] = np.maximum(noisy, 0.0) if measure in ("count", "histogram") else noisy
+    return out
+
+
+def release_payload(stats, noisy, aggregates, bounds=None):
+    rows = []
+    for i, group in enumerate(stats["groups"]):
+        row = {} if group is None else {"group": group}
+        for agg in aggregates:
+            if agg == "mean":
+                mean = noisy["sum"][i] / max(noisy["count"][i], 1.0)
+                row["mean"] = float(np.clip(mean, bounds[0], bounds[1]))
+            elif agg == "histogram":
+                row["histogram"] = [float(c) for c in noisy["histogram"][i]]
+            else:
+                row[agg] = float(noisy[agg][i])
+        rows.append(row)
+    return rows
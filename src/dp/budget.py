@@ -0,0 +1,237 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, insert, or_, update
+from ..models import db, PrivacyBudget, PrivacyLedgerEntry
+
+
+class BudgetExceeded(Exception):
+
+    def __init__(self, scope, key, remaining):
+        super().__init__(f"Privacy budget exhausted for {scope} {key} (epsilon remaining: {remaining:g})")
+        self.scope = scope
+        self.key = key
+        self.remaining = remaining
+
+
+class BudgetAccountant:
+    # Per-user and per-dataset epsilon ledger. Checks and debits happen in
+    # memory under one lock, so a charge is atomic and costs no query once the
+    # balances are loaded. A background thread writes the accumulated spend
+    # (as increments) and the ledger rows every flush_interval seconds, then
+    # re-reads the totals so spending by other processes is picked up; the
+    # cross-process overshoot is bounded by what can be spent in one interval.
+    # Balances not resynced for sync_interval seconds are reloaded on next use.
+
+    def __init__(self, app, user_epsilon=100.0, dataset_epsilon=100.0, flush_interval=1.0, sync_interval=30.0):
+        self.app = app
+        self.limits = {"user": user_epsilon, "dataset": dataset_epsilon}
+        self.flush_interval = flush_interval
+        self.sync_interval = sync_interval
+        self._balances = {}  # (scope, key) -> {"limit", "epsilon", "delta", "loaded"}
+        self._pending = {}   # (scope, key) -> [epsilon, delta] not yet written
+        self._entries = []   # ledger rows not yet written
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="privacy-budget", daemon=True)
+                self._thread.start()
+
+    @staticmethod
+    def _keys(user_id, dataset_id):
+        keys = []
+        if user_id is not None:
+            keys.append(("user", str(user_id)))
+        if dataset_id is not None:
+            keys.append(("dataset", dataset_id))
+        return keys
+
+    def _limit(self, key, balance):
+        limit = balance["limit"] if balance["limit"] is not None else self.limits[key[0]]
+        return limit if limit and limit > 0 else float("inf")  # 0 / unset = no limit
+
+    @staticmethod
+    def _where(keys):
+        return or_(*[and_(PrivacyBudget.scope == scope, PrivacyBudget.key == key) for scope, key in keys])
+
+    def _load(self, keys):
+        # Spend not yet written is added back to the database totals. The read
+        # and the merge hold the flush lock: a flush between them would take
+        # spend out of _pending that the read did not see yet.
+        missing = [k for k in keys if k not in self._balances or self._balances[k]["loaded"] is None]
+        if not missing:
+            return
+        with self._flush_lock:
+            now = time.monotonic()
+            loaded = {k: {"limit": None, "epsilon": 0.0, "delta": 0.0, "loaded": now} for k in missing}
+            for row in PrivacyBudget.query.filter(self._where(missing)):
+                loaded[(row.scope, row.key)].update(limit=row.epsilon_limit, epsilon=row.epsilon_spent,
+                                                    delta=row.delta_spent)
+            with self._lock:
+                for k, balance in loaded.items():
+                    current = self._balances.get(k)
+                    if current is not None and current["loaded"] is not None:
+                        continue  # loaded by another thread meanwhile
+                    unflushed = self._pending.get(k, (0.0, 0.0))
+                    balance["epsilon"] += unflushed[0]
+                    balance["delta"] += unflushed[1]
+                    self._balances[k] = balance
+
+    def _apply(self, keys, epsilon, delta, entry):
+        # Caller holds the lock
+        for k in keys:
+            balance = self._balances[k]
+            balance["epsilon"] += epsilon
+            balance["delta"] += delta
+            pending = self._pending.setdefault(k, [0.0, 0.0])
+            pending[0] += epsilon
+            pending[1] += delta
+        self._entries.append(entry)
+
+    def charge(self, user_id, dataset_id, epsilon, delta=0.0, operation="", reference=None):
+        # Debits every applicable budget or none; raises BudgetExceeded
+        keys = self._keys(user_id, dataset_id)
+        self._load(keys)
+        entry = {
+            "user_id": int(user_id) if user_id is not None else None,
+            "dataset_id": dataset_id,
+            "operation": operation,
+            "reference": reference,
+            "epsilon": epsilon,
+            "delta": delta,
+            "created_at": datetime.utcnow(),
+        }
+        with self._lock:
+            for k in keys:
+                balance = self._balances[k]
+                remaining = self._limit(k, balance) - balance["epsilon"]
+                if epsilon > remaining + 1e-12:
+                    raise BudgetExceeded(k[0], k[1], max(remaining, 0.0))
+            self._apply(keys, epsilon, delta, entry)
+        self._ensure_thread()
+        return entry
+
+    def refund(self, entry):
+        # For queries that failed before releasing anything
+        keys = self._keys(entry["user_id"], entry["dataset_id"])
+        self._load(keys)
+        refund = {**entry, "operation": f"{entry['operation']}.refund", "epsilon": -entry["epsilon"],
+                  "delta": -entry["delta"], "created_at": datetime.utcnow()}
+        with self._lock:
+            self._apply(keys, refund["epsilon"], refund["delta"], refund)
+        self._ensure_thread()
+
+    def remaining(self, user_id=None, dataset_id=None):
+        keys = self._keys(user_id, dataset_id)
+        self._load(keys)
+        out = {}
+        with self._lock:
+            for k in keys:
+                balance = self._balances[k]
+                limit = self._limit(k, balance)
+                out[k[0]] = {
+                    "id": k[1],
+                    "epsilon_limit": None if limit == float("inf") else limit,
+                    "epsilon_spent": balance["epsilon"],
+                    "epsilon_remaining": None if limit == float("inf") else max(limit - balance["epsilon"], 0.0),
+                    "delta_spent": balance["delta"],
+                }
+        return out
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception("Privacy budget flush failed")
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                entries, self._entries = self._entries, []
+            if pending or entries:
+                self._write(pending, entries)
+            self._expire()
+
+    def _write(self, pending, entries):
+        with self.app.app_context():
+            try:
+                for (scope, key), (epsilon, delta) in pending.items():
+                    result = db.session.execute(
+                        update(PrivacyBudget)
+                        .where(PrivacyBudget.scope == scope, PrivacyBudget.key == key)
+                        .values(epsilon_spent=PrivacyBudget.epsilon_spent + epsilon,
+                                delta_spent=PrivacyBudget.delta_spent + delta,
+                                updated_at=datetime.utcnow())
+                    )
+                    if result.rowcount == 0:
+                        db.session.add(PrivacyBudget(scope=scope, key=key, epsilon_spent=epsilon,
+                                                     delta_spent=delta))
+                if entries:
+                    db.session.execute(insert(PrivacyLedgerEntry), entries)
+                db.session.commit()
+            except Exception:
+                # e.g. another process inserted the same new budget row: retry next round
+                db.session.rollback()
+                db.session.remove()
+                with self._lock:
+                    for k, (epsilon, delta) in pending.items():
+                        merged = self._pending.setdefault(k, [0.0, 0.0])
+                        merged[0] += epsilon
+                        merged[1] += delta
+                    self._entries[:0] = entries
+                raise
+
+            try:
+                # Resync with the database totals (includes other processes' spend)
+                rows = PrivacyBudget.query.filter(self._where(list(pending))).all() if pending else []
+                now = time.monotonic()
+                with self._lock:
+                    for row in rows:
+                        k = (row.scope, row.key)
+                        balance = self._balances.get(k)
+                        if balance is None:
+                            continue
+                        unflushed = self._pending.get(k, (0.0, 0.0))
+                        balance.update(limit=row.epsilon_limit, epsilon=row.epsilon_spent + unflushed[0],
+                                       delta=row.delta_spent + unflushed[1], loaded=now)
+            finally:
+                db.session.remove()
+
+    def _expire(self):
+        # Stale balances stay usable until the next charge reloads them
+        cutoff = time.monotonic() - self.sync_interval
+        with self._lock:
+            for balance in self._balances.values():
+                if balance["loaded"] is not None and balance["loaded"] < cutoff:
+                    balance["loaded"] = None
+
+
+def init_privacy_budget(app):
+    accountant = BudgetAccountant(
+        app,
+        user_epsilon=app.config.get("PRIVACY_BUDGET_USER_EPSILON", 100.0),
+        dataset_epsilon=app.config.get("PRIVACY_BUDGET_DATASET_EPSILON", 100.0),
+        flush_interval=app.config.get("PRIVACY_BUDGET_FLUSH_INTERVAL", 1.0),
+        sync_interval=app.config.get("PRIVACY_BUDGET_SYNC_INTERVAL", 30.0),
+    )
+    atexit.register(accountant.flush)
+    app.extensions["privacy_budget"] = accountant
+    return accountant
+
+
+def get_accountant():
+    return current_app.extensions["privacy_budget"]
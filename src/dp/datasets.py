@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from .storage import DATASET_CACHE_FOLDER
+
+logger = logging.getLogger(__name__)
+
+# Uploads are stored once per content hash (sha256 of the bytes, computed while
+# the request body streams to disk), and the parsed, type-inferred DataFrame is
+# kept as Feather so re-analysing the same bytes skips read_csv entirely.
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def find_upload(store, content_hash, formats):
+    # (path, fmt) of a stored upload; formats maps fmt -> extension
+    if not all(c in "0123456789abcdef" for c in content_hash) or len(content_hash) != 64:
+        return None
+    for fmt, ext in formats.items():
+        path = store.find(content_hash, f"{content_hash}{ext}")
+        if path:
+            return path, fmt
+    return None
+
+
+def save_upload(file_storage, store, ext=".csv"):
+    # Returns (content_hash, path). Identical bytes always map to the same path.
+    tmp_path = os.path.join(store.folder, f".{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                block = file_storage.stream.read(HASH_BLOCK_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+                out.write(block)
+
+        content_hash = digest.hexdigest()
+        path = store.find(content_hash, f"{content_hash}{ext}")  # bumps its LRU clock
+        if path:
+            os.remove(tmp_path)
+        else:
+            path = store.path(content_hash, f"{content_hash}{ext}")
+            os.replace(tmp_path, path)
+        return content_hash, path
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class DatasetCache:
+    # Size-bounded LRU of parsed datasets on disk; file mtime is the LRU clock.
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, content_hash):
+        return os.path.join(self.folder, f"{content_hash}.feather")
+
+    def get(self, content_hash):
+        import pandas as pd  # only loaded once the DP stack is in use
+
+        path = self._path(content_hash)
+        try:
+            df = pd.read_feather(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Dropping unreadable dataset cache entry %s: %s", content_hash, e)
+            self._remove(path)
+            return None
+        os.utime(path)
+        return df
+
+    def put(self, content_hash, df):
+        if self.max_bytes <= 0:
+            return
+        path = self._path(content_hash)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            df.to_feather(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            # e.g. object columns pyarrow can't type; the CSV is still the source of truth
+            logger.warning("Not caching dataset %s: %s", content_hash, e)
+            self._remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(".feather"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class StatsCache:
+    # LRU of exact per-column statistics so repeated queries on the same
+    # dataset skip loading and scanning it; only fresh noise is drawn.
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        stats = compute()
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = stats
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return stats
+
+
+# Parsed uploads keyed by content hash and exact /dp/aggregate statistics;
+# sizes are set from DP_DATASET_CACHE_MAX_BYTES and DP_STATS_CACHE_ENTRIES
+dataset_cache = DatasetCache(DATASET_CACHE_FOLDER, max_bytes=512 * 1024 * 1024)
+stats_cache = StatsCache()
@@ -0,0 +1,186 @@
+import csv
+import gzip
+import os
+import shutil
+import uuid
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# Input/output formats for the DP pipeline. Parquet and Arrow IPC inputs are
+# read memory-mapped as Arrow tables: only the columns being privatized are
+# converted to pandas, everything else is written back as the original Arrow
+# buffers.
+INPUT_EXTENSIONS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+OUTPUT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+COMPRESSIONS = {
+    "csv": {"gzip"},
+    "parquet": {"snappy", "gzip", "brotli", "zstd", "lz4"},
+    "arrow": {"lz4", "zstd"},
+}
+MIMETYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+class FormatError(ValueError):
+    pass
+
+
+def detect_input_format(filename, requested=None):
+    if requested:
+        if requested not in OUTPUT_EXTENSIONS:
+            raise FormatError(f"Unsupported input format: {requested}")
+        return requested
+    ext = os.path.splitext(filename or "")[1].lower()
+    return INPUT_EXTENSIONS.get(ext, "csv")
+
+
+def check_output(fmt, compression):
+    if fmt not in OUTPUT_EXTENSIONS:
+        raise FormatError(f"Unsupported output format: {fmt}")
+    if compression and compression not in COMPRESSIONS[fmt]:
+        raise FormatError(f"Unsupported compression for {fmt}: {compression}")
+
+
+def output_filename(file_id, fmt, compression=None):
+    name = f"privatized_{file_id}{OUTPUT_EXTENSIONS[fmt]}"
+    if fmt == "csv" and compression == "gzip":
+        name += ".gz"
+    return name
+
+
+def find_output(store, file_id):
+    # (path, fmt, download name) of whichever output an analysis produced
+    for fmt in OUTPUT_EXTENSIONS:
+        for compression in (None, "gzip") if fmt == "csv" else (None,):
+            name = output_filename(file_id, fmt, compression)
+            path = store.find(file_id, name)
+            if path:
+                return path, fmt, name.replace(f"_{file_id}", "")
+    return None
+
+
+def gzip_copy(store, file_id, path):
+    # gzip copy of a plain output for Content-Encoding: gzip downloads, made on
+    # first request. The dot name makes the janitor treat it as a temp file,
+    # so it goes away after an hour without downloads.
+    name = f".{os.path.basename(path)}.gz"
+    cached = store.find(file_id, name)
+    if cached:
+        return cached
+    target = store.path(file_id, name)
+    tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(path, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return target
+
+
+def read_table(path, fmt):
+    # Memory-mapped read; column data stays in the page cache until touched
+    if fmt == "parquet":
+        return pq.read_table(path, memory_map=True)
+    source = pa.memory_map(path, "r")
+    try:
+        return pa.ipc.open_file(source).read_all()
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source).read_all()
+
+
+def read_column_names(path, fmt):
+    # Header/schema only, no data pages
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+            return next(csv.reader(f), [])
+    if fmt == "parquet":
+        return pq.read_schema(path, memory_map=True).names
+    return read_table(path, fmt).column_names
+
+
+def to_arrow_column(series, field_type=None):
+    try:
+        return pa.Array.from_pandas(series, type=field_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # mixed object columns (e.g. categories that parse differently per row)
+        return pa.Array.from_pandas(series.astype("string"), type=pa.string())
+
+
+class TableWriter:
+    # Writes pandas DataFrames or Arrow tables, once or chunk by chunk, as
+    # CSV (optionally gzip), Parquet or Arrow IPC file format.
+
+    def __init__(self, path, fmt, compression=None, schema=None):
+        check_output(fmt, compression)
+        self.path = path
+        self.fmt = fmt
+        self.compression = compression
+        self.schema = schema
+        self._sink = None
+        self._writer = None
+        self._header = True
+
+    def _open(self, schema):
+        if self.fmt == "csv":
+            self._sink = gzip.open(self.path, "wb") if self.compression == "gzip" else open(self.path, "wb")
+        elif self.fmt == "parquet":
+            self._writer = pq.ParquetWriter(self.path, schema, compression=self.compression or "none")
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = pa.ipc.new_file(self.path, schema, options=options)
+
+    def _to_table(self, data):
+        if isinstance(data, pa.Table):
+            return data if self.schema is None else data.cast(self.schema)
+        if self.schema is None:
+            return pa.Table.from_pandas(data, preserve_index=False)
+        return pa.table([to_arrow_column(data[f.name], f.type) for f in self.schema], schema=self.schema)
+
+    def write(self, data):
+        if self.fmt == "csv" and not isinstance(data, pa.Table):
+            if self._sink is None:
+                self._open(None)
+            data.to_csv(self._sink, header=self._header, index=False)
+            self._header = False
+            return
+
+        table = self._to_table(data)
+        if self.schema is None:
+            self.schema = table.schema
+        if self._sink is None and self._writer is None:
+            self._open(self.schema)
+
+        if self.fmt == "csv":
+            options = pa_csv.WriteOptions(include_header=self._header, quoting_style="needed")
+            pa_csv.write_csv(table, self._sink, write_options=options)
+            self._header = False
+        else:
+            self._writer.write_table(table)
+
+    def close(self):
+        if self._sink is None and self._writer is None and self.schema is not None:
+            self.write(self.schema.empty_table())  # no rows: still emit the header/schema
+        if self._writer is not None:
+            self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
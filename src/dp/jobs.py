@@ -0,0 +1,112 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from ..models import db, DPResult
+from ..utils.metrics import record_analysis
+from .releases import release_cache
+from .storage import output_store, plot_store
+
+logger = logging.getLogger(__name__)
+
+# Background pool for /dp/analyze?async=true. Job state lives in dp_results so
+# any worker process can answer status/result requests.
+_executor = None
+
+
+def get_executor(app):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=app.config.get("DP_JOB_WORKERS", 2),
+                                       thread_name_prefix="dp-job")
+    return _executor
+
+
+def get_job(job_id):
+    return DPResult.query.filter_by(file_id=job_id).first()
+
+
+def _new_result(file_id, params, status):
+    return DPResult(
+        file_id=file_id,
+        content_hash=params.get("content_hash"),
+        columns=json.dumps(params["columns"]),
+        mechanism="auto" if params["scope"] == "whole_file" else params["mechanism"],
+        epsilon=params["epsilon"],
+        delta=params["delta"],
+        status=status,
+    )
+
+
+def record_finished(file_id, params, result):
+    row = _new_result(file_id, params, "finished")
+    row.columns = json.dumps(result["columns_processed"])
+    row.progress_done = row.progress_total = len(result["columns_processed"])
+    row.result = json.dumps(result)
+    db.session.add(row)
+    db.session.commit()
+    return row
+
+
+def submit_job(app, file_id, input_path, params, charge=None):
+    # charge: the privacy budget debit for this job, refunded if it fails
+    job = _new_result(file_id, params, "queued")
+    db.session.add(job)
+    db.session.commit()
+    get_executor(app).submit(_run_job, app, job.id, file_id, input_path, params, charge)
+    return job
+
+
+def _update(job_id, **fields):
+    DPResult.query.filter_by(id=job_id).update(fields)
+    db.session.commit()
+
+
+def refund_failed(accountant, charge, file_id):
+    # A failed analysis (sync or job) is refunded only once nothing derived
+    # from its charge can be read any more: the output, its gzip copy, the
+    # histograms and plots and the releases it published are deleted first.
+    # A release another run already reused keeps the charge.
+    if charge is None:
+        return False
+    output_store.discard(file_id)
+    plot_store.discard(file_id)
+    try:
+        retracted = release_cache.retract(file_id)
+    except Exception as e:
+        db.session.rollback()
+        logger.warning("Could not retract releases of %s: %s", file_id, e)
+        retracted = False
+    if not retracted:
+        logger.info("Not refunding %s: its releases were already reused", file_id)
+        return False
+    accountant.refund(charge)
+    return True
+
+
+def _run_job(app, job_id, file_id, input_path, params, charge=None):
+    from .pipeline import AnalysisError, run_analysis
+    from .releases import ReleaseBusy
+
+    with app.app_context():
+        try:
+            _update(job_id, status="running")
+            result = run_analysis(
+                input_path, file_id,
+                workers=app.config.get("DP_COLUMN_WORKERS", 1),
+                progress=lambda done, total: _update(job_id, progress_done=done, progress_total=total),
+                **params
+            )
+            record_analysis(result)
+            _update(job_id, status="finished", result=json.dumps(result),
+                    columns=json.dumps(result["columns_processed"]))
+        except (AnalysisError, ReleaseBusy) as e:
+            db.session.rollback()
+            refund_failed(app.extensions["privacy_budget"], charge, file_id)
+            _update(job_id, status="failed", error=str(e))
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception("DP job %s failed", file_id)
+            refund_failed(app.extensions["privacy_budget"], charge, file_id)
+            _update(job_id, status="failed", error=str(e))
+        finally:
+            db.session.remove()
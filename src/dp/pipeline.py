@@ -0,0 +1,572 @@
+import logging
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from .mechanisms import privatize_numeric, privatize_categorical, numeric_noise_scale
+from .plots import HIST_BINS, histogram_summary, numeric_summary, categorical_summary, save_histograms
+from .datasets import dataset_cache, find_upload
+from .releases import VALUE_COLUMN, ReleaseBusy
+from .storage import UPLOAD_FOLDER, OUTPUT_FOLDER, PLOT_FOLDER, upload_store, output_store, plot_store
+from ..utils.timing import stage
+from .formats import (OUTPUT_EXTENSIONS, FormatError, TableWriter, check_output, output_filename,
+                      read_column_names, read_table, to_arrow_column)
+
+logger = logging.getLogger(__name__)
+
+
+def privatize_column_series(series, mechanism, epsilon, delta, auto=False, counts=None):
+    # The privatized column, or PrivatizationError: a column is never handed
+    # back raw, callers report it as failed and publish it empty instead
+    logger.debug("Privatizing column: %s, mechanism=%s, auto=%s", series.name, mechanism, auto)
+
+    # Auto-detect column type
+    if auto:
+        with stage("detect"):
+            try_numeric = pd.to_numeric(series, errors="coerce")  # don’t cast to str first
+            numeric_fraction = try_numeric.notna().sum() / max(1, len(series))
+        logger.debug("%s numeric fraction: %.2f", series.name, numeric_fraction)
+
+        if numeric_fraction >= 0.8:
+            mechanism = "laplace"
+            series = try_numeric
+        else:
+            mechanism = "exponential"
+
+    # Numeric Columns
+    if mechanism in ["laplace", "gaussian"]:
+        numeric_series = pd.to_numeric(series, errors="coerce")
+        if numeric_series.notna().sum() == 0:
+            raise PrivatizationError(f"{series.name} has no numeric values for the {mechanism} mechanism")
+        try:
+            # Whole column in one vectorized draw; NaN cells are left untouched
+            with stage("noise"):
+                return privatize_numeric(numeric_series, mechanism, epsilon, delta, sensitivity=1)
+        except Exception as e:
+            raise PrivatizationError(f"Numeric privatization failed for {series.name}: {e}") from e
+
+    # Categorical / String Columns
+    if series.dropna().empty:
+        raise PrivatizationError(f"{series.name} has no values to sample from")
+    try:
+        # One shared selection distribution, all rows sampled in a single pass
+        # (counts come from a first pass over the whole file in streaming mode)
+        with stage("noise"):
+            return privatize_categorical(series, epsilon, counts=counts, sensitivity=1)
+    except Exception as e:
+        raise PrivatizationError(f"Exponential privatization failed for {series.name}: {e}") from e
+
+
+class AnalysisError(Exception):
+    pass
+
+
+class PrivatizationError(ValueError):
+    pass
+
+
+def select_columns(all_columns, scope, columns):
+    # Columns an analysis will privatize (and therefore release)
+    if scope == "whole_file":
+        selected = all_columns
+    else:
+        selected = columns if columns else all_columns[:1]
+    return [col for col in selected if col in all_columns]
+
+
+def release_columns(input_path, input_format, scope, columns):
+    # Same selection from the header alone, before any data is read
+    try:
+        return select_columns(read_column_names(input_path, input_format), scope, columns)
+    except Exception as e:
+        raise AnalysisError(f"Failed to read {input_format} header: {e}")
+
+
+def load_dataset(input_path, content_hash=None):
+    df = dataset_cache.get(content_hash) if content_hash else None
+    if df is not None:
+        return df
+    try:
+        df = pd.read_csv(input_path)
+    except Exception as e:
+        raise AnalysisError(f"Failed to read CSV: {e}")
+    if content_hash:
+        dataset_cache.put(content_hash, df)
+    return df
+
+
+def load_dataset_columns(content_hash, columns=None):
+    # An earlier upload by content hash; Arrow inputs only convert `columns` (None: all)
+    found = find_upload(upload_store, content_hash, OUTPUT_EXTENSIONS)
+    if not found:
+        raise AnalysisError("Dataset not found")
+    path, fmt = found
+    if fmt == "csv":
+        with stage("parse"):
+            return load_dataset(path, content_hash)
+    try:
+        with stage("parse"):
+            table = read_table(path, fmt)
+    except Exception as e:
+        raise AnalysisError(f"Failed to read {fmt} file: {e}")
+    if columns is not None:
+        table = table.select([col for col in columns if col in table.column_names])
+    return table.to_pandas()
+
+
+def process_column(series, mechanism, epsilon, delta, auto):
+    # Per-column unit of work; runs in the parent or in a column pool worker
+    new_series = privatize_column_series(series, mechanism, epsilon, delta, auto=auto)
+    try:
+        with stage("histogram"):
+            summary = histogram_summary(series, new_series)
+    except Exception as e:
+        logger.error("Histogram failed for %s: %s", series.name, e)
+        summary = None
+    return new_series, summary
+
+
+# Process pool for whole_file scope: privatization and histogramming hold the
+# GIL, so columns go to separate processes. Workers come from a forkserver,
+# never forked from this (threaded) process. A pool that broke (a worker
+# died) is discarded and the next call starts a new one.
+_column_pool = None
+_column_pool_workers = 0
+
+
+def get_column_pool(workers):
+    global _column_pool, _column_pool_workers
+    if _column_pool is None or _column_pool_workers != workers:
+        discard_column_pool()
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])  # workers start with pandas/diffprivlib loaded
+        _column_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        _column_pool_workers = workers
+    return _column_pool
+
+
+def discard_column_pool():
+    global _column_pool
+    if _column_pool is not None:
+        _column_pool.shutdown(wait=False)
+        _column_pool = None
+
+
+def process_columns(df, cols, mechanism, epsilon, delta, auto, workers=1, progress=None):
+    # Returns [(col, new_series, histogram, error)] in the order of cols. A column
+    # that raises is reported with its error and does not affect the others.
+    results = {}
+
+    def finish(col, outcome):
+        results[col] = outcome
+        if progress:
+            progress(len(results), len(cols))
+
+    if workers > 1 and len(cols) > 1:
+        pool = get_column_pool(workers)
+        broken = False
+        futures = {}
+        for col in cols:
+            try:
+                futures[pool.submit(process_column, df[col], mechanism, epsilon, delta, auto)] = col
+            except Exception as e:
+                broken = broken or isinstance(e, BrokenProcessPool)
+                finish(col, (None, False, str(e)))
+        for future in as_completed(futures):
+            col = futures[future]
+            try:
+                new_series, summary = future.result()
+                finish(col, (new_series, summary, None))
+            except Exception as e:
+                broken = broken or isinstance(e, BrokenProcessPool)
+                logger.error("Column worker failed for %s: %s", col, e)
+                finish(col, (None, False, str(e) or type(e).__name__))
+        if broken:
+            discard_column_pool()
+    else:
+        for col in cols:
+            try:
+                new_series, summary = process_column(df[col], mechanism, epsilon, delta, auto)
+                finish(col, (new_series, summary, None))
+            except Exception as e:
+                logger.error("Privatization failed for %s: %s", col, e)
+                finish(col, (None, False, str(e) or type(e).__name__))
+
+    return [(col, *results[col]) for col in cols]
+
+
+def run_analysis(input_path, file_id, mechanism="laplace", epsilon=1.0, delta=1e-5,
+                 scope="single_column", columns=None, workers=1, stream=False, chunksize=None,
+                 content_hash=None, input_format="csv", output_format="csv", compression=None,
+                 progress=None, releases=None, charged_columns=None):
+    # Whole /dp/analyze pipeline minus the HTTP bits, so it can run inside a
+    # request or in a background job. progress(done, total) is called per column.
+    # With a ReleaseCache, columns already released for this content hash and
+    # these parameters are reused instead of sampled again. charged_columns
+    # are the ones the privacy budget was charged for; any other column must
+    # come from a release.
+    try:
+        check_output(output_format, compression)
+    except FormatError as e:
+        raise AnalysisError(str(e))
+    output_path = output_store.path(file_id, output_filename(file_id, output_format, compression))
+
+    if stream and input_format != "csv":
+        # Parquet/Arrow inputs are read whole; never pretend to stream them
+        raise AnalysisError("stream=true is only supported for CSV input")
+    if stream:
+        result = run_streaming_analysis(input_path, file_id, mechanism, epsilon, delta, scope, columns,
+                                        chunksize=chunksize or STREAM_CHUNKSIZE, progress=progress,
+                                        output_path=output_path, output_format=output_format,
+                                        compression=compression, content_hash=content_hash,
+                                        releases=releases, charged_columns=charged_columns)
+        return {**result, "content_hash": content_hash, "output_format": output_format}
+
+    # Parquet/Arrow inputs stay an Arrow table; only the privatized columns
+    # are turned into pandas, the rest is written back untouched.
+    table = None
+    if input_format == "csv":
+        with stage("parse"):
+            df = load_dataset(input_path, content_hash)
+        all_columns = df.columns.tolist()
+    else:
+        try:
+            with stage("parse"):
+                table = read_table(input_path, input_format)
+        except Exception as e:
+            raise AnalysisError(f"Failed to read {input_format} file: {e}")
+        all_columns = table.column_names
+
+    cols_to_priv = select_columns(all_columns, scope, columns)
+    if scope == "whole_file":
+        auto = True   # force auto mechanism per column
+    else:
+        auto = False  # use selected mechanism from frontend
+        workers = 1
+    if table is not None:
+        df = table.select(cols_to_priv).to_pandas()
+
+    cols_processed = []
+    cols_failed = {}
+    histograms = {}
+    privatized = {}
+    keys, reused = claim_releases(releases, content_hash, file_id, cols_to_priv, mechanism, epsilon, delta, auto,
+                                  charged_columns)
+    pending = {keys[col] for col in cols_to_priv if col in keys and keys[col] not in reused}
+    try:
+        with stage("releases"):
+            outcomes = {}
+            for col in cols_to_priv:
+                row = reused.get(keys.get(col))
+                if row is not None:
+                    outcomes[col] = (releases.load(row, index=df.index), releases.summary(row), None)
+        fresh = [col for col in cols_to_priv if col not in outcomes]
+        if progress:
+            progress(0, len(fresh))
+
+        with stage("privatize"):
+            for col, *outcome in process_columns(df, fresh, mechanism, epsilon, delta, auto,
+                                                 workers=workers, progress=progress):
+                outcomes[col] = tuple(outcome)
+        for col in cols_to_priv:
+            new_series, summary, error = outcomes[col]
+            if error is not None:
+                # Never publish the raw values of a column that failed to privatize
+                privatized[col] = pd.Series(None, index=df.index, dtype=object)
+                cols_failed[col] = error
+                continue
+            privatized[col] = new_series
+            cols_processed.append(col)
+            if summary is not None:
+                histograms[col] = summary
+
+        if table is not None:
+            for col, series in privatized.items():
+                table = table.set_column(table.column_names.index(col), col, to_arrow_column(series))
+            output = table
+        else:
+            output = df.copy()
+            for col, series in privatized.items():
+                output[col] = series
+
+        with stage("write"), TableWriter(output_path, output_format, compression) as writer:
+            writer.write(output)
+        with stage("save_histograms"):
+            save_histograms(plot_store, file_id, histograms)
+
+        # Only columns a mechanism actually produced are published; failed
+        # ones are written empty above and their claims are abandoned below
+        with stage("releases"):
+            for col in cols_processed:
+                key = keys.get(col)
+                if key in pending and publish_release(releases, key, histograms.get(col),
+                                                      lambda: releases.write_series(key, privatized[col])):
+                    pending.discard(key)
+    finally:
+        # Failed columns (and everything, on an error) are left for a later run
+        if pending:
+            releases.abandon(pending)
+    if releases is not None and keys:
+        releases.evict()
+
+    return {"file_id": file_id, "content_hash": content_hash, "output_format": output_format,
+            "rows": len(df), "columns_processed": cols_processed, "columns_failed": cols_failed,
+            "columns_reused": [col for col in cols_processed if keys.get(col) in reused],
+            "plots": list(histograms)}
+
+
+def claim_releases(releases, content_hash, file_id, cols, mechanism, epsilon, delta, auto, charged_columns=None):
+    # ({col: key}, {key: DPRelease} already published). Every key that is not
+    # published yet is claimed for this run; ReleaseBusy if another run holds it.
+    if releases is None or not releases.enabled or not content_hash:
+        return {}, {}
+    keys = releases.keys(content_hash, cols, mechanism, epsilon, delta, auto=auto)
+    reused = releases.lookup(keys.values())
+    if charged_columns is not None:
+        uncharged = [col for col, key in keys.items() if key not in reused and col not in charged_columns]
+        if uncharged:
+            # Evicted between charging and running; never sample without charging
+            raise ReleaseBusy(f"Cached release of {', '.join(uncharged)} expired; retry the request")
+    releases.claim({key: col for col, key in keys.items() if key not in reused}, file_id,
+                   content_hash=content_hash, mechanism=releases.mechanism(mechanism, auto),
+                   epsilon=epsilon, delta=delta)
+    return keys, reused
+
+
+def publish_release(releases, key, summary, write):
+    # write() stores the values and returns their temp path. The output was
+    # already written, so a release that cannot be stored is only logged.
+    tmp_path = None
+    try:
+        tmp_path = write()
+        releases.publish(key, tmp_path, summary)
+        return True
+    except Exception as e:
+        logger.warning("Could not store release %s: %s", key[:12], e)
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+# Streaming mode: the CSV is read twice in chunks of `chunksize` rows, so peak
+# memory is bounded by the chunk size (plus the category counts the exponential
+# mechanism needs) instead of ~3x the file.
+#   pass 1: per-column numeric fraction (auto type detection), numeric range
+#           and category counts
+#   pass 2: privatize each chunk with those whole-file statistics and append
+#           it to the output; histogram counts are accumulated as it goes
+# Cells are read as strings so every chunk parses the same way and columns
+# that are not privatized are written back unchanged.
+STREAM_CHUNKSIZE = 100_000
+# Counts of likely-numeric columns are dropped past this many distinct values
+# and recomputed only if the column turns out to be categorical after all.
+STREAM_MAX_TRACKED_CATEGORIES = 50_000
+
+
+def _read_chunks(input_path, chunksize, usecols=None):
+    return pd.read_csv(input_path, chunksize=chunksize, dtype=str, usecols=usecols)
+
+
+def _collect_column_stats(input_path, cols, chunksize):
+    stats = {col: {"rows": 0, "nulls": 0, "numeric": 0, "min": np.inf, "max": -np.inf, "counts": Counter()}
+             for col in cols}
+    for chunk in _read_chunks(input_path, chunksize, usecols=cols):
+        for col in cols:
+            st = stats[col]
+            values = chunk[col]
+            numeric = pd.to_numeric(values, errors="coerce")
+            st["rows"] += len(values)
+            st["nulls"] += int(values.isna().sum())
+            st["numeric"] += int(numeric.notna().sum())
+            if numeric.notna().any():
+                st["min"] = min(st["min"], float(numeric.min()))
+                st["max"] = max(st["max"], float(numeric.max()))
+            if st["counts"] is not None:
+                st["counts"].update(values.value_counts(dropna=True).to_dict())
+                if len(st["counts"]) > STREAM_MAX_TRACKED_CATEGORIES and st["numeric"] >= 0.8 * st["rows"]:
+                    st["counts"] = None
+    return stats
+
+
+def _count_categories(input_path, cols, chunksize):
+    counts = {col: Counter() for col in cols}
+    for chunk in _read_chunks(input_path, chunksize, usecols=cols):
+        for col in cols:
+            counts[col].update(chunk[col].value_counts(dropna=True).to_dict())
+    return counts
+
+
+def _as_value_counts(counter):
+    return pd.Series(counter, dtype="int64").sort_values(ascending=False, kind="stable")
+
+
+def run_streaming_analysis(input_path, file_id, mechanism, epsilon, delta, scope, columns,
+                           chunksize=STREAM_CHUNKSIZE, progress=None, output_path=None,
+                           output_format="csv", compression=None, content_hash=None, releases=None,
+                           charged_columns=None):
+    try:
+        header = pd.read_csv(input_path, nrows=0).columns.tolist()
+    except Exception as e:
+        raise AnalysisError(f"Failed to read CSV: {e}")
+
+    cols_to_priv = select_columns(header, scope, columns)
+    keys, reused = claim_releases(releases, content_hash, file_id, cols_to_priv, mechanism, epsilon, delta,
+                                  scope == "whole_file", charged_columns)
+    pending = {keys[col] for col in cols_to_priv if col in keys and keys[col] not in reused}
+    writers = {}
+    try:
+        result = _stream_columns(input_path, file_id, mechanism, epsilon, delta, scope, header, cols_to_priv,
+                                 chunksize, progress, output_path, output_format, compression,
+                                 keys, reused, pending, releases, writers)
+    finally:
+        for writer in writers.values():
+            writer.close()
+            if os.path.exists(writer.path):
+                os.remove(writer.path)
+        if pending:
+            releases.abandon(pending)
+    if keys:
+        releases.evict()
+    return result
+
+
+def _stream_columns(input_path, file_id, mechanism, epsilon, delta, scope, header, cols_to_priv,
+                    chunksize, progress, output_path, output_format, compression,
+                    keys, reused, pending, releases, writers):
+    # Reused columns are read back from their release; the others go through
+    # both passes and are written to a new release alongside the output.
+    copied = {col: releases.open(reused[keys[col]]) for col in cols_to_priv if keys.get(col) in reused}
+    fresh = [col for col in cols_to_priv if col not in copied]
+    if progress:
+        progress(0, len(fresh))
+
+    # Pass 1: whole-file statistics
+    try:
+        with stage("stats_pass"):
+            stats = _collect_column_stats(input_path, fresh, chunksize) if fresh else {}
+    except Exception as e:
+        raise AnalysisError(f"Failed to read CSV: {e}")
+
+    plans = {}
+    for col in fresh:
+        st = stats[col]
+        col_mechanism = mechanism
+        if scope == "whole_file":
+            numeric_fraction = st["numeric"] / max(1, st["rows"])
+            col_mechanism = "laplace" if numeric_fraction >= 0.8 else "exponential"
+        plans[col] = {"mechanism": col_mechanism, "counts": st["counts"]}
+
+    recount = [col for col, plan in plans.items()
+               if plan["mechanism"] not in ("laplace", "gaussian") and plan["counts"] is None]
+    if recount:
+        with stage("stats_pass"):
+            recounted = _count_categories(input_path, recount, chunksize)
+        for col, counter in recounted.items():
+            plans[col]["counts"] = counter
+
+    # Every chunk of a column goes through the same mechanism with the same
+    # whole-file parameters. A column the mechanism cannot take (no numeric
+    # values, nothing to sample from, invalid parameters) fails as a whole:
+    # it is written empty and never released.
+    cols_failed = {}
+    for col, plan in plans.items():
+        st = stats[col]
+        try:
+            if plan["mechanism"] in ("laplace", "gaussian"):
+                plan["counts"] = None
+                if st["numeric"] == 0:
+                    raise PrivatizationError(f"{col} has no numeric values for the {plan['mechanism']} mechanism")
+                margin = 3 * numeric_noise_scale(plan["mechanism"], epsilon, delta)
+                edges = np.linspace(st["min"] - margin, st["max"] + margin, HIST_BINS + 1)
+                plan["summary"] = {"kind": "numeric", "edges": edges,
+                                   "original": np.zeros(HIST_BINS), "privatized": np.zeros(HIST_BINS)}
+            else:
+                plan["counts"] = _as_value_counts(plan["counts"])
+                if plan["counts"].empty:
+                    raise PrivatizationError(f"{col} has no values to sample from")
+                privatize_categorical(pd.Series(plan["counts"].index[:1]), epsilon, counts=plan["counts"])
+                original = plan["counts"].copy()
+                if st["nulls"]:
+                    original["NULL"] = original.get("NULL", 0) + st["nulls"]
+                plan["summary"] = {"kind": "categorical", "original": original, "privatized": Counter()}
+        except Exception as e:
+            logger.error("Privatization failed for %s: %s", col, e)
+            cols_failed[col] = str(e) or type(e).__name__
+    planned = [col for col in fresh if col not in cols_failed]
+
+    # Pass 2: privatize chunk by chunk, appending to the output. The schema is
+    # fixed up front so every chunk (even an all-empty one) writes the same types.
+    if output_path is None:
+        output_path = output_store.path(file_id, output_filename(file_id, output_format, compression))
+    numeric_cols = {col for col in planned if plans[col]["summary"]["kind"] == "numeric"}
+    numeric_cols.update(col for col, values in copied.items() if pa.types.is_floating(values.type))
+    schema = pa.schema([(col, pa.float64() if col in numeric_cols else pa.string()) for col in header])
+    for col in planned:
+        if col in keys:
+            writers[col] = releases.writer(keys[col], schema.field(col).type)
+    rows = 0
+    with stage("privatize_pass"), TableWriter(output_path, output_format, compression, schema=schema) as writer:
+        for chunk in _read_chunks(input_path, chunksize):
+            offset, rows = rows, rows + len(chunk)
+            for col, values in copied.items():
+                chunk[col] = values.slice(offset, len(chunk)).to_numpy(zero_copy_only=False)
+            for col in cols_failed:
+                chunk[col] = None
+            for col in planned:
+                plan = plans[col]
+                orig = chunk[col]
+                with stage("noise"):
+                    if plan["mechanism"] in ("laplace", "gaussian"):
+                        # Cells that are not numbers become missing, never raw strings
+                        new = privatize_numeric(orig, plan["mechanism"], epsilon, delta, sensitivity=1)
+                    else:
+                        new = privatize_categorical(orig, epsilon, counts=plan["counts"], sensitivity=1)
+                chunk[col] = new
+                if col in writers:
+                    writers[col].write(pd.DataFrame({VALUE_COLUMN: new}))
+
+                summary = plan["summary"]
+                if summary["kind"] == "numeric":
+                    edges = summary["edges"]
+                    for key, values in (("original", orig), ("privatized", new)):
+                        values = pd.to_numeric(values, errors="coerce").dropna().to_numpy()
+                        summary[key] += np.histogram(np.clip(values, edges[0], edges[-1]), bins=edges)[0]
+                else:
+                    summary["privatized"].update(new.fillna("NULL").value_counts().to_dict())
+            writer.write(chunk)
+
+    histograms = {}
+    for col in cols_to_priv:
+        if col in copied:
+            summary = releases.summary(reused[keys[col]])
+            if summary is not None:
+                histograms[col] = summary
+    for done, col in enumerate(fresh, start=1):
+        summary = plans[col].get("summary")
+        if summary is not None and summary["kind"] == "numeric":
+            histograms[col] = numeric_summary(summary["edges"], summary["original"], summary["privatized"])
+        elif summary is not None:
+            histograms[col] = categorical_summary(summary["original"],
+                                                  pd.Series(summary["privatized"], dtype="int64"))
+        if progress:
+            progress(done, len(fresh))
+    with stage("save_histograms"):
+        save_histograms(plot_store, file_id, histograms)
+
+    with stage("releases"):
+        for col in list(writers):
+            release_writer = writers.pop(col)
+
+            def finish(w=release_writer):
+                w.close()
+                return w.path
+            if publish_release(releases, keys[col], histograms.get(col), finish):
+                pending.discard(keys[col])
+
+    return {"file_id": file_id, "rows": rows,
+            "columns_processed": [col for col in cols_to_priv if col not in cols_failed],
+            "columns_failed": cols_failed, "columns_reused": list(copied), "plots": list(histograms)}
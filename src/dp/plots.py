@@ -0,0 +1,131 @@
+import io
+import json
+import os
+import uuid
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from ..utils.timing import stage
+
+# /dp/analyze only stores compact histogram data per column; PNGs are drawn on
+# first request with the object-oriented Figure API (no pyplot global state,
+# safe to call from any thread) and cached next to the data.
+HIST_BINS = 30
+HIST_MAX_CATEGORIES = 100
+OTHER_CATEGORY = "(other)"
+
+
+def _numeric_values(series):
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+    return values[np.isfinite(values)]
+
+
+def numeric_summary(edges, orig_counts, priv_counts):
+    return {
+        "kind": "numeric",
+        "edges": [float(e) for e in edges],
+        "original": [int(c) for c in orig_counts],
+        "privatized": [int(c) for c in priv_counts],
+    }
+
+
+def categorical_summary(orig_counts, priv_counts):
+    # orig_counts/priv_counts: pd.Series of counts indexed by category ("NULL"
+    # for missing). Only the most frequent categories are kept, the rest are
+    # folded into one bucket so the stored data stays small for free-text columns.
+    both = pd.concat([orig_counts, priv_counts], axis=1, keys=["original", "privatized"]).fillna(0)
+    both.index = both.index.map(str)
+    both = both.groupby(level=0, sort=False).sum()
+    if len(both) > HIST_MAX_CATEGORIES:
+        both = both.sort_values("original", ascending=False, kind="stable")
+        rest = both.iloc[HIST_MAX_CATEGORIES - 1:].sum()
+        both = both.iloc[:HIST_MAX_CATEGORIES - 1]
+        both.loc[OTHER_CATEGORY] = rest
+    return {
+        "kind": "categorical",
+        "categories": both.index.tolist(),
+        "original": both["original"].astype(int).tolist(),
+        "privatized": both["privatized"].astype(int).tolist(),
+    }
+
+
+def histogram_summary(orig_series, priv_series):
+    if pd.api.types.is_numeric_dtype(orig_series):
+        orig = _numeric_values(orig_series)
+        priv = _numeric_values(priv_series)
+        both = np.concatenate([orig, priv])
+        if not len(both):
+            return None
+        edges = np.histogram_bin_edges(both, bins=HIST_BINS)
+        return numeric_summary(edges, np.histogram(orig, edges)[0], np.histogram(priv, edges)[0])
+
+    return categorical_summary(orig_series.fillna("NULL").value_counts(),
+                               priv_series.fillna("NULL").value_counts())
+
+
+def _hist_name(file_id):
+    return f"{file_id}.hist.json"
+
+
+def save_histograms(store, file_id, summaries):
+    with open(store.path(file_id, _hist_name(file_id)), "w") as f:
+        json.dump(summaries, f)
+
+
+def has_histograms(store, file_id):
+    return store.find(file_id, _hist_name(file_id), touch=False) is not None
+
+
+def load_histogram(store, file_id, column_name):
+    path = store.find(file_id, _hist_name(file_id))
+    if path is None:
+        return None
+    with open(path) as f:
+        return json.load(f).get(column_name)
+
+
+def render_histogram(summary, column_name):
+    if summary["kind"] == "numeric":
+        fig = Figure(figsize=(6, 4))
+        ax = fig.subplots()
+        edges = np.asarray(summary["edges"])
+        ax.stairs(summary["original"], edges, fill=True, alpha=0.5, label="original")
+        ax.stairs(summary["privatized"], edges, fill=True, alpha=0.5, label="privatized")
+        ax.legend()
+        ax.set_title(f"{column_name}: original vs privatized")
+    else:
+        fig = Figure(figsize=(8, 4))
+        ax = fig.subplots()
+        x = np.arange(len(summary["categories"]))
+        ax.bar(x - 0.2, summary["original"], width=0.4, label="original")
+        ax.bar(x + 0.2, summary["privatized"], width=0.4, label="privatized")
+        ax.set_xticks(x, summary["categories"], rotation=90)
+        ax.legend()
+        ax.set_title(f"{column_name}: original vs privatized (all categories)")
+
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+def cached_plot(store, file_id, column_name):
+    # Path of the rendered PNG, drawing and caching it on first use.
+    # Returns None when the analysis stored no histogram for the column.
+    name = f"{file_id}_{column_name}.png"
+    plot_path = store.find(file_id, name)
+    if plot_path:
+        return plot_path
+
+    summary = load_histogram(store, file_id, column_name)
+    if summary is None:
+        return None
+    plot_path = store.path(file_id, name)
+
+    with stage("render"):
+        png = render_histogram(summary, column_name)
+    tmp_path = f"{plot_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(png)
+    os.replace(tmp_path, plot_path)
+    return plot_path
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from ..models import db, DPRelease
+from .storage import BASE_DIR, ArtifactStore
+
+# Published DP releases, one per (dataset content hash, column, mechanism,
+# epsilon, delta). Asking again for a release that was already published
+# returns the same noisy column and histogram instead of drawing new noise:
+# fresh noise costs CPU and would let repeated queries be averaged until the
+# noise cancels out. Serving a stored release is post-processing, so it is
+# not charged to the privacy budget again.
+#
+# The noisy column is kept as an Arrow file (sharded like the other
+# artifacts) and its DPRelease row holds the key, histogram and LRU clock.
+# Before computing, a request claims each missing key with a "pending" row;
+# the unique key means only one request ever samples a given release, and a
+# second one asking while it is being computed gets ReleaseBusy rather than
+# drawing its own. Past max_bytes the least recently used releases are
+# deleted, but never one used within min_age seconds. pyarrow is only
+# imported by the methods that read or write the files.
+RELEASE_FOLDER = os.path.join(BASE_DIR, "cache", "releases")
+VALUE_COLUMN = "value"
+STALE_CLAIM = timedelta(hours=1)  # pending rows left behind by a crashed worker
+
+
+class ReleaseBusy(Exception):
+    pass
+
+
+def release_key(content_hash, column, mechanism, epsilon, delta):
+    # Exact float reprs: a release is only reused for the very same parameters
+    canonical = json.dumps([content_hash, column, mechanism, repr(float(epsilon)), repr(float(delta))])
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ReleaseCache:
+
+    def __init__(self, folder, max_bytes=1024 * 1024 * 1024, min_age=300.0):
+        self.store = ArtifactStore(folder)
+        self.max_bytes = max_bytes  # 0 disables reuse entirely
+        self.min_age = min_age
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def mechanism(mechanism, auto):
+        # whole_file scope picks the mechanism per column
+        return "auto" if auto else mechanism
+
+    def keys(self, content_hash, columns, mechanism, epsilon, delta, auto=False):
+        mechanism = self.mechanism(mechanism, auto)
+        return {col: release_key(content_hash, col, mechanism, epsilon, delta) for col in columns}
+
+    def lookup(self, keys, touch=True, count=True):
+        # {key: DPRelease} for the published ones among keys. Touching keeps
+        # them from being evicted for min_age; count records a reuse.
+        if not keys:
+            return {}
+        rows = DPRelease.query.filter(DPRelease.key.in_(list(keys)), DPRelease.status == "ready").all()
+        found = {}
+        for row in rows:
+            if self.store.find(row.key, f"{row.key}.arrow", touch=False):
+                found[row.key] = row
+        if touch and found:
+            now = datetime.utcnow()
+            for row in found.values():
+                row.last_used_at = now
+                if count:
+                    row.hits = (row.hits or 0) + 1
+            db.session.commit()
+        return found
+
+    def claim(self, keys, file_id, **fields):
+        # Pending rows for keys (dict key -> column); all or nothing
+        now = datetime.utcnow()
+        claimed = []
+        try:
+            for key, column in keys.items():
+                existing = DPRelease.query.filter_by(key=key).first()
+                if existing is not None and self._dead(existing, now):
+                    db.session.delete(existing)
+                    db.session.flush()
+                db.session.add(DPRelease(key=key, column=column, file_id=file_id, status="pending",
+                                         created_at=now, last_used_at=now, **fields))
+                db.session.flush()
+                claimed.append(key)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            raise ReleaseBusy("An identical release is being computed right now; retry shortly")
+        return claimed
+
+    def _dead(self, row, now):
+        # A claim whose worker died, or a release whose file is gone
+        if row.status == "pending":
+            return row.created_at < now - STALE_CLAIM
+        return self.store.find(row.key, f"{row.key}.arrow", touch=False) is None
+
+    def abandon(self, keys):
+        if keys:
+            DPRelease.query.filter(DPRelease.key.in_(list(keys)), DPRelease.status == "pending") \
+                .delete(synchronize_session=False)
+            db.session.commit()
+
+    def writer(self, key, field_type):
+        # Chunk-by-chunk writer for a release's values; publish() makes it visible
+        import pyarrow as pa
+        from .formats import TableWriter
+
+        path = self.store.path(key, f".{key}.{uuid.uuid4().hex}.tmp")
+        return TableWriter(path, "arrow", schema=pa.schema([(VALUE_COLUMN, field_type)]))
+
+    def write_series(self, key, series):
+        import pyarrow as pa
+        from .formats import to_arrow_column
+
+        values = to_arrow_column(series)
+        with self.writer(key, values.type) as writer:
+            writer.write(pa.table({VALUE_COLUMN: values}))
+        return writer.path
+
+    def publish(self, key, tmp_path, summary):
+        path = self.store.path(key, f"{key}.arrow")
+        os.replace(tmp_path, path)
+        try:
+            row = DPRelease.query.filter_by(key=key).one()
+            row.status = "ready"
+            row.summary = json.dumps(summary) if summary is not None else None
+            row.size_bytes = os.path.getsize(path)
+            row.last_used_at = datetime.utcnow()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            os.remove(path)
+            raise
+
+    def retract(self, file_id):
+        # Drops the releases file_id published. False (nothing dropped) if
+        # another run already reused one of them.
+        rows = DPRelease.query.filter_by(file_id=file_id, status="ready").all()
+        if any(row.hits for row in rows):
+            return False
+        for row in rows:
+            path = self.store.find(row.key, f"{row.key}.arrow", touch=False)
+            if path:
+                os.remove(path)
+            db.session.delete(row)
+        db.session.commit()
+        return True
+
+    def open(self, row):
+        # The published values as a memory-mapped Arrow column
+        from .formats import read_table
+
+        return read_table(self.store.find(row.key, f"{row.key}.arrow"), "arrow").column(VALUE_COLUMN)
+
+    def load(self, row, index=None):
+        series = self.open(row).to_pandas()
+        if index is not None:
+            series.index = index
+        series.name = row.column
+        return series
+
+    @staticmethod
+    def summary(row):
+        return json.loads(row.summary) if row.summary else None
+
+    def evict(self):
+        total = db.session.scalar(select(func.coalesce(func.sum(DPRelease.size_bytes), 0))
+                                  .where(DPRelease.status == "ready"))
+        if total <= self.max_bytes:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(seconds=self.min_age)
+        removed = 0
+        rows = DPRelease.query.filter(DPRelease.status == "ready", DPRelease.last_used_at < cutoff) \
+            .order_by(DPRelease.last_used_at).all()
+        for row in rows:
+            if total <= self.max_bytes:
+                break
+            path = self.store.find(row.key, f"{row.key}.arrow", touch=False)
+            if path:
+                os.remove(path)
+            total -= row.size_bytes or 0
+            db.session.delete(row)
+            removed += 1
+        db.session.commit()
+        return removed
+
+    def stats(self):
+        count, size, hits = db.session.execute(
+            select(func.count(DPRelease.id), func.coalesce(func.sum(DPRelease.size_bytes), 0),
+                   func.coalesce(func.sum(DPRelease.hits), 0)).where(DPRelease.status == "ready")
+        ).one()
+        return {"releases": count, "bytes": size, "max_bytes": self.max_bytes, "hits": hits}
+
+
+# max_bytes is set from DP_RELEASE_CACHE_MAX_BYTES
+release_cache = ReleaseCache(RELEASE_FOLDER)
@@ -1,203 +1,463 @@
-from flask import Blueprint, request, jsonify, send_file, url_for
-import pandas as pd
+import click
+from flask import Blueprint, request, jsonify, send_file, url_for, current_app
 import os, uuid
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-from diffprivlib.mechanisms import Laplace, Gaussian, Exponential
+from ..auth.tokens import current_claims
+from ..models import db
+from .budget import BudgetExceeded, get_accountant
+from .datasets import dataset_cache, save_upload, stats_cache
+from .jobs import submit_job, record_finished, get_job, refund_failed
+from .releases import ReleaseBusy, release_cache
+from .storage import upload_store, output_store, plot_store, artifact_janitor
+from ..utils.metrics import record_analysis
+from ..utils.timing import stage
 
 dp_bp = Blueprint("dp", __name__)
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))  # backend/
-UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
-OUTPUT_FOLDER = os.path.join(BASE_DIR, "outputs")
-PLOT_FOLDER = os.path.join(BASE_DIR, "plots")
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-os.makedirs(PLOT_FOLDER, exist_ok=True)
+# pandas, pyarrow (.formats), numpy, diffprivlib (scikit-learn, scipy) and
+# matplotlib are only imported by the views that need them, so workers serving auth/audit traffic
+# start without them. Under gunicorn they are preloaded once in the master
+# (see gunicorn.conf.py) and shared by the forked workers.
 
 
-def privatize_column_series(series, mechanism, epsilon, delta, auto=False):
-    print(f"[DEBUG] Privatizing column: {series.name}, mechanism={mechanism}, auto={auto}")
+@dp_bp.record_once
+def configure(state):
+    dataset_cache.max_bytes = state.app.config.get("DP_DATASET_CACHE_MAX_BYTES", dataset_cache.max_bytes)
+    stats_cache.max_entries = state.app.config.get("DP_STATS_CACHE_ENTRIES", stats_cache.max_entries)
+    config = state.app.config
+    upload_store.ttl = config.get("DP_UPLOAD_TTL", upload_store.ttl)
+    output_store.ttl = config.get("DP_OUTPUT_TTL", output_store.ttl)
+    plot_store.ttl = config.get("DP_PLOT_TTL", plot_store.ttl)
+    artifact_janitor.max_bytes = config.get("DP_ARTIFACT_MAX_BYTES", artifact_janitor.max_bytes)
+    artifact_janitor.interval = config.get("DP_ARTIFACT_SWEEP_INTERVAL", artifact_janitor.interval)
+    release_cache.max_bytes = config.get("DP_RELEASE_CACHE_MAX_BYTES", release_cache.max_bytes)
 
-    # uto-detect column type
-    if auto:
-        try_numeric = pd.to_numeric(series, errors="coerce")  # don’t cast to str first
-        numeric_fraction = try_numeric.notna().sum() / max(1, len(series))
-        print(f"[DEBUG] {series.name} numeric fraction: {numeric_fraction:.2f}")
 
-        if numeric_fraction >= 0.8:  
-            mechanism = "laplace"  
-            series = try_numeric
-        else:
-            mechanism = "exponential"
-
-    #Numeric Columns
-    if mechanism in ["laplace", "gaussian"]:
-        try:
-            numeric_series = pd.to_numeric(series, errors="coerce")
-            if numeric_series.notna().sum() == 0:
-                print(f"[WARN] Skipping {series.name} (no valid numeric values)")
-                return series
+@dp_bp.before_app_request
+def start_janitor():
+    artifact_janitor.ensure_thread()
 
-            if mechanism == "laplace":
-                mech = Laplace(epsilon=epsilon, sensitivity=1)
-            else:
-                mech = Gaussian(epsilon=epsilon, delta=delta, sensitivity=1)
 
-            return numeric_series.apply(lambda x: mech.randomise(float(x)) if pd.notna(x) else x)
+# `flask dp sweep`: one janitor pass, for cron or when the thread is disabled
+@dp_bp.cli.command("sweep")
+def sweep_command():
+    stats = artifact_janitor.sweep()
+    click.echo(f"Expired {stats['expired']}, evicted {stats['evicted']} artifacts; "
+               f"freed {stats['freed_bytes']} bytes, {stats['total_bytes']} bytes in use")
 
-        except Exception as e:
-            print(f"[ERROR] Numeric privatization failed for {series.name}: {e}")
-            return series
 
-    # Categorical / String Columns 
-    else:
-        categories = series.dropna().unique().tolist()
-        if not categories:
-            print(f"[WARN] Skipping {series.name} (no valid categories)")
-            return series
-        try:
-            counts = series.value_counts(dropna=True)
-            categories = counts.index.tolist()
-
-            
-            def privatize_value(x):
-                utilities = []
-                for cat in categories:
-                    if cat == x:
-                        utilities.append(max(counts.values))  
-                    else:
-                        utilities.append(counts.get(cat, 0))
-                mech = Exponential(
-                    epsilon=epsilon,
-                    sensitivity=1,
-                    utility=utilities,
-                    candidates=categories
-                )
-                return mech.randomise(None)
-
-            return series.apply(lambda x: privatize_value(x) if pd.notna(x) else x)
-
-        except Exception as e:
-            print(f"[ERROR] Exponential privatization failed for {series.name}: {e}")
-        return series
-
-
-
-def make_hist_plot(orig_series, priv_series, file_id, column_name):
-    plot_path = os.path.join(PLOT_FOLDER, f"{file_id}_{column_name}.png")
-    plt.figure(figsize=(6, 4))
-    try:
-        if pd.api.types.is_numeric_dtype(orig_series):
-            # Numeric column: overlay histograms
-            plt.hist(orig_series.dropna().astype(float), bins=30, alpha=0.5, label="original")
-            plt.hist(pd.to_numeric(priv_series.dropna(), errors="coerce").dropna(),
-                     bins=30, alpha=0.5, label="privatized")
-            plt.legend()
-            plt.title(f"{column_name}: original vs privatized")
-        else:
-            # Categorical column: show all categories
-            orig_counts = orig_series.fillna("NULL").value_counts()
-            priv_counts = priv_series.fillna("NULL").value_counts()
+def gone_or_missing(file_id, message):
+    # 410 only once the janitor has removed an artifact of a finished analysis;
+    # a queued/running job has not written it yet and a failed one never will
+    job = get_job(file_id)
+    if job and job.status == "finished":
+        return jsonify({"error": "Expired and removed from storage", "file_id": file_id}), 410
+    if job and job.status in ("queued", "running"):
+        status_url = url_for("dp.job_status", job_id=file_id)
+        return jsonify({"error": message, "status": job.status, "status_url": status_url}), 202, \
+            {"Location": status_url}
+    return jsonify({"error": message}), 404
 
-            # Include all categories from both original and privatized data
-            all_categories = list(set(orig_counts.index) | set(priv_counts.index))
-            orig_counts = orig_counts.reindex(all_categories, fill_value=0)
-            priv_counts = priv_counts.reindex(all_categories, fill_value=0)
 
-            # Create a side-by-side bar chart
-            df = pd.DataFrame({"original": orig_counts, "privatized": priv_counts})
-            df.plot(kind="bar", figsize=(8, 4))
-            plt.title(f"{column_name}: original vs privatized (all categories)")
+def request_user_id():
+    # /dp endpoints work without a token; with one, the user's budget is charged too
+    claims = current_claims()
+    return claims.get("sub") if claims else None
 
-        plt.tight_layout()
-        plt.savefig(plot_path)
-        plt.close()
-        return plot_path
 
-    except Exception as e:
-        print(f"[ERROR] Plotting failed for {column_name}: {e}")
-        plt.close()
-        return None
+def result_payload(result):
+    file_id = result["file_id"]
+    plot_urls = {}
+    histogram_urls = {}
+    for col in result["columns_processed"]:
+        if col in result["plots"]:
+            plot_urls[col] = request.host_url[:-1] + url_for("dp.plot_image", file_id=file_id, column_name=col)
+            histogram_urls[col] = url_for("dp.histogram", file_id=file_id, column_name=col)
+        else:
+            plot_urls[col] = None
+            histogram_urls[col] = None
 
+    download_url = url_for("dp.download", file_id=file_id)
+    return {
+        "file_id": file_id,
+        "dataset_id": result.get("content_hash"),
+        "output_format": result.get("output_format", "csv"),
+        "privatized_csv_url": download_url,
+        "plots": plot_urls,
+        "histograms": histogram_urls,
+        "columns_processed": result["columns_processed"],
+        "columns_failed": result.get("columns_failed", {}),
+        "columns_reused": result.get("columns_reused", [])
+    }
 
 
 # Analyze route
 @dp_bp.route("/analyze", methods=["POST"])
 def analyze():
+    from .formats import OUTPUT_EXTENSIONS, FormatError, check_output, detect_input_format
+    from .pipeline import AnalysisError, release_columns, run_analysis
+
     if "file" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
     file = request.files["file"]
-    mechanism = request.form.get("mechanism", "laplace")  # used only for single-column mode
-    epsilon = float(request.form.get("epsilon", 1.0))
-    delta = float(request.form.get("delta", 1e-5))
-    scope = request.form.get("scope", "single_column")
-    columns = request.form.getlist("columns")
-
-    file_id = str(uuid.uuid4())
-    uploaded_filename = f"{file_id}_input.csv"
-    input_path = os.path.join(UPLOAD_FOLDER, uploaded_filename)
-    file.save(input_path)
+    params = {
+        "mechanism": request.form.get("mechanism", "laplace"),  # used only for single-column mode
+        "epsilon": float(request.form.get("epsilon", 1.0)),
+        "delta": float(request.form.get("delta", 1e-5)),
+        "scope": request.form.get("scope", "single_column"),
+        "columns": request.form.getlist("columns"),
+        # Chunked two-pass mode for files too large to load at once
+        "stream": request.form.get("stream", "").lower() in ("1", "true", "yes"),
+        "chunksize": int(request.form.get("chunksize") or current_app.config.get("DP_STREAM_CHUNKSIZE", 100_000)),
+    }
+    run_async = request.values.get("async", "").lower() in ("1", "true", "yes")
 
     try:
-        df = pd.read_csv(input_path)
-    except Exception as e:
-        return jsonify({"error": f"Failed to read CSV: {e}"}), 400
+        input_format = detect_input_format(file.filename, request.form.get("input_format"))
+        params["output_format"] = request.form.get("output_format", "csv")
+        params["compression"] = request.form.get("compression") or None
+        check_output(params["output_format"], params["compression"])
+    except FormatError as e:
+        return jsonify({"error": str(e)}), 400
+    if params["stream"] and input_format != "csv":
+        return jsonify({"error": "stream=true is only supported for CSV input"}), 400
+    params["input_format"] = input_format
 
-    if scope == "whole_file":
-        cols_to_priv = df.columns.tolist()
-        auto = True   # force auto mechanism per column
+    file_id = str(uuid.uuid4())
+    # Stored once per content hash; identical uploads share the file and parsed cache
+    with stage("upload"):
+        content_hash, input_path = save_upload(file, upload_store, OUTPUT_EXTENSIONS[input_format])
+    params["content_hash"] = content_hash
+
+    # Each released column costs epsilon (sequential composition), charged to
+    # the dataset and the caller before anything runs. Columns served from an
+    # earlier identical release are post-processing and cost nothing.
+    try:
+        with stage("header"):
+            released = release_columns(input_path, input_format, params["scope"], params["columns"])
+    except AnalysisError as e:
+        return jsonify({"error": str(e)}), 400
+    if release_cache.enabled:
+        keys = release_cache.keys(content_hash, released, params["mechanism"], params["epsilon"],
+                                  params["delta"], auto=params["scope"] == "whole_file")
+        cached = release_cache.lookup(keys.values(), count=False)
+        released = [col for col in released if keys[col] not in cached]
+        params["releases"] = release_cache
+        params["charged_columns"] = released
+    uses_delta = params["scope"] != "whole_file" and params["mechanism"] == "gaussian"
+    accountant = get_accountant()
+    charge = None
+    if released:
+        try:
+            charge = accountant.charge(request_user_id(), content_hash,
+                                       params["epsilon"] * len(released),
+                                       params["delta"] * len(released) if uses_delta else 0.0,
+                                       operation="dp.analyze", reference=file_id)
+        except BudgetExceeded as e:
+            return jsonify({"error": str(e)}), 403
+
+    if run_async:
+        job = submit_job(current_app._get_current_object(), file_id, input_path, params, charge=charge)
+        status_url = url_for("dp.job_status", job_id=file_id)
+        return jsonify({
+            "job_id": file_id,
+            "status": job.status,
+            "status_url": status_url,
+            "result_url": url_for("dp.job_result", job_id=file_id)
+        }), 202, {"Location": status_url}
+
+    # Same refund rule as a failed job: whatever was written is deleted first
+    try:
+        result = run_analysis(input_path, file_id, workers=current_app.config.get("DP_COLUMN_WORKERS", 1),
+                              **params)
+        record_analysis(result)
+        record_finished(file_id, params, result)
+    except AnalysisError as e:
+        db.session.rollback()
+        refund_failed(accountant, charge, file_id)
+        return jsonify({"error": str(e)}), 400
+    except ReleaseBusy as e:
+        db.session.rollback()
+        refund_failed(accountant, charge, file_id)
+        return jsonify({"error": str(e)}), 409, {"Retry-After": "5"}
+    except Exception:
+        db.session.rollback()
+        refund_failed(accountant, charge, file_id)
+        raise
+    return jsonify(result_payload(result)), 200
+
+
+# Noisy aggregates over an earlier upload, e.g.
+# {"dataset_id": ..., "column": "MonthlyIncome", "aggregates": ["count", "mean"],
+#  "group_by": "Department", "groups": ["HR", "R&D", "Sales"], "bounds": [0, 20000], "epsilon": 0.5}
+# groups / categories (categorical histograms) are public label sets; without
+# them part of epsilon finds the labels, so rare ones are never published.
+@dp_bp.route("/aggregate", methods=["POST"])
+def aggregate():
+    from .aggregates import (DOMAIN_DELTA, HIST_BINS, AggregateError, domains_to_find, exact_stats, find_domains,
+                             group_label_counts, is_numeric_column, measures_for, noisy_release, release_payload)
+    from .mechanisms import label_counts
+    from .pipeline import AnalysisError, load_dataset_columns
+
+    data = request.get_json() or {}
+    dataset_id = data.get("dataset_id")
+    if not dataset_id and data.get("file_id"):
+        job = get_job(data["file_id"])
+        dataset_id = job.content_hash if job else None
+    column = data.get("column")
+    if not dataset_id or not column:
+        return jsonify({"error": "dataset_id (or file_id) and column required"}), 400
+
+    group_by = data.get("group_by") or None
+    aggregates = data.get("aggregates") or ["count"]
+    try:
+        epsilon = float(data.get("epsilon", current_app.config.get("DP_EPSILON", 1.0)))
+        bounds = tuple(float(b) for b in data["bounds"]) if data.get("bounds") is not None else None
+        if bounds is not None and (len(bounds) != 2 or bounds[0] > bounds[1]):
+            raise AggregateError("bounds must be [lower, upper]")
+        bins = int(data.get("bins", HIST_BINS))
+        if bins < 1:
+            raise AggregateError("bins must be at least 1")
+        measures = measures_for(aggregates)
+        if epsilon <= 0:
+            raise AggregateError("epsilon must be positive")
+        domains = {name: data.get(name) for name in ("groups", "categories")}
+        for name, labels in domains.items():
+            if labels is not None and (not isinstance(labels, list) or not labels):
+                raise AggregateError(f"{name} must be a non-empty list of labels")
+
+        # Exact statistics and label counts are computed once per dataset and
+        # query shape; only the noise (label thresholds included) is fresh
+        frame = {}
+
+        def load():
+            if "df" not in frame:
+                frame["df"] = load_dataset_columns(dataset_id, [column, group_by] if group_by else [column])
+            return frame["df"]
+
+        with stage("stats"):
+            numeric = stats_cache.get_or_compute(("numeric", dataset_id, column),
+                                                 lambda: is_numeric_column(load(), column))
+            found = domains_to_find(measures, group_by, domains["groups"], domains["categories"], numeric)
+            counts = {}
+            if "groups" in found:
+                counts["groups"] = stats_cache.get_or_compute(("labels", dataset_id, group_by),
+                                                              lambda: group_label_counts(load(), group_by))
+            if "categories" in found:
+                counts["categories"] = stats_cache.get_or_compute(("labels", dataset_id, column),
+                                                                  lambda: label_counts(load()[column]))
+            labels, domain_epsilon = find_domains(counts, found, epsilon)
+            domains.update(labels)
+            groups = tuple(domains["groups"]) if group_by else None
+            categories = tuple(domains["categories"]) if domains["categories"] is not None else None
+            key = (dataset_id, column, group_by, measures, bounds, bins, groups, categories)
+            stats = stats_cache.get_or_compute(key, lambda: exact_stats(
+                load(), column, measures, group_by, bounds, bins, groups=groups, categories=categories))
+    except AnalysisError as e:
+        return jsonify({"error": str(e)}), 404
+    except (AggregateError, ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    delta = DOMAIN_DELTA if found else 0.0
+    try:
+        get_accountant().charge(request_user_id(), dataset_id, epsilon, delta, operation="dp.aggregate")
+    except BudgetExceeded as e:
+        return jsonify({"error": str(e)}), 403
+
+    with stage("noise"):
+        noisy = noisy_release(stats, measures, epsilon - domain_epsilon, bounds)
+    payload = {
+        "dataset_id": dataset_id,
+        "column": column,
+        "group_by": group_by,
+        "epsilon": epsilon,
+        "delta": delta,
+        "domains": {name: "noisy" if name in found else "public" for name in domains if domains[name] is not None},
+        "results": release_payload(stats, noisy, aggregates, bounds),
+    }
+    if "histogram" in measures:
+        payload["bins"] = stats["bins"]
+    return jsonify(payload), 200
+
+
+# Synthetic dataset from noisy marginals, written to the normal download flow:
+# {"dataset_id": ..., "columns": [...], "pairs": [["Department", "JobRole"]],
+#  "bounds": {"MonthlyIncome": [0, 20000]}, "categories": {"Department": [...]},
+#  "epsilon": 1.0, "rows": 100000}. bounds/categories are public domains;
+# other columns spend part of epsilon on theirs. columns defaults to the ones
+# with a public domain, so identifiers are never synthesized by accident.
+# The fitted model is returned as model_id; {"model_id": ..., "rows": N}
+# samples again from it without any privacy cost.
+@dp_bp.route("/synthesize", methods=["POST"])
+def synthesize():
+    from .formats import FormatError, TableWriter, check_output, output_filename
+    from .pipeline import AnalysisError, load_dataset_columns
+    from .synthesis import (SYNTH_BINS, SYNTH_DELTA, SynthesisError, check_domains, column_kinds, default_pairs,
+                            domain_delta, fit_marginals, load_model, output_schema, save_model, write_synthetic)
+
+    data = request.get_json() or {}
+    file_id = str(uuid.uuid4())
+    model_id = data.get("model_id")
+    max_rows = current_app.config.get("DP_SYNTH_MAX_ROWS", 1_000_000)
+    try:
+        output_format = data.get("output_format", "csv")
+        compression = data.get("compression") or None
+        check_output(output_format, compression)
+        rows = int(data["rows"]) if data.get("rows") is not None else None
+        if rows is not None and not 0 <= rows <= max_rows:
+            raise SynthesisError(f"rows must be between 0 and {max_rows}")
+        epsilon = float(data.get("epsilon", current_app.config.get("DP_EPSILON", 1.0)))
+        bins = int(data.get("bins", current_app.config.get("DP_SYNTH_BINS", SYNTH_BINS)))
+        if bins < 1:
+            raise SynthesisError("bins must be at least 1")
+        delta = float(data.get("delta", SYNTH_DELTA))
+        if not 0 < delta < 1:
+            raise SynthesisError("delta must be between 0 and 1")
+        bounds = data.get("bounds") or {}
+        categories = data.get("categories") or {}
+        if not isinstance(bounds, dict) or not isinstance(categories, dict):
+            raise SynthesisError("bounds and categories map column names to domains")
+    except (SynthesisError, FormatError, ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    charge = None
+    if model_id:
+        model = load_model(output_store, model_id)
+        if model is None:
+            return gone_or_missing(model_id, "Synthesis model not found")
+        dataset_id = model["dataset_id"]
     else:
-        cols_to_priv = columns if columns else ([df.columns[0]] if len(df.columns) > 0 else [])
-        auto = False  # use selected mechanism from frontend
-
-    cols_processed = []
-    plot_urls = {}
-    privatized_df = df.copy()
-
-    for col in cols_to_priv:
-        if col not in df.columns:
-            continue
-        orig_series = df[col]
-        new_series = privatize_column_series(orig_series, mechanism, epsilon, delta, auto=auto)
-        privatized_df[col] = new_series
-        cols_processed.append(col)
-
-        plot_path = make_hist_plot(orig_series, new_series, file_id, col)
-        if plot_path:
-            plot_urls[col] = request.host_url[:-1] + url_for("dp.plot_image", file_id=file_id, column_name=col)
-        else:
-            plot_urls[col] = None
-
-    output_name = f"privatized_{file_id}.csv"
-    output_path = os.path.join(OUTPUT_FOLDER, output_name)
-    privatized_df.to_csv(output_path, index=False)
+        dataset_id = data.get("dataset_id")
+        if not dataset_id and data.get("file_id"):
+            job = get_job(data["file_id"])
+            dataset_id = job.content_hash if job else None
+        if not dataset_id:
+            return jsonify({"error": "dataset_id, file_id or model_id required"}), 400
+        columns = data.get("columns") or list(dict.fromkeys([*bounds, *categories]))
+        if not columns:
+            return jsonify({"error": "columns (or public bounds/categories) required"}), 400
+        try:
+            df = load_dataset_columns(dataset_id, columns)
+        except AnalysisError as e:
+            return jsonify({"error": str(e)}), 404
+        pairs = data["pairs"] if data.get("pairs") is not None else default_pairs(columns)
+        try:
+            check_domains(bounds, categories)
+            charged_delta = domain_delta(column_kinds(df, columns, bounds, categories), categories, delta)
+        except (SynthesisError, TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
 
-    download_url = url_for("dp.download", file_id=file_id)
+        accountant = get_accountant()
+        try:
+            charge = accountant.charge(request_user_id(), dataset_id, epsilon, charged_delta,
+                                       operation="dp.synthesize", reference=file_id)
+        except BudgetExceeded as e:
+            return jsonify({"error": str(e)}), 403
+        try:
+            with stage("marginals"):
+                model = fit_marginals(df, columns, pairs, epsilon, bins, bounds=bounds, categories=categories,
+                                      delta=delta)
+        except (SynthesisError, TypeError, ValueError) as e:
+            accountant.refund(charge)
+            return jsonify({"error": str(e)}), 400
+        model["dataset_id"] = dataset_id
+        model_id = file_id
+        save_model(output_store, model_id, model)
+
+    # Sampling only touches the model: cost grows with rows, not the input
+    rows = min(model["rows"], max_rows) if rows is None else rows
+    output_path = output_store.path(file_id, output_filename(file_id, output_format, compression))
+    with stage("sample"), TableWriter(output_path, output_format, compression, schema=output_schema(model)) as writer:
+        write_synthetic(model, writer, rows, current_app.config.get("DP_STREAM_CHUNKSIZE", 100_000))
+
+    params = {"content_hash": dataset_id, "columns": model["columns"], "scope": "synthetic",
+              "mechanism": "marginals", "epsilon": epsilon if charge else 0.0,
+              "delta": model.get("delta", 0.0) if charge else 0.0}
+    result = {"file_id": file_id, "content_hash": dataset_id, "model_id": model_id, "output_format": output_format,
+              "rows": rows, "columns_processed": model["columns"], "pairs": model["pairs"]}
+    record_finished(file_id, params, result)
     return jsonify({
         "file_id": file_id,
-        "privatized_csv_url": download_url,
-        "plots": plot_urls,
-        "columns_processed": cols_processed
+        "dataset_id": dataset_id,
+        "model_id": model_id,
+        "output_format": output_format,
+        "rows": rows,
+        "columns": model["columns"],
+        "pairs": model["pairs"],
+        "epsilon_spent": epsilon if charge else 0.0,
+        "privatized_csv_url": url_for("dp.download", file_id=file_id),
     }), 200
 
 
+# Async job status
+@dp_bp.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+# Async job result, same payload as a synchronous /analyze
+@dp_bp.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    if job.status == "failed":
+        return jsonify({"error": job.error}), 400
+    if job.status != "finished":
+        return jsonify(job.to_dict()), 202
+    return jsonify(result_payload(job.result_data())), 200
+
+
 # Download endpoint
 @dp_bp.route("/download/<file_id>", methods=["GET"])
 def download(file_id):
-    filename = f"privatized_{file_id}.csv"
-    path = os.path.join(OUTPUT_FOLDER, filename)
-    if not os.path.exists(path):
-        return jsonify({"error": "File not found"}), 404
-    return send_file(path, as_attachment=True, download_name="privatized.csv")
-
-
-# Plot image endpoint
+    from .formats import MIMETYPES, find_output, gzip_copy
+
+    found = find_output(output_store, file_id)
+    if not found:
+        return gone_or_missing(file_id, "File not found")
+    path, fmt, download_name = found
+    # An output never changes once written, so its ETag is fixed (file mtimes
+    # are the storage LRU clock and move on every read)
+    etag = f"{file_id}.{fmt}"
+    compressible = fmt == "csv" and not path.endswith(".gz")
+    encoding = None
+    if compressible and request.accept_encodings["gzip"]:
+        path, encoding, etag = gzip_copy(output_store, file_id, path), "gzip", f"{etag}-gzip"
+    resp = send_file(path, as_attachment=True, download_name=download_name, mimetype=MIMETYPES[fmt],
+                     etag=etag, conditional=True)
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    if compressible:
+        resp.vary.add("Accept-Encoding")
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
+# Plot image endpoint, rendered from the stored histogram on first request
 @dp_bp.route("/plot/<file_id>/<column_name>", methods=["GET"])
 def plot_image(file_id, column_name):
-    plot_path = os.path.join(PLOT_FOLDER, f"{file_id}_{column_name}.png")
-    if not os.path.exists(plot_path):
+    from .plots import cached_plot, has_histograms
+
+    plot_path = cached_plot(plot_store, file_id, column_name)
+    if not plot_path:
+        if not has_histograms(plot_store, file_id):
+            return gone_or_missing(file_id, "Plot not available")
         return jsonify({"error": "Plot not available"}), 404
     return send_file(plot_path, mimetype="image/png")
+
+
+# Histogram data endpoint so the frontend can draw the chart itself
+@dp_bp.route("/hist/<file_id>/<column_name>", methods=["GET"])
+def histogram(file_id, column_name):
+    from .plots import has_histograms, load_histogram
+
+    summary = load_histogram(plot_store, file_id, column_name)
+    if summary is None:
+        if not has_histograms(plot_store, file_id):
+            return gone_or_missing(file_id, "Histogram not available")
+        return jsonify({"error": "Histogram not available"}), 404
+    return jsonify({"file_id": file_id, "column": column_name, **summary}), 200
@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Uploads, outputs and plots live in ArtifactStores: each artifact is filed
+# under a shard directory picked from a hash of its key (content hash or
+# file_id), so no directory grows past a few hundred entries. File mtime is
+# the LRU clock and is bumped on every read. A janitor thread deletes
+# artifacts not used for their store's TTL and, when all stores together
+# exceed max_bytes, the least recently used ones until they fit again.
+# Files from before sharding (flat in the store folder) are still found and
+# are swept like any other artifact.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))  # backend/
+UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
+OUTPUT_FOLDER = os.path.join(BASE_DIR, "outputs")
+PLOT_FOLDER = os.path.join(BASE_DIR, "plots")
+DATASET_CACHE_FOLDER = os.path.join(BASE_DIR, "cache", "datasets")
+TEMP_SUFFIXES = (".part", ".tmp")
+TEMP_MAX_AGE = 3600  # leftovers of interrupted writes
+
+
+class ArtifactStore:
+
+    def __init__(self, folder, ttl=0):
+        self.folder = folder
+        self.ttl = ttl  # seconds since last use; 0 keeps artifacts until evicted for space
+        os.makedirs(folder, exist_ok=True)
+
+    @staticmethod
+    def shard(key):
+        return hashlib.sha1(key.encode()).hexdigest()[:2]
+
+    def path(self, key, name):
+        # Where to write artifact `name` belonging to `key`
+        folder = os.path.join(self.folder, self.shard(key))
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, name)
+
+    def find(self, key, name, touch=True):
+        # Path of an existing artifact (sharded or legacy flat layout), or None
+        for path in (os.path.join(self.folder, self.shard(key), name), os.path.join(self.folder, name)):
+            if os.path.exists(path):
+                if touch:
+                    self.touch(path)
+                return path
+        return None
+
+    def discard(self, key):
+        # Deletes every artifact filed under key (names containing it)
+        removed = 0
+        for folder in (os.path.join(self.folder, self.shard(key)), self.folder):
+            try:
+                names = os.listdir(folder)
+            except FileNotFoundError:
+                continue
+            for name in names:
+                path = os.path.join(folder, name)
+                if key in name and os.path.isfile(path):
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+        return removed
+
+    @staticmethod
+    def touch(path):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def entries(self):
+        # (mtime, size, path, is_temp) for every file in the store
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield st.st_mtime, st.st_size, path, name.endswith(TEMP_SUFFIXES) or name.startswith(".")
+
+
+class ArtifactJanitor:
+
+    def __init__(self, stores, max_bytes=0, interval=600.0, min_age=300.0):
+        self.stores = stores
+        self.max_bytes = max_bytes  # 0 disables the size cap
+        self.interval = interval
+        self.min_age = min_age      # never evict artifacts used this recently (e.g. a running job's input)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def sweep(self, now=None):
+        now = now or time.time()
+        stats = {"expired": 0, "evicted": 0, "freed_bytes": 0, "total_bytes": 0}
+        live = []
+        for store in self.stores:
+            for mtime, size, path, is_temp in store.entries():
+                age = now - mtime
+                if is_temp:
+                    expired = age > TEMP_MAX_AGE
+                else:
+                    expired = store.ttl > 0 and age > max(store.ttl, self.min_age)
+                if expired:
+                    if self._remove(path):
+                        stats["expired"] += 1
+                        stats["freed_bytes"] += size
+                elif not is_temp:
+                    live.append((mtime, size, path))
+
+        total = sum(size for _, size, _ in live)
+        if self.max_bytes > 0 and total > self.max_bytes:
+            for mtime, size, path in sorted(live):
+                if total <= self.max_bytes or now - mtime < self.min_age:
+                    break
+                if self._remove(path):
+                    stats["evicted"] += 1
+                    stats["freed_bytes"] += size
+                    total -= size
+        stats["total_bytes"] = total
+        return stats
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def ensure_thread(self):
+        if self.interval <= 0:
+            return
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="artifact-janitor", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                stats = self.sweep()
+                if stats["expired"] or stats["evicted"]:
+                    logger.info("Artifact janitor: %s", stats)
+            except Exception:
+                logger.exception("Artifact janitor sweep failed")
+
+
+# TTLs and the shared size cap are set from DP_* config when the blueprint is registered
+upload_store = ArtifactStore(UPLOAD_FOLDER)
+output_store = ArtifactStore(OUTPUT_FOLDER)
+plot_store = ArtifactStore(PLOT_FOLDER)
+artifact_janitor = ArtifactJanitor([upload_store, output_store, plot_store])
@@ -0,0 +1,313 @@
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from .mechanisms import label_counts, laplace_noise_array, noisy_labels
+from .plots import HIST_MAX_CATEGORIES, OTHER_CATEGORY
+
+# Synthetic datasets from noisy marginals. Every column is encoded to a small
+# domain (numeric: equal-width bins over a range, categorical: a label set
+# plus "(other)"; both with a trailing "missing" code). One bincount over the
+# encoded matrix gives all one-way marginals, another all requested two-way
+# marginals, and one batched Laplace draw noises every cell (epsilon split
+# evenly over the marginals, sequential composition).
+#
+# The domain is released with the model, so it never comes from the data
+# as is: it is either public (bounds / categories given by the caller) or
+# found with a share of epsilon. A numeric range covers the power-of-two
+# buckets whose noisy count clears a threshold; a label is kept only if its
+# noisy count clears 1 + 2 ln(1/delta) / epsilon, so a value held by a few
+# rows (an outlier, a name) shows up with probability at most ~delta. The
+# column type comes from the schema (dtype), which is treated as public.
+#
+# The two-way marginals form a forest: each pair is (parent, child) and a
+# column has at most one parent. Roots are sampled from their one-way
+# marginal and every child from P(child | parent) of its noisy pair, so
+# sampling costs O(rows x columns) regardless of the input size. The fitted
+# model is post-processing of the noisy marginals and can be sampled again
+# any number of times without touching the data or the privacy budget.
+SYNTH_BINS = 20
+SYNTH_DELTA = 1e-6
+SYNTH_DOMAIN_SHARE = 0.2  # of epsilon, for the columns without a public domain
+# Candidate range edges: 0 and +-2^k, fixed in advance
+RANGE_EDGES = np.concatenate([-(2.0 ** np.arange(48, -9, -1)), [0.0], 2.0 ** np.arange(-8, 49)])
+
+
+class SynthesisError(ValueError):
+    pass
+
+
+def column_kinds(df, columns, bounds=None, categories=None):
+    # "numeric" or "categorical" per column: a public domain decides, else the dtype
+    bounds, categories = bounds or {}, categories or {}
+    kinds = {}
+    for col in columns:
+        if col not in df.columns:
+            raise SynthesisError(f"Unknown column: {col}")
+        if col in bounds and col in categories:
+            raise SynthesisError(f"Column {col} has both bounds and categories")
+        if col in bounds:
+            kinds[col] = "numeric"
+        elif col in categories:
+            kinds[col] = "categorical"
+        else:
+            dtype = df[col].dtype
+            numeric = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+            kinds[col] = "numeric" if numeric else "categorical"
+    return kinds
+
+
+def check_domains(bounds, categories):
+    for col, pair in bounds.items():
+        if len(pair) != 2 or not float(pair[0]) < float(pair[1]):
+            raise SynthesisError(f"bounds for {col} must be [lower, upper] with lower < upper")
+    for col, labels in categories.items():
+        if not labels:
+            raise SynthesisError(f"categories for {col} must not be empty")
+
+
+def noisy_range(values, epsilon, delta, rng=None):
+    # (lo, hi) spanning the range buckets whose noisy count clears the
+    # threshold, or None. Each row is in one bucket: sensitivity 1.
+    present = values[~np.isnan(values)]
+    size = RANGE_EDGES.size - 1
+    buckets = np.clip(np.searchsorted(RANGE_EDGES, present, side="right") - 1, 0, size - 1)
+    counts = np.bincount(buckets, minlength=size) + laplace_noise_array(size, 1.0, rng) / epsilon
+    kept = np.flatnonzero(counts > np.log(size / delta) / epsilon)
+    if kept.size == 0:
+        return None
+    return float(RANGE_EDGES[kept[0]]), float(RANGE_EDGES[kept[-1] + 1])
+
+
+def _numeric_values(series):
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def _numeric_spec(series, lo, hi, bins, source):
+    return {"kind": "numeric", "edges": [float(e) for e in np.linspace(lo, hi, bins + 1)],
+            "integer": bool(pd.api.types.is_integer_dtype(series.dtype)), "domain": source}
+
+
+def _categorical_spec(labels, source):
+    labels = [str(label) for label in labels if str(label) != OTHER_CATEGORY]
+    return {"kind": "categorical", "labels": list(dict.fromkeys(labels)) + [OTHER_CATEGORY], "domain": source}
+
+
+def _encode(series, spec):
+    # Values outside the domain go to the edge bin or to "(other)"
+    if spec["kind"] == "numeric":
+        arr = _numeric_values(series)
+        edges = np.asarray(spec["edges"])
+        bins = len(edges) - 1
+        present = ~np.isnan(arr)
+        codes = np.full(len(arr), bins, dtype=np.int64)
+        codes[present] = np.clip(np.searchsorted(edges, arr[present], side="right") - 1, 0, bins - 1)
+        return codes
+
+    labels = spec["labels"]
+    cats = series.astype("string")
+    cats = cats.where(cats.isin(labels) | cats.isna(), OTHER_CATEGORY)
+    codes = pd.Categorical(cats, categories=labels).codes.astype(np.int64)
+    codes[codes < 0] = len(labels)
+    return codes
+
+
+def _domain(spec):
+    # number of codes, the missing code included
+    return (len(spec["edges"]) if spec["kind"] == "numeric" else len(spec["labels"]) + 1)
+
+
+def default_pairs(columns):
+    # A chain in column order: every column conditioned on the one before it
+    return [[a, b] for a, b in zip(columns, columns[1:])]
+
+
+def _check_pairs(columns, pairs):
+    parent = {}
+    for pair in pairs:
+        if len(pair) != 2 or pair[0] == pair[1] or not all(col in columns for col in pair):
+            raise SynthesisError(f"Invalid pair {pair}: two different selected columns expected")
+        a, b = pair
+        if b in parent:
+            raise SynthesisError(f"Column {b} already has a parent ({parent[b]})")
+        node = a
+        while node in parent:  # would b become its own ancestor?
+            node = parent[node]
+            if node == b:
+                break
+        if node == b:
+            raise SynthesisError(f"Pair {pair} would create a cycle")
+        parent[b] = a
+    return parent
+
+
+def domain_delta(kinds, categories, delta=SYNTH_DELTA):
+    # delta spent by fit_marginals: only finding labels needs one
+    categories = categories or {}
+    return delta if any(kind == "categorical" and col not in categories for col, kind in kinds.items()) else 0.0
+
+
+def fit_marginals(df, columns, pairs, epsilon, bins=SYNTH_BINS, rng=None, bounds=None, categories=None,
+                  delta=SYNTH_DELTA, domain_share=SYNTH_DOMAIN_SHARE):
+    # The noisy model as a JSON-serializable dict. bounds {col: [lo, hi]} and
+    # categories {col: [labels]} are public domains; the other columns share
+    # domain_share of epsilon to find theirs.
+    if not columns:
+        raise SynthesisError("No columns to synthesize")
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise SynthesisError(f"Unknown columns: {', '.join(missing)}")
+    if epsilon <= 0:
+        raise SynthesisError("epsilon must be positive")
+    bounds, categories = bounds or {}, categories or {}
+    check_domains(bounds, categories)
+    parent = _check_pairs(columns, pairs)
+    kinds = column_kinds(df, columns, bounds, categories)
+
+    # Domains first: public ones as given, the rest from noisy counts
+    private = [col for col in columns if col not in bounds and col not in categories]
+    domain_epsilon = epsilon * domain_share if private else 0.0
+    specs = {}
+    for col in columns:
+        if col in bounds:
+            specs[col] = _numeric_spec(df[col], float(bounds[col][0]), float(bounds[col][1]), bins, "public")
+        elif col in categories:
+            specs[col] = _categorical_spec(categories[col], "public")
+        elif kinds[col] == "numeric":
+            found = noisy_range(_numeric_values(df[col]), domain_epsilon / len(private), delta, rng)
+            if found is None:
+                raise SynthesisError(f"Too few rows to find a range for {col}; pass public bounds")
+            specs[col] = _numeric_spec(df[col], *found, bins, "noisy")
+        else:
+            labels = noisy_labels(label_counts(df[col]), domain_epsilon / len(private), delta,
+                                  HIST_MAX_CATEGORIES - 1, rng)
+            specs[col] = _categorical_spec(labels, "noisy")
+    epsilon_marginals = epsilon - domain_epsilon
+
+    codes = np.empty((len(df), len(columns)), dtype=np.int64)
+    for i, col in enumerate(columns):
+        codes[:, i] = _encode(df[col], specs[col])
+    sizes = np.array([_domain(specs[col]) for col in columns])
+    index = {col: i for i, col in enumerate(columns)}
+
+    # All one-way marginals in one bincount, all pairs in another
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    one_way = np.bincount((codes + offsets).ravel(), minlength=int(sizes.sum())).astype(float)
+    pair_list = [(parent[col], col) for col in columns if col in parent]
+    pair_sizes = np.array([sizes[index[a]] * sizes[index[b]] for a, b in pair_list], dtype=np.int64)
+    pair_offsets = np.concatenate([[0], np.cumsum(pair_sizes)[:-1]]).astype(np.int64)
+    if pair_list:
+        cells = np.column_stack([codes[:, index[a]] * sizes[index[b]] + codes[:, index[b]]
+                                 for a, b in pair_list]) + pair_offsets
+        two_way = np.bincount(cells.ravel(), minlength=int(pair_sizes.sum())).astype(float)
+    else:
+        two_way = np.zeros(0)
+
+    # Each row adds one to every marginal: sensitivity 1 per marginal
+    scale = (len(columns) + len(pair_list)) / epsilon_marginals
+    exact = np.concatenate([one_way, two_way])
+    noisy = np.maximum(exact + laplace_noise_array(exact.size, 1.0, rng) * scale, 0.0)
+    one_way, two_way = noisy[:one_way.size], noisy[one_way.size:]
+
+    model = {"columns": columns, "specs": specs, "epsilon": epsilon, "domain_epsilon": domain_epsilon,
+             "delta": domain_delta(kinds, categories, delta), "pairs": [list(p) for p in pair_list],
+             "marginals": {}, "conditionals": {}}
+    totals = []
+    for col, start, size in zip(columns, offsets, sizes):
+        counts = one_way[start:start + size]
+        totals.append(counts.sum())
+        model["marginals"][col] = _normalize(counts).tolist()
+    for (a, b), start, size in zip(pair_list, pair_offsets, pair_sizes):
+        joint = two_way[start:start + size].reshape(sizes[index[a]], sizes[index[b]])
+        fallback = np.asarray(model["marginals"][b])
+        model["conditionals"][b] = [(_normalize(row) if row.sum() > 0 else fallback).tolist() for row in joint]
+    # Noisy row count: average of the one-way totals (post-processing)
+    model["rows"] = int(round(float(np.mean(totals))))
+    return model
+
+
+def _normalize(counts):
+    total = counts.sum()
+    if total <= 0:
+        return np.full(counts.size, 1.0 / counts.size)
+    return counts / total
+
+
+def _sample_codes(model, n, rng):
+    # Columns in an order where every parent comes before its children
+    parent = {b: a for a, b in model["pairs"]}
+    order, placed = [], set()
+    while len(order) < len(model["columns"]):
+        for col in model["columns"]:
+            if col not in placed and parent.get(col, col) in placed | {col}:
+                order.append(col)
+                placed.add(col)
+
+    codes = {}
+    for col in order:
+        if col not in parent:
+            cdf = np.cumsum(model["marginals"][col])
+            cdf[-1] = 1.0
+            codes[col] = np.searchsorted(cdf, rng.random(n), side="right")
+            continue
+        # Inverse CDF of each row's conditional: row p of the CDF matrix is
+        # shifted by p, so one searchsorted serves every parent value at once
+        cdf = np.cumsum(np.asarray(model["conditionals"][col]), axis=1)
+        cdf[:, -1] = 1.0
+        n_parent, n_child = cdf.shape
+        shifted = (cdf + np.arange(n_parent)[:, None]).ravel()
+        p = codes[parent[col]]
+        codes[col] = np.searchsorted(shifted, p + rng.random(n), side="right") - p * n_child
+    return codes
+
+
+def _decode(codes, spec, rng):
+    if spec["kind"] == "categorical":
+        labels = np.array(spec["labels"] + [None], dtype=object)
+        return pd.Series(labels[codes], dtype=object)
+    edges = np.asarray(spec["edges"])
+    bins = len(edges) - 1
+    present = codes < bins
+    values = np.full(len(codes), np.nan)
+    # uniform within the sampled bin
+    lo, hi = edges[codes[present]], edges[codes[present] + 1]
+    values[present] = lo + (hi - lo) * rng.random(int(present.sum()))
+    if spec["integer"]:
+        return pd.Series(np.round(values), dtype="float").astype("Int64")
+    return pd.Series(values)
+
+
+def sample_rows(model, n, rng=None):
+    rng = rng or np.random.default_rng()
+    codes = _sample_codes(model, n, rng)
+    return pd.DataFrame({col: _decode(codes[col], model["specs"][col], rng) for col in model["columns"]})
+
+
+def output_schema(model):
+    types = {"numeric": pa.float64(), "categorical": pa.string()}
+    return pa.schema([(col, pa.int64() if spec.get("integer") else types[spec["kind"]])
+                      for col, spec in ((c, model["specs"][c]) for c in model["columns"])])
+
+
+def write_synthetic(model, writer, n, chunksize, rng=None):
+    # Samples n rows in chunks so memory is bounded by chunksize
+    rng = rng or np.random.default_rng()
+    for start in range(0, n, chunksize):
+        writer.write(sample_rows(model, min(chunksize, n - start), rng))
+
+
+def _model_name(model_id):
+    return f"{model_id}.synth.json"
+
+
+def save_model(store, model_id, model):
+    with open(store.path(model_id, _model_name(model_id)), "w") as f:
+        json.dump(model, f)
+
+
+def load_model(store, model_id):
+    path = store.find(model_id, _model_name(model_id))
+    if not path:
+        return None
+    with open(path) as f:
+        return json.load(f)
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from extensions import db  
@@ -6,24 +7,59 @@ class DPResult(db.Model):
     __tablename__ = "dp_results"
 
     id = db.Column(db.Integer, primary_key=True)
-    file_id = db.Column(db.String(128), nullable=False) 
+    file_id = db.Column(db.String(128), nullable=False, index=True)
+    content_hash = db.Column(db.String(64), index=True)  # sha256 of the uploaded bytes
     columns = db.Column(db.Text)  
     mechanism = db.Column(db.String(64))
     epsilon = db.Column(db.Float)
     delta = db.Column(db.Float, nullable=True)
+    # Analysis job state (queued -> running -> finished | failed)
+    status = db.Column(db.String(16), default="finished")
+    progress_done = db.Column(db.Integer, default=0)
+    progress_total = db.Column(db.Integer, default=0)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def result_data(self):
+        return json.loads(self.result) if self.result else None
 
     def to_dict(self):
         return {
             "id": self.id,
             "file_id": self.file_id,
+            "content_hash": self.content_hash,
             "columns": self.columns,
             "mechanism": self.mechanism,
             "epsilon": self.epsilon,
             "delta": self.delta,
+            "status": self.status,
+            "progress": {"columns_done": self.progress_done, "columns_total": self.progress_total},
+            "error": self.error,
             "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
     
+class DPRelease(db.Model):
+    # A published noisy column, reused for identical requests (src/dp/releases.py)
+    __tablename__ = "dp_releases"
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(64), nullable=False, unique=True)  # sha256 of hash/column/mechanism/eps/delta
+    content_hash = db.Column(db.String(64), index=True)
+    column = db.Column(db.String(255), nullable=False)
+    mechanism = db.Column(db.String(64))
+    epsilon = db.Column(db.Float)
+    delta = db.Column(db.Float)
+    file_id = db.Column(db.String(128))  # the DPResult that first published it
+    status = db.Column(db.String(16), nullable=False, default="pending")  # pending -> ready
+    summary = db.Column(db.Text)  # histogram data, as for /dp/hist
+    size_bytes = db.Column(db.BigInteger, default=0)
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
 # Association table for Role-Permission
 class RolePermission(db.Model):
     __tablename__ = "role_permissions"
@@ -54,6 +90,15 @@ class User(db.Model):
     role_id = db.Column(db.Integer, db.ForeignKey("roles.id"))
     role = db.relationship("Role", backref=db.backref("users", lazy=True))
 
+class RevokedToken(db.Model):
+    # Logged-out tokens by jti; rows are useless once the token has expired
+    __tablename__ = "revoked_tokens"
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class AuditLog(db.Model):
     __tablename__ = "audit_logs"
     id = db.Column(db.Integer, primary_key=True)
@@ -68,6 +113,61 @@ class AuditLog(db.Model):
 
     user = db.relationship("User", backref=db.backref("audit_logs", lazy=True))    
 
+    # Keep in sync with migrations/versions/3f9a1c7d2b4e_audit_log_indexes.py
+    __table_args__ = (
+        db.Index("ix_audit_logs_created_at_id", "created_at", "id"),
+        db.Index("ix_audit_logs_user_id_created_at", "user_id", "created_at"),
+        db.Index("ix_audit_logs_route_created_at", "route", "created_at"),
+        db.Index("ix_audit_logs_status_code_created_at", "status_code", "created_at"),
+    )
+
+class AuditRollup(db.Model):
+    # Request counts per time bucket, maintained incrementally by the audit
+    # writer so dashboards never scan audit_logs. user_id 0 = anonymous, and
+    # route is the URL rule ("/dp/plot/<file_id>/<column_name>"), not the path.
+    __tablename__ = "audit_rollups"
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(8), nullable=False)  # "hour" | "day"
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    route = db.Column(db.String(255), nullable=False)
+    method = db.Column(db.String(10), nullable=False)
+    status_code = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("granularity", "bucket_start", "route", "method", "status_code", "user_id",
+                            name="uq_audit_rollups_key"),
+    )
+
+class PrivacyBudget(db.Model):
+    # Epsilon/delta spent per user (key = user id) or per dataset (key =
+    # content hash). epsilon_limit overrides the configured default.
+    __tablename__ = "privacy_budgets"
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(16), nullable=False)  # "user" | "dataset"
+    key = db.Column(db.String(128), nullable=False)
+    epsilon_limit = db.Column(db.Float, nullable=True)
+    epsilon_spent = db.Column(db.Float, nullable=False, default=0.0)
+    delta_spent = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("scope", "key", name="uq_privacy_budgets_scope_key"),
+    )
+
+class PrivacyLedgerEntry(db.Model):
+    # One row per charge (or refund, with negative amounts)
+    __tablename__ = "privacy_ledger"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True, index=True)
+    dataset_id = db.Column(db.String(128), nullable=True, index=True)
+    operation = db.Column(db.String(64), nullable=False)  # e.g. "dp.analyze"
+    reference = db.Column(db.String(128))  # e.g. the analysis file_id
+    epsilon = db.Column(db.Float, nullable=False)
+    delta = db.Column(db.Float, nullable=False, default=0.0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 def __repr__(self):
     return f"<User {self.email}>"
 
@@ -1,15 +1,34 @@
 from functools import wraps
 from flask import jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from ..auth.tokens import require_claims
+from .permissions import permission_map
 
 def role_required(*roles):
     def wrapper(fn):
         @wraps(fn)
         def decorated(*args, **kwargs):
-            verify_jwt_in_request()
-            claims = get_jwt()
+            claims = require_claims()
             if claims.get("role") not in roles:
                 return jsonify(msg="Forbidden: insufficient role"), 403
             return fn(*args, **kwargs)
         return decorated
     return wrapper
+
+def has_permissions(claims, codes):
+    # Tokens issued with RBAC_JWT_PERMISSIONS carry a "perms" bitmask; others,
+    # and masks from an older bit layout, are checked against the role's
+    # entry in the cached permission map.
+    if "perms" in claims and claims.get("perms_sig") == permission_map.signature():
+        return all(permission_map.mask_has(claims["perms"], code) for code in codes)
+    granted = permission_map.permissions(claims.get("role"))
+    return all(code in granted for code in codes)
+
+def permission_required(*codes):
+    def wrapper(fn):
+        @wraps(fn)
+        def decorated(*args, **kwargs):
+            if not has_permissions(require_claims(), codes):
+                return jsonify(msg="Forbidden: missing permission"), 403
+            return fn(*args, **kwargs)
+        return decorated
+    return wrapper
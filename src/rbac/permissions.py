@@ -0,0 +1,87 @@
+import hashlib
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+from ..models import Role, Permission, RolePermission
+
+
+class PermissionMap:
+    # Role name -> frozenset of permission codes, loaded from the database in
+    # one go and swapped atomically, so a check is a dict lookup plus a set
+    # membership test. Committing a Role/Permission change in this process
+    # bumps `version` and the next check reloads; other processes reload
+    # after ttl seconds.
+
+    def __init__(self, ttl=60.0):
+        self.ttl = ttl
+        self.version = 0
+        self._loaded = None  # (version, expires_at, roles, bits, signature)
+        self._lock = threading.Lock()
+
+    def _snapshot(self):
+        loaded = self._loaded
+        if loaded is not None and loaded[0] == self.version and loaded[1] > time.monotonic():
+            return loaded
+        with self._lock:
+            loaded = self._loaded
+            if loaded is None or loaded[0] != self.version or loaded[1] <= time.monotonic():
+                version = self.version
+                roles = {
+                    role.name: frozenset(p.code for p in role.permissions)
+                    for role in Role.query.options(selectinload(Role.permissions))
+                }
+                # Bit positions are the rank of each code, so the mask is as wide as
+                # the number of permissions. Adding or removing a code moves bits;
+                # the signature tells tokens minted under another layout apart.
+                codes = sorted(code for (code,) in Permission.query.with_entities(Permission.code))
+                bits = {code: 1 << i for i, code in enumerate(codes)}
+                signature = hashlib.sha1("\n".join(codes).encode()).hexdigest()[:12]
+                loaded = self._loaded = (version, time.monotonic() + self.ttl, roles, bits, signature)
+            return loaded
+
+    def permissions(self, role):
+        return self._snapshot()[2].get(role, frozenset())
+
+    def has(self, role, code):
+        return code in self.permissions(role)
+
+    def mask(self, role):
+        bits = self._snapshot()[3]
+        mask = 0
+        for code in self.permissions(role):
+            mask |= bits.get(code, 0)
+        return mask
+
+    def signature(self):
+        return self._snapshot()[4]
+
+    def mask_has(self, mask, code):
+        bit = self._snapshot()[3].get(code)
+        return bit is not None and bool(mask & bit)
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+
+
+permission_map = PermissionMap()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Role, Permission, RolePermission)):
+            session.info["permission_map_stale"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    if session.info.pop("permission_map_stale", False):
+        permission_map.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("permission_map_stale", None)
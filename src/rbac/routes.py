@@ -1,9 +1,27 @@
 from flask import Blueprint, jsonify
-from .decorators import role_required
+from flask_jwt_extended import get_jwt
+from ..auth.tokens import token_required
+from .decorators import role_required, permission_required
+from .permissions import permission_map
 
 rbac_bp = Blueprint("rbac", __name__, url_prefix="/rbac")
 
+@rbac_bp.record_once
+def configure(state):
+    permission_map.ttl = state.app.config.get("RBAC_PERMISSIONS_TTL", 60.0)
+
 @rbac_bp.get("/admin-only")
 @role_required("admin")
 def admin_only():
     return jsonify(message="Welcome, admin!")
+
+@rbac_bp.get("/users-admin")
+@permission_required("manage_users")
+def users_admin():
+    return jsonify(message="You can manage users")
+
+@rbac_bp.get("/permissions")
+@token_required()
+def my_permissions():
+    role = get_jwt().get("role")
+    return jsonify({"role": role, "permissions": sorted(permission_map.permissions(role))})
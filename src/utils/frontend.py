@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from flask import Response, abort, request, send_file
+
+try:
+    import brotli
+except ImportError:  # optional; .br files from the frontend build are still served
+    brotli = None
+
+# The built frontend (dist/) is indexed once at startup: content hash, type
+# and the available encodings of every file. Small files are kept in memory
+# together with their gzip/brotli variants; larger ones are sent from disk.
+# Precompressed .gz/.br files next to an asset (from the frontend build) are
+# used as-is. Fingerprinted assets (assets/index-<hash>.js) never change
+# under the same name, so browsers may cache them forever; everything else
+# (index.html) is revalidated with its ETag on every load.
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+MIN_COMPRESS_BYTES = 512
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+class Asset:
+
+    def __init__(self, path, mimetype, etag, immutable):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.immutable = immutable
+        self.variants = {}  # encoding -> (bytes or None, path on disk or None)
+
+
+class FrontendManifest:
+
+    def __init__(self, root, memory_max_bytes=1024 * 1024):
+        self.root = root
+        self.memory_max_bytes = memory_max_bytes
+        self.assets = {}
+        if os.path.isdir(root):
+            self.build()
+
+    def build(self):
+        assets = {}
+        for folder, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith((".gz", ".br")):
+                    continue
+                path = os.path.join(folder, name)
+                rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+                assets[rel] = self._index(path, rel)
+        self.assets = assets
+
+    def _index(self, path, rel):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        asset = Asset(path, mimetype, digest.hexdigest()[:32],
+                      immutable=rel.startswith("assets/") and bool(HASHED_NAME.search(rel)))
+
+        in_memory = os.path.getsize(path) <= self.memory_max_bytes
+        data = None
+        if in_memory:
+            with open(path, "rb") as f:
+                data = f.read()
+        asset.variants["identity"] = (data, path)
+
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            if os.path.exists(path + suffix):
+                asset.variants[encoding] = (None, path + suffix)
+        compressible = mimetype.startswith(COMPRESSIBLE) and data is not None and len(data) >= MIN_COMPRESS_BYTES
+        if compressible:
+            if "gzip" not in asset.variants:
+                asset.variants["gzip"] = (gzip.compress(data, compresslevel=9, mtime=0), None)
+            if "br" not in asset.variants and brotli is not None:
+                asset.variants["br"] = (brotli.compress(data), None)
+        # Only keep compressed copies that actually save bytes
+        for encoding in ("gzip", "br"):
+            variant = asset.variants.get(encoding)
+            if variant and variant[0] is not None and data is not None and len(variant[0]) >= len(data):
+                del asset.variants[encoding]
+        return asset
+
+    def _negotiate(self, asset):
+        best, best_q = "identity", 0
+        for encoding in ("br", "gzip"):
+            if encoding in asset.variants:
+                q = request.accept_encodings[encoding]
+                if q > best_q:
+                    best, best_q = encoding, q
+        return best
+
+    def response(self, path):
+        # SPA routing: unknown paths get index.html
+        asset = self.assets.get(path) or self.assets.get("index.html")
+        if asset is None:
+            abort(404)
+        encoding = self._negotiate(asset)
+        data, file_path = asset.variants[encoding]
+        etag = asset.etag if encoding == "identity" else f"{asset.etag}-{encoding}"
+        if data is not None:
+            resp = Response(data, mimetype=asset.mimetype)
+            length = len(data)
+        else:
+            resp = send_file(file_path, mimetype=asset.mimetype, etag=False, conditional=False)
+            length = os.path.getsize(file_path)
+        resp.set_etag(etag)
+        if encoding != "identity":
+            resp.headers["Content-Encoding"] = encoding
+        if len(asset.variants) > 1:
+            resp.vary.add("Accept-Encoding")
+        resp.headers["Cache-Control"] = IMMUTABLE if asset.immutable else REVALIDATE
+        return resp.make_conditional(request, accept_ranges=True, complete_length=length)
+
+    def stats(self):
+        return {
+            "files": len(self.assets),
+            "immutable": sum(1 for a in self.assets.values() if a.immutable),
+            "memory_bytes": sum(len(d) for a in self.assets.values() for d, _ in a.variants.values() if d),
+        }
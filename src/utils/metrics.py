@@ -0,0 +1,179 @@
+import bisect
+import hmac
+import json
+import threading
+import time
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+# Minimal in-process metrics in the Prometheus text exposition format, served
+# at /metrics (METRICS_ENABLED; with METRICS_TOKEN set, only to a matching
+# bearer token). Values are per worker process (scrape each worker, or sum in
+# the query); nothing is shared between processes.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(labels.get(l, "") for l in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(l, "") for l in self.labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            if i < len(self.buckets):
+                entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, entry in sorted(self._values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, entry):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{_labels(self.labels, key, [('le', f'{bound:g}')])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, [('le', '+Inf')])} {entry[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, key)} {entry[-2]:g}")
+                lines.append(f"{self.name}_count{_labels(self.labels, key)} {entry[-1]}")
+        return lines
+
+
+request_duration = Histogram("securepy_http_request_duration_seconds", "HTTP request latency.",
+                             labels=("blueprint", "route", "method", "status"))
+db_queries = Counter("securepy_db_queries_total", "SQL statements executed.", labels=("blueprint", "route"))
+stage_duration = Histogram("securepy_stage_duration_seconds", "Time spent per instrumented stage.",
+                           labels=("stage",))
+dp_rows = Counter("securepy_dp_rows_processed_total", "Rows read by DP analyses.")
+dp_columns = Counter("securepy_dp_columns_processed_total", "Columns privatized by DP analyses.",
+                     labels=("outcome",))
+
+REGISTRY = [request_duration, db_queries, stage_duration, dp_rows, dp_columns]
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def record_analysis(result):
+    # DP throughput from a run_analysis() result
+    dp_rows.inc(result.get("rows", 0))
+    dp_columns.inc(len(result["columns_processed"]), outcome="processed")
+    dp_columns.inc(len(result.get("columns_failed", {})), outcome="failed")
+
+
+def _route_labels():
+    if has_request_context():
+        rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+        return request.blueprint or "", rule
+    return "", "<background>"
+
+
+def server_timing(timings, total=None):
+    # Server-Timing header value, durations in milliseconds
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def init_metrics(app, db):
+    if not app.logger.level:
+        # timing lines are logged at INFO
+        app.logger.setLevel(app.config.get("LOG_LEVEL", "INFO"))
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.db_queries = 0
+
+    @app.after_request
+    def finish_timer(resp):
+        started = g.pop("request_started", None)
+        if started is None:
+            return resp
+        total = time.perf_counter() - started
+        blueprint, rule = _route_labels()
+        request_duration.observe(total, blueprint=blueprint, route=rule, method=request.method,
+                                 status=str(resp.status_code))
+        timings = g.get("stage_timings") or {}
+        resp.headers["Server-Timing"] = server_timing(timings, total)
+        if timings:
+            # One structured line per instrumented request
+            app.logger.info(json.dumps({
+                "event": "request_timing",
+                "route": rule,
+                "method": request.method,
+                "status": resp.status_code,
+                "duration_ms": round(total * 1000, 2),
+                "db_queries": g.get("db_queries", 0),
+                "stages_ms": {name: round(s * 1000, 2) for name, s in timings.items()},
+            }))
+        return resp
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        blueprint, rule = _route_labels()
+        if has_request_context():
+            g.db_queries = g.get("db_queries", 0) + 1
+        db_queries.inc(blueprint=blueprint, route=rule)
+
+    if not app.config.get("METRICS_ENABLED", False):
+        return
+
+    @app.get("/metrics")
+    def metrics():
+        token = app.config.get("METRICS_TOKEN")
+        if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return Response("Unauthorized\n", status=401, mimetype="text/plain",
+                            headers={"WWW-Authenticate": "Bearer"})
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,115 @@
+import math
+import os
+import threading
+import numpy as np
+
+# Noise sampling from OS entropy (os.urandom, the same CSPRNG behind
+# `secrets`), read in large blocks instead of one call per draw. Each thread
+# keeps its own pool of random 64-bit words that scalar and small array draws
+# are served from; draws larger than the pool read os.urandom directly. Pools
+# are discarded after a fork so parent and child never share random bytes.
+# Passing a numpy Generator as rng makes any draw reproducible (tests and
+# benchmarks only).
+POOL_WORDS = 8192  # 64 KiB of entropy per refill
+SCALAR_BATCH = 1024
+
+_local = threading.local()
+
+
+def _words(n):
+    if n > POOL_WORDS:
+        return np.frombuffer(os.urandom(8 * n), dtype=np.uint64)
+    pool = getattr(_local, "pool", None)
+    pos = getattr(_local, "pos", POOL_WORDS)
+    if pool is None or _local.pid != os.getpid() or pos + n > POOL_WORDS:
+        pool = _local.pool = np.frombuffer(os.urandom(8 * POOL_WORDS), dtype=np.uint64)
+        _local.pid = os.getpid()
+        pos = 0
+    _local.pos = pos + n
+    return pool[pos:pos + n]
+
+
+def uniform(size, rng=None):
+    # Uniforms in [0, 1) with 53 random bits each
+    if rng is not None:
+        return rng.random(size)
+    return (_words(size) >> np.uint64(11)) * (1.0 / 2**53)
+
+
+def standard_normal(size, rng=None):
+    # Box-Muller; 1 - u keeps the log argument in (0, 1]
+    u1 = uniform(size, rng)
+    u2 = uniform(size, rng)
+    return np.sqrt(-2.0 * np.log1p(-u1)) * np.cos(2.0 * np.pi * u2)
+
+
+def _pooled(fn):
+    # Scalar draws pop from a per-thread list of unit samples, refilled
+    # SCALAR_BATCH at a time, so each call costs a list pop instead of a
+    # NumPy round trip. Every sample is still used at most once.
+    batches = getattr(_local, "scalars", None)
+    if batches is None or _local.scalars_pid != os.getpid():
+        batches = _local.scalars = {}
+        _local.scalars_pid = os.getpid()
+    batch = batches.get(fn)
+    if not batch:
+        batch = batches[fn] = fn(SCALAR_BATCH, 1.0).tolist()
+    return batch.pop()
+
+
+def _scalar(fn, size, scale, rng=None):
+    if size is not None:
+        return fn(size, scale, rng=rng)
+    if rng is not None:
+        return float(fn(1, scale, rng=rng)[0])
+    return _pooled(fn) * scale
+
+
+def _uniform(size, _scale, rng=None):
+    return uniform(size, rng)
+
+
+def _laplace(size, scale, rng=None):
+    # diffprivlib's floating-point-hardened Laplace sampler (4 uniforms per sample)
+    u1, u2, u3, u4 = (uniform(size, rng) for _ in range(4))
+    standard = np.log1p(-u1) * np.cos(np.pi * u2) + np.log1p(-u3) * np.cos(np.pi * u4)
+    return -scale * standard
+
+
+def _gaussian(size, scale, rng=None):
+    # diffprivlib's Gaussian sampler (mean of 2 normals, rescaled)
+    standard = (standard_normal(size, rng) + standard_normal(size, rng)) / np.sqrt(2)
+    return scale * standard
+
+
+def _geometric(size, scale, rng=None):
+    # Two-sided geometric (discrete Laplace): P(k) proportional to exp(-|k| / scale),
+    # as the difference of two geometric variables
+    if scale <= 0:
+        return np.zeros(size, dtype=np.int64)
+    log_alpha = -1.0 / scale
+    g1 = np.floor(np.log1p(-uniform(size, rng)) / log_alpha)
+    g2 = np.floor(np.log1p(-uniform(size, rng)) / log_alpha)
+    return (g1 - g2).astype(np.int64)
+
+
+def laplace(size=None, scale=1.0, rng=None):
+    return _scalar(_laplace, size, scale, rng=rng)
+
+
+def gaussian(size=None, scale=1.0, rng=None):
+    return _scalar(_gaussian, size, scale, rng=rng)
+
+
+def geometric(size=None, scale=1.0, rng=None):
+    # Integer noise for counts; scale = sensitivity / epsilon
+    if size is not None:
+        return _geometric(size, scale, rng=rng)
+    if rng is not None:
+        return int(_geometric(1, scale, rng=rng)[0])
+    if scale <= 0:
+        return 0
+    g1 = math.floor(-scale * math.log1p(-_pooled(_uniform)))
+    g2 = math.floor(-scale * math.log1p(-_pooled(_uniform)))
+    return g1 - g2
+
@@ -1,7 +1,90 @@
-from passlib.hash import bcrypt
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from passlib.context import CryptContext
+
+# bcrypt is deliberately slow, so hashing runs in a small process pool instead
+# of on the request thread: a burst of logins then queues behind the pool
+# rather than holding up every other request in the worker. At most
+# max_pending hashes may be waiting; beyond that callers get HashingBusy.
+DEFAULT_ROUNDS = 12
+
+
+class HashingBusy(RuntimeError):
+    pass
+
+
+@lru_cache(maxsize=None)
+def _context(rounds):
+    return CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+
+
+def _hash(plain, rounds):
+    return _context(rounds).hash(plain)
+
+
+def _verify_and_update(plain, hashed, rounds):
+    # (ok, new_hash): new_hash is set when the stored hash used another cost
+    return _context(rounds).verify_and_update(plain, hashed)
+
+
+class PasswordHasher:
+
+    def __init__(self, rounds=DEFAULT_ROUNDS, workers=0, max_pending=64, timeout=10.0):
+        self.rounds = rounds
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def _get_pool(self):
+        # One pool per process (recreated after a fork or if a worker died)
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid() or self._pool._broken:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._pool
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingBusy("Too many password hashing requests in progress")
+        try:
+            return self._get_pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, plain):
+        return self._run(_hash, plain, self.rounds)
+
+    def verify_and_update(self, plain, hashed):
+        return self._run(_verify_and_update, plain, hashed, self.rounds)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+hasher = PasswordHasher()
+
+
+def configure_hashing(rounds=DEFAULT_ROUNDS, workers=0, max_pending=64):
+    global hasher
+    hasher.shutdown()
+    hasher = PasswordHasher(rounds, workers, max_pending)
+
 
 def hash_password(plain: str) -> str:
-    return bcrypt.hash(plain)
+    return hasher.hash(plain)
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return bcrypt.verify(plain, hashed)
+    return hasher.verify_and_update(plain, hashed)[0]
+
+def verify_and_update_password(plain: str, hashed: str):
+    return hasher.verify_and_update(plain, hashed)
@@ -0,0 +1,32 @@
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context
+from .metrics import stage_duration
+
+# Stage timers: `with stage("parse"): ...` adds the elapsed time to the
+# current request (or background job) under that name. Repeated stages
+# accumulate, so per-column steps add up to one figure per request. Outside
+# an app context (column pool workers, benchmarks) timing is skipped.
+
+
+def stages():
+    # {name: seconds} recorded so far in this app context
+    if not has_app_context():
+        return {}
+    return g.setdefault("stage_timings", {})
+
+
+@contextmanager
+def stage(name):
+    if not has_app_context():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = g.setdefault("stage_timings", {})
+        timings[name] = timings.get(name, 0.0) + elapsed
+        stage_duration.observe(elapsed, stage=name)
+
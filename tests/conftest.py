@@ -0,0 +1,32 @@
+import pytest
+from flask import Flask
+from src.dp import jobs, pipeline, routes
+from src.dp.budget import init_privacy_budget
+from src.dp.datasets import DatasetCache
+from src.dp.storage import ArtifactStore
+from src.models import db
+
+
+def _app(**config):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", **config)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def dp_app(tmp_path, monkeypatch):
+    outputs = ArtifactStore(str(tmp_path / "outputs"))
+    plots = ArtifactStore(str(tmp_path / "plots"))
+    for module in (pipeline, jobs, routes):
+        monkeypatch.setattr(module, "output_store", outputs)
+        monkeypatch.setattr(module, "plot_store", plots)
+    monkeypatch.setattr(routes, "upload_store", ArtifactStore(str(tmp_path / "uploads")))
+    monkeypatch.setattr(pipeline, "dataset_cache", DatasetCache(str(tmp_path / "datasets"), max_bytes=0))
+    app = _app(PRIVACY_BUDGET_DATASET_EPSILON=2.5, PRIVACY_BUDGET_FLUSH_INTERVAL=3600,
+               DP_RELEASE_CACHE_MAX_BYTES=0)
+    app.register_blueprint(routes.dp_bp, url_prefix="/dp")
+    init_privacy_budget(app)
+    return app, outputs
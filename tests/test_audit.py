@@ -0,0 +1,222 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+
+def _app():
+    from flask import Flask
+    from extensions import db, jwt
+    from src.audit.routes import audit_bp
+
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", JWT_SECRET_KEY="test-secret-key-of-enough-length")
+    db.init_app(app)
+    jwt.init_app(app)
+    app.register_blueprint(audit_bp)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def _seed(app):
+    from extensions import db
+    from flask_jwt_extended import create_access_token
+    from src.models import AuditLog
+
+    start = datetime(2026, 1, 1, 12)
+    with app.app_context():
+        # Pairs of rows share a timestamp so the id breaks ties
+        db.session.add_all([
+            AuditLog(event="http_request", route=f"/dp/{i}" if i % 3 else "/auth/login",
+                     method="POST" if i % 2 else "GET", status_code=500 if i == 7 else 200,
+                     user_id=1 if i < 5 else None, created_at=start + timedelta(minutes=i // 2))
+            for i in range(10)
+        ])
+        db.session.commit()
+        token = create_access_token(identity="1", additional_claims={"role": "admin"})
+    return {"Authorization": "Bearer " + token}
+
+
+def test_logs_pages_newest_first_by_cursor_and_clamps_limit():
+    app = _app()
+    admin = _seed(app)
+    client = app.test_client()
+
+    ids, cursor = [], None
+    while True:
+        resp = client.get("/audit/logs", query_string={"limit": 3, "cursor": cursor or ""}, headers=admin)
+        assert resp.status_code == 200 and len(resp.json) <= 3
+        ids += [row["id"] for row in resp.json]
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert ids == list(range(10, 0, -1))  # no row skipped or repeated across pages
+
+    assert len(client.get("/audit/logs?limit=0", headers=admin).json) == 1
+    assert len(client.get("/audit/logs?limit=-5", headers=admin).json) == 1
+    assert len(client.get("/audit/logs?limit=5000", headers=admin).json) == 10
+    for bad in ("limit=ten", "cursor=bm9wZQ", "status=abc", "since=yesterday"):
+        assert client.get(f"/audit/logs?{bad}", headers=admin).status_code == 400
+    assert client.get("/audit/logs").status_code == 401
+
+
+def test_logs_and_export_apply_the_same_filters():
+    app = _app()
+    admin = _seed(app)
+    client = app.test_client()
+
+    def ids(**args):
+        return [row["id"] for row in client.get("/audit/logs", query_string=args, headers=admin).json]
+
+    assert ids(route="/auth/*") == [10, 7, 4, 1]
+    assert ids(status="5xx") == [8]
+    assert ids(method="get", user_id=1) == [5, 3, 1]
+    assert ids(since="2026-01-01T12:03:00", until="2026-01-01T12:04:00") == [8, 7]
+
+    ndjson = client.get("/audit/export?status=2xx&method=POST", headers=admin)
+    assert ndjson.mimetype == "application/x-ndjson"
+    assert [json.loads(line)["id"] for line in ndjson.data.splitlines()] == [10, 6, 4, 2]
+
+    exported = client.get("/audit/export?format=csv&route=/auth/*", headers=admin)
+    assert exported.mimetype == "text/csv"
+    assert "audit_logs.csv" in exported.headers["Content-Disposition"]
+    rows = list(csv.DictReader(io.StringIO(exported.get_data(as_text=True))))
+    assert [row["id"] for row in rows] == ["10", "7", "4", "1"]
+    assert rows[0]["route"] == "/auth/login" and rows[0]["created_at"] == "2026-01-01T12:04:00"
+    assert client.get("/audit/export?format=xml", headers=admin).status_code == 400
+
+
+def _record(i):
+    return dict(user_id=None, event="http_request", route=f"/dp/hist/{i}/Age", method="GET", ip="127.0.0.1",
+                status_code=200, message="", created_at=datetime(2026, 1, 1, 12),
+                rule="/dp/hist/<file_id>/<column_name>")
+
+
+def test_writer_bulk_inserts_in_batches_and_flushes(monkeypatch):
+    from src.audit import logger
+    from src.models import AuditLog
+
+    app = _app()
+    batches = []
+    write_records = logger.write_records
+    monkeypatch.setattr(logger, "write_records", lambda rows: batches.append(len(rows)) or write_records(rows))
+    writer = logger.AuditWriter(app, batch_size=3, flush_interval=0.5)
+    for i in range(7):
+        writer.enqueue(_record(i))
+    writer.flush()  # what the atexit hook does on shutdown
+
+    assert batches == [3, 3, 1]
+    assert writer.stats()["written"] == 7 and writer.stats()["queue_depth"] == 0
+    with app.app_context():
+        assert AuditLog.query.count() == 7
+
+
+def test_writer_drops_records_when_the_queue_is_full(monkeypatch):
+    from src.audit import logger
+    from src.models import AuditLog
+
+    app = _app()
+    writer = logger.AuditWriter(app, queue_size=2, flush_interval=0.5)
+    with monkeypatch.context() as m:
+        m.setattr(writer, "_ensure_thread", lambda: None)  # a writer thread that fell behind
+        for i in range(3):
+            writer.enqueue(_record(i))  # never blocks the request
+    assert writer.stats()["dropped"] == 1
+
+    writer.enqueue(_record(3))  # space again once the thread drains the queue
+    writer.flush()
+    stats = writer.stats()
+    assert (stats["enqueued"], stats["written"], stats["dropped"]) == (3, 3, 1)
+    with app.app_context():
+        assert AuditLog.query.count() == 3
+
+
+def test_only_real_frontend_assets_skip_the_audit_trail(tmp_path, monkeypatch):
+    from src.audit.logger import init_audit, skip_audit
+    from src.models import AuditLog
+    from src.utils.frontend import FrontendManifest
+
+    (tmp_path / "index.html").write_text("<html></html>")
+    (tmp_path / "app.js").write_text("console.log(1);")
+    monkeypatch.chdir(tmp_path)  # the audit file log lands here
+    app = _app()
+    app.config.update(AUDIT_ASYNC=False, AUDIT_SKIP_ENDPOINTS=["metrics"])
+    init_audit(app)
+    frontend = FrontendManifest(str(tmp_path))
+
+    @app.route("/<path:path>")
+    def serve_frontend(path):
+        if path in frontend.assets:
+            skip_audit()
+        return frontend.response(path)
+
+    client = app.test_client()
+    assert client.get("/app.js").status_code == 200
+    assert client.get("/wp-login.php").status_code == 200  # SPA fallback to index.html
+    with app.app_context():
+        assert [log.route for log in AuditLog.query] == ["/wp-login.php"]
+
+
+def test_rollups_upsert_one_row_per_bucket_and_survive_a_retried_batch():
+    from extensions import db
+    from src.audit.rollups import apply_rollups, query_stats
+
+    app = _app()
+    records = [_record(i) for i in range(3)]
+    records[2]["created_at"] = datetime(2026, 1, 1, 13, 30)
+    with app.app_context():
+        apply_rollups(records[:1])
+        db.session.commit()
+        apply_rollups(records[1:])  # lands in the 12:00 row written above
+        db.session.commit()
+
+        apply_rollups(records)
+        db.session.rollback()  # a failed batch adds nothing...
+        apply_rollups(records[:1])  # ...so retrying it counts each record once
+        db.session.commit()
+
+        hourly = query_stats("hour", group_by=["route"])
+        assert [(row["bucket_start"], row["count"]) for row in hourly] == [
+            ("2026-01-01T12:00:00", 3), ("2026-01-01T13:00:00", 1)]
+        assert hourly[0]["route"] == "/dp/hist/<file_id>/<column_name>"  # per rule, not per path
+        assert [row["count"] for row in query_stats("day", group_by=[])] == [4]
+
+
+def test_prune_keeps_rows_at_the_cutoff_and_dry_run_deletes_nothing(tmp_path):
+    import gzip
+    from extensions import db
+    from src.audit.logger import write_records
+    from src.audit.retention import prune_audit_logs, register_cli
+    from src.models import AuditLog, AuditRollup
+
+    app = _app()
+    register_cli(app)
+    cutoff = datetime(2026, 1, 10)
+    with app.app_context():
+        records = [_record(i) for i in range(4)]
+        for record, age in zip(records, (timedelta(days=1), timedelta(seconds=1), timedelta(0), -timedelta(days=1))):
+            record["created_at"] = cutoff - age
+        write_records(records)
+        db.session.commit()
+
+        assert prune_audit_logs(cutoff, archive_dir=str(tmp_path), batch_size=1) == 2
+        kept = [log.created_at for log in AuditLog.query.order_by(AuditLog.id)]
+        assert kept == [cutoff, cutoff + timedelta(days=1)]
+        with gzip.open(tmp_path / "audit_logs_2026-01-09.ndjson.gz", "rt") as archived:
+            assert len(archived.readlines()) == 2
+        assert AuditRollup.query.filter_by(granularity="hour").count() == 4  # rollups keep the history
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["audit", "prune", "--days", "30", "--dry-run"])
+    assert "Would prune 2 audit log rows" in result.output
+    assert "Would prune 4 hourly rollups" in result.output
+    with app.app_context():
+        assert AuditLog.query.count() == 2 and AuditRollup.query.count() == 7
+
+    result = runner.invoke(args=["audit", "prune", "--days", "30"])
+    assert "Pruned 2 audit log rows older than 30 days" in result.output
+    with app.app_context():
+        assert AuditLog.query.count() == 0
+        assert AuditRollup.query.filter_by(granularity="hour").count() == 0
+        assert AuditRollup.query.filter_by(granularity="day").count() == 3
@@ -1,2 +1,132 @@
 def test_placeholder():
     assert True
+
+
+def test_claims_decoded_once_and_revocation_applies(monkeypatch):
+    from flask import Flask, jsonify
+    from flask_jwt_extended import create_access_token
+    from flask_jwt_extended.jwt_manager import JWTManager
+    from extensions import db, jwt
+    from src.auth.tokens import current_claims, revocation_list, token_required
+    from src.models import User
+
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", JWT_SECRET_KEY="test-secret-key-of-enough-length")
+    db.init_app(app)
+    jwt.init_app(app)
+
+    @app.get("/private")
+    @token_required()
+    def private():
+        return jsonify(sub=current_claims()["sub"])
+
+    decodes = []
+    original = JWTManager._decode_jwt_from_config
+    monkeypatch.setattr(JWTManager, "_decode_jwt_from_config",
+                        lambda self, *a, **k: decodes.append(1) or original(self, *a, **k))
+
+    with app.app_context():
+        db.create_all()
+        user = User(email="u@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        headers = {"Authorization": "Bearer " + create_access_token(identity=str(user_id))}
+    client = app.test_client()
+
+    def set_active(active):
+        with app.app_context():
+            db.session.get(User, user_id).is_active = active
+            db.session.commit()
+
+    assert client.get("/private", headers=headers).status_code == 200
+    assert len(decodes) == 1
+    assert client.get("/private").status_code == 401
+    assert len(decodes) == 1  # no header: nothing to decode
+
+    set_active(False)
+    assert client.get("/private", headers=headers).status_code == 401
+    set_active(True)
+    assert client.get("/private", headers=headers).status_code == 200
+
+    with app.test_request_context(headers=headers):
+        revocation_list.revoke(current_claims())
+    assert client.get("/private", headers=headers).status_code == 401
+
+
+def test_profile_cache_invalidated_on_commit():
+    from flask import Flask
+    from extensions import db
+    from src.auth.cache import get_profile, profile_cache
+    from src.models import Role, User
+
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://")
+    db.init_app(app)
+    profile_cache.clear()
+
+    with app.app_context():
+        db.create_all()
+        role = Role(name="user")
+        user = User(email="p@example.com", password_hash="x", role=role)
+        db.session.add(user)
+        db.session.commit()
+
+        assert get_profile(user.id)["email"] == "p@example.com"
+        misses = profile_cache.misses
+        assert get_profile(user.id)["role"] == "user"
+        assert profile_cache.misses == misses  # served from the cache
+
+        user.email = "q@example.com"
+        db.session.flush()
+        assert profile_cache.get(user.id) is not None  # not before the commit
+        db.session.rollback()
+        assert get_profile(user.id)["email"] == "p@example.com"
+
+        user.email = "q@example.com"
+        db.session.commit()
+        assert get_profile(user.id)["email"] == "q@example.com"
+
+        role.name = "member"  # a role change drops every cached profile
+        db.session.commit()
+        assert profile_cache.stats()["entries"] == 0
+        assert get_profile(user.id)["role"] == "member"
+
+
+def test_logout_revokes_only_the_callers_own_refresh_token():
+    from flask import Flask
+    from flask_jwt_extended import create_access_token, create_refresh_token, decode_token
+    from extensions import db, jwt
+    from src.auth.routes import auth_bp
+    from src.auth.tokens import revocation_list
+    from src.models import User
+
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", JWT_SECRET_KEY="test-secret-key-of-enough-length")
+    db.init_app(app)
+    jwt.init_app(app)
+    app.register_blueprint(auth_bp)
+
+    with app.app_context():
+        db.create_all()
+        alice, bob = User(email="a@example.com", password_hash="x"), User(email="b@example.com", password_hash="x")
+        db.session.add_all([alice, bob])
+        db.session.commit()
+        access = create_access_token(identity=str(alice.id))
+        refresh = create_refresh_token(identity=str(alice.id))
+        foreign = create_refresh_token(identity=str(bob.id))
+    client = app.test_client()
+    headers = {"Authorization": "Bearer " + access}
+
+    def revoked(token):
+        with app.app_context():
+            return revocation_list.is_revoked(decode_token(token, allow_expired=True))
+
+    for bad in (foreign, access, "not-a-token"):
+        assert client.post("/auth/logout", headers=headers, json={"refresh_token": bad}).status_code == 400
+    assert not revoked(access) and not revoked(foreign)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+
+    assert client.post("/auth/logout", headers=headers, json={"refresh_token": refresh}).status_code == 200
+    assert revoked(access) and revoked(refresh) and not revoked(foreign)
+    assert client.get("/auth/me", headers=headers).status_code == 401
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.dp.aggregates import (AggregateError, domains_to_find, exact_stats, find_domains, group_label_counts,
+                               measures_for, noisy_release, release_payload)
+from src.dp.mechanisms import label_counts
+
+
+def test_grouped_exact_stats_and_batched_noise():
+    df = pd.DataFrame({
+        "income": [10.0, 20.0, 1000.0, None, 5.0],
+        "dept": ["b", "a", "a", "b", None],
+    })
+    measures = measures_for(["count", "mean", "histogram"])
+    assert measures == ("count", "histogram", "sum")
+
+    stats = exact_stats(df, "income", measures, group_by="dept", bounds=(0, 100), bins=2, groups=["a", "b"])
+    assert stats["groups"] == ["a", "b", "(other)", "(missing)"]
+    assert stats["count"].tolist() == [2, 1, 0, 1]
+    assert stats["sum"].tolist() == [120.0, 10.0, 0.0, 5.0]  # 1000 clipped to 100
+    assert stats["histogram"].tolist() == [[1, 1], [1, 0], [0, 0], [1, 0]]
+
+    noisy = noisy_release(stats, measures, 1e6, bounds=(0, 100), rng=np.random.default_rng(0))
+    rows = release_payload(stats, noisy, ["count", "mean"], bounds=(0, 100))
+    assert [r["group"] for r in rows] == ["a", "b", "(other)", "(missing)"]
+    assert np.allclose([r["count"] for r in rows], [2, 1, 0, 1], atol=1e-3)
+    assert np.allclose([r["mean"] for r in rows], [60, 10, 0, 5], atol=1e-3)
+
+
+def test_group_and_category_labels_are_public_or_noisy():
+    # 2000 rows in two departments plus one row per email address
+    df = pd.DataFrame({
+        "income": [1000.0] * 2005,
+        "dept": ["HR", "R&D"] * 1000 + ["Ops"] * 5,
+        "email": [f"user{i}@example.com" for i in range(2005)],
+    })
+    measures = measures_for(["count", "histogram"])
+    found = domains_to_find(measures, "email", None, None, numeric=False)
+    assert found == ["groups", "categories"]
+    for seed in range(5):
+        counts = {"groups": group_label_counts(df, "email"), "categories": label_counts(df["dept"])}
+        labels, spent = find_domains(counts, found, 0.5, rng=np.random.default_rng(seed))
+        assert labels["groups"] == [] and labels["categories"] == ["HR", "R&D"]
+        assert spent == 0.1
+
+        stats = exact_stats(df, "dept", measures, group_by="email", **labels)
+        assert stats["groups"] == ["(other)", "(missing)"] and stats["count"].tolist() == [2005, 0]
+        assert stats["bins"] == ["HR", "R&D", "(other)"]
+        assert stats["histogram"][0].tolist() == [1000, 1000, 5]
+
+    assert domains_to_find(measures, "dept", ["HR"], ["HR", "R&D"], numeric=False) == []
+    with pytest.raises(AggregateError):
+        exact_stats(df, "dept", measures, group_by="email")  # group labels are never taken from the data
@@ -0,0 +1,109 @@
+import io
+import threading
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from src.dp import routes
+from src.dp.budget import BudgetAccountant, BudgetExceeded
+from src.models import db, DPResult, PrivacyBudget, PrivacyLedgerEntry
+
+
+def _app(**config):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", **config)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def test_charge_is_all_or_nothing_and_refundable():
+    app = _app()
+    accountant = BudgetAccountant(app, user_epsilon=1.0, dataset_epsilon=5.0, flush_interval=3600)
+    with app.app_context():
+        charge = accountant.charge(7, "h1", 0.75, operation="test")
+        with pytest.raises(BudgetExceeded) as e:
+            accountant.charge(7, "h1", 0.5)  # the user budget is short
+        assert e.value.scope == "user" and e.value.remaining == pytest.approx(0.25)
+        # Nothing was debited from the dataset by the refused charge
+        assert accountant.remaining(dataset_id="h1")["dataset"]["epsilon_spent"] == pytest.approx(0.75)
+
+        accountant.refund(charge)
+        assert accountant.remaining(7, "h1")["user"]["epsilon_remaining"] == pytest.approx(1.0)
+        accountant.charge(7, "h1", 1.0)
+
+
+def test_spend_is_written_behind_and_seen_by_other_processes():
+    app = _app()
+    first = BudgetAccountant(app, dataset_epsilon=2.0, flush_interval=3600)
+    other = BudgetAccountant(app, dataset_epsilon=2.0, flush_interval=3600)
+    with app.app_context():
+        charge = first.charge(None, "h1", 0.5, operation="dp.analyze", reference="f1")
+        assert PrivacyBudget.query.count() == 0  # nothing written before the flush
+        first.refund(charge)
+        first.charge(None, "h1", 1.5, operation="dp.analyze", reference="f2")
+        first.flush()
+
+        row = PrivacyBudget.query.filter_by(scope="dataset", key="h1").one()
+        assert row.epsilon_spent == pytest.approx(1.5)
+        ops = sorted(e.operation for e in PrivacyLedgerEntry.query)
+        assert ops == ["dp.analyze", "dp.analyze", "dp.analyze.refund"]
+        with pytest.raises(BudgetExceeded):
+            other.charge(None, "h1", 1.0)
+
+
+def test_reload_racing_a_flush_keeps_the_unflushed_spend(tmp_path):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'budget.db'}")
+    db.init_app(app)
+    accountant = BudgetAccountant(app, dataset_epsilon=5.0, flush_interval=3600, sync_interval=0)
+    with app.app_context():
+        db.create_all()
+        accountant.charge(None, "h1", 1.0)
+        accountant.flush()
+        accountant.charge(None, "h1", 0.5)  # pending, not yet in the database
+        accountant._expire()  # the next call reloads the balance
+
+        # A flush that lands between the reload's read and its merge
+        flusher = threading.Thread(target=accountant.flush)
+
+        def flush_after_read(conn, cursor, statement, *args):
+            if statement.startswith("SELECT") and flusher.ident is None:
+                flusher.start()
+                flusher.join(timeout=0.3)
+
+        event.listen(db.engine, "after_cursor_execute", flush_after_read)
+        spent = accountant.remaining(dataset_id="h1")["dataset"]["epsilon_spent"]
+        event.remove(db.engine, "after_cursor_execute", flush_after_read)
+        db.session.remove()
+        flusher.join()
+        assert spent == pytest.approx(1.5)
+        assert PrivacyBudget.query.filter_by(key="h1").one().epsilon_spent == pytest.approx(1.5)
+
+
+def _analyze(client):
+    data = {"file": (io.BytesIO(b"Age\n31\n45\n27\n"), "people.csv"), "columns": "Age", "epsilon": "1.0"}
+    return client.post("/dp/analyze", data=data, content_type="multipart/form-data")
+
+
+def test_analyze_refunds_only_after_cleanup_and_refuses_over_budget(dp_app, monkeypatch):
+    app, outputs = dp_app
+    client = app.test_client()
+    first = _analyze(client)
+    assert first.status_code == 200
+
+    # A failure after the output was written: the output goes, then the refund
+    def fail(*args, **kwargs):
+        raise RuntimeError("database is gone")
+
+    with monkeypatch.context() as m:
+        m.setattr(routes, "record_finished", fail)
+        assert _analyze(client).status_code == 500
+    assert [path for _, _, path, _ in outputs.entries() if first.json["file_id"] not in path] == []
+
+    assert _analyze(client).status_code == 200
+    assert _analyze(client).status_code == 403  # 3 x 1.0 > 2.5
+    with app.app_context():
+        dataset_id = DPResult.query.filter_by(file_id=first.json["file_id"]).one().content_hash
+        budget = app.extensions["privacy_budget"].remaining(dataset_id=dataset_id)
+    assert budget["dataset"]["epsilon_spent"] == pytest.approx(2.0)
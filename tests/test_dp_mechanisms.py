@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.dp.mechanisms import privatize_numeric
+
+
+def test_numeric_keeps_nan_and_index():
+    s = pd.Series([1.0, np.nan, 3.0, None], index=[10, 11, 12, 13], name="Age")
+    out = privatize_numeric(s, "laplace", 1.0, 1e-5)
+    assert out.name == "Age"
+    assert list(out.index) == [10, 11, 12, 13]
+    assert out.isna().tolist() == [False, True, False, True]
+
+
+@pytest.mark.parametrize("mechanism,epsilon,expected_std", [
+    ("laplace", 2.0, np.sqrt(2) * 0.5),
+    ("gaussian", 0.5, np.sqrt(2 * np.log(1.25 / 1e-5)) / 0.5),
+])
+def test_numeric_noise_scale_matches_diffprivlib(mechanism, epsilon, expected_std):
+    s = pd.Series(np.zeros(200_000))
+    out = privatize_numeric(s, mechanism, epsilon, 1e-5, rng=np.random.default_rng(1))
+    assert abs(out.mean()) < 0.05 * expected_std
+    assert out.std() == pytest.approx(expected_std, rel=0.02)
+
+
+def test_gaussian_rejects_large_epsilon_like_diffprivlib():
+    with pytest.raises(ValueError):
+        privatize_numeric(pd.Series([1.0]), "gaussian", 2.0, 1e-5)
+
+
+def test_exponential_select_matches_diffprivlib_distribution():
+    from diffprivlib.mechanisms import Exponential
+    from src.dp.mechanisms import exponential_select
+
+    counts = np.array([50.0, 30.0, 20.0, 1.0])
+    n = 200_000
+    for x in range(len(counts)):
+        utility = [counts.max() if c == x else counts[c] for c in range(len(counts))]
+        expected = np.diff(Exponential(epsilon=0.1, sensitivity=1, utility=utility)._probabilities, prepend=0)
+        picked = exponential_select(np.full(n, x), counts, 0.1, rng=np.random.default_rng(x))
+        observed = np.bincount(picked, minlength=len(counts)) / n
+        assert np.allclose(observed, expected, atol=0.005)
+
+
+def test_categorical_keeps_missing_and_known_categories():
+    from src.dp.mechanisms import privatize_categorical
+
+    s = pd.Series(["a", None, "b", "a", np.nan], name="Dept")
+    out = privatize_categorical(s, 1.0)
+    assert out.isna().tolist() == [False, True, False, False, True]
+    assert set(out.dropna()) <= {"a", "b"}
@@ -0,0 +1,284 @@
+import time
+import pandas as pd
+import pytest
+from src.dp import pipeline
+from src.dp.storage import ArtifactJanitor, ArtifactStore
+
+
+@pytest.fixture
+def folders(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "output_store", ArtifactStore(str(tmp_path)))
+    monkeypatch.setattr(pipeline, "plot_store", ArtifactStore(str(tmp_path)))
+    return tmp_path
+
+
+def test_streaming_matches_shape_and_passes_other_columns_through(folders):
+    df = pd.DataFrame({
+        "Age": range(1, 251),
+        "Dept": ["Sales", "R&D", "HR", None, "R&D"] * 50,
+        "Id": [f"{i:04d}" for i in range(250)],
+    })
+    src = folders / "in.csv"
+    df.to_csv(src, index=False)
+
+    result = pipeline.run_analysis(str(src), "f1", scope="single_column", columns=["Age", "Dept"],
+                                   mechanism="laplace", stream=True, chunksize=40)
+    out = pd.read_csv(pipeline.output_store.find("f1", "privatized_f1.csv"), dtype={"Id": str})
+
+    # Laplace cannot take the text column: it fails whole and is written empty
+    assert result["columns_processed"] == ["Age"]
+    assert list(result["columns_failed"]) == ["Dept"]
+    assert len(out) == len(df)
+    assert out["Id"].tolist() == df["Id"].tolist()
+    assert out["Dept"].isna().all()
+    assert not out["Age"].equals(df["Age"].astype(float))
+
+
+def test_streaming_auto_detects_column_types_over_whole_file(folders):
+    df = pd.DataFrame({"Age": range(100), "Dept": ["Sales", "R&D"] * 50})
+    src = folders / "in.csv"
+    df.to_csv(src, index=False)
+
+    pipeline.run_analysis(str(src), "f2", scope="whole_file", stream=True, chunksize=7)
+    out = pd.read_csv(pipeline.output_store.find("f2", "privatized_f2.csv"))
+
+    assert set(out["Dept"]) <= {"Sales", "R&D"}
+    assert out["Age"].dtype == float
+
+
+def test_streaming_applies_the_whole_file_plan_to_every_chunk(folders):
+    # 90% numbers overall, but the last chunk holds only "unknown"
+    df = pd.DataFrame({"Income": [str(3000 + i) for i in range(90)] + ["unknown"] * 10})
+    src = folders / "in.csv"
+    df.to_csv(src, index=False)
+
+    result = pipeline.run_analysis(str(src), "f4", scope="whole_file", stream=True, chunksize=10)
+    out = pd.read_csv(pipeline.output_store.find("f4", "privatized_f4.csv"))
+
+    assert result["columns_processed"] == ["Income"] and result["columns_failed"] == {}
+    assert out["Income"].dtype == float
+    assert out["Income"][:90].notna().all() and out["Income"][90:].isna().all()
+
+
+def test_streaming_is_refused_for_non_csv_input(folders):
+    src = folders / "in.parquet"
+    pd.DataFrame({"Age": range(10)}).to_parquet(src)
+
+    with pytest.raises(pipeline.AnalysisError, match="only supported for CSV"):
+        pipeline.run_analysis(str(src), "f3", stream=True, input_format="parquet")
+
+
+def test_csv_to_parquet_and_parquet_to_arrow_round_trip(folders):
+    from src.dp.formats import read_table
+
+    df = pd.DataFrame({"Age": range(20), "Dept": ["Sales", "R&D"] * 10, "Id": [f"{i:03d}" for i in range(20)]})
+    src = folders / "in.csv"
+    df.to_csv(src, index=False)
+    pipeline.run_analysis(str(src), "p1", scope="single_column", columns=["Age"], output_format="parquet")
+    parquet = pipeline.output_store.find("p1", "privatized_p1.parquet")
+    first = read_table(parquet, "parquet")
+    assert first.column_names == ["Age", "Dept", "Id"] and first.num_rows == 20
+
+    result = pipeline.run_analysis(parquet, "p2", scope="single_column", columns=["Dept"],
+                                   mechanism="exponential", input_format="parquet", output_format="arrow")
+    second = read_table(pipeline.output_store.find("p2", "privatized_p2.arrow"), "arrow").to_pandas()
+    assert result["columns_processed"] == ["Dept"]
+    assert second["Age"].tolist() == first.column("Age").to_pylist()  # passed through untouched
+    assert second["Id"].tolist() == first.column("Id").to_pylist()
+    assert set(second["Dept"]) <= {"Sales", "R&D"}
+
+
+def test_streamed_mixed_column_writes_parquet(folders):
+    from src.dp.formats import read_table
+
+    df = pd.DataFrame({"Income": [str(3000 + i) for i in range(45)] + ["unknown"] * 5})
+    src = folders / "in.csv"
+    df.to_csv(src, index=False)
+
+    result = pipeline.run_analysis(str(src), "p3", scope="whole_file", stream=True, chunksize=5,
+                                   output_format="parquet")
+    out = read_table(pipeline.output_store.find("p3", "privatized_p3.parquet"), "parquet")
+
+    assert result["columns_processed"] == ["Income"]
+    assert str(out.schema.field("Income").type) == "double"
+    assert out.column("Income").null_count == 5
+
+
+def test_dataset_cache_evicts_least_recently_used(tmp_path):
+    import os
+    from src.dp.datasets import DatasetCache
+
+    cache = DatasetCache(str(tmp_path), max_bytes=10**9)
+    df = pd.DataFrame({"a": range(1000)})
+    for i, key in enumerate(["old", "mid", "new"]):
+        cache.put(key, df)
+        os.utime(tmp_path / f"{key}.feather", (i, i))
+    cache.get("old")  # touching makes "mid" the least recently used
+
+    cache.max_bytes = 2 * os.path.getsize(tmp_path / "new.feather")
+    cache.evict()
+
+    assert cache.get("mid") is None
+    assert cache.get("old").equals(df)
+    assert cache.get("new") is not None
+
+
+def test_janitor_expires_by_ttl_then_evicts_lru(tmp_path):
+    import os
+    uploads = ArtifactStore(str(tmp_path / "uploads"), ttl=100)
+    outputs = ArtifactStore(str(tmp_path / "outputs"))
+    paths = {}
+    for key, store in [("stale", uploads), ("a", outputs), ("b", outputs), ("c", outputs)]:
+        paths[key] = store.path(key, f"{key}.bin")
+        with open(paths[key], "wb") as f:
+            f.write(b"x" * 100)
+    now = 10_000
+    for i, key in enumerate(["stale", "a", "b", "c"]):
+        os.utime(paths[key], (now - 1000 + i, now - 1000 + i))
+    outputs.find("a", "a.bin")  # read now: "b" becomes least recently used
+
+    janitor = ArtifactJanitor([uploads, outputs], max_bytes=200, min_age=0)
+    stats = janitor.sweep(now=now + 1)
+
+    assert (stats["expired"], stats["evicted"]) == (1, 1)
+    assert os.path.dirname(paths["a"]) != outputs.folder  # sharded
+    assert [key for key in paths if os.path.exists(paths[key])] == ["a", "c"]
+
+
+def test_release_cache_reuses_published_columns(folders):
+    from flask import Flask
+    from src.models import db
+    from src.dp.releases import ReleaseCache
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    df = pd.DataFrame({"Age": range(60), "Dept": ["Sales", "R&D", None] * 20})
+    src = folders / "in.csv"
+    df.to_csv(src, index=False)
+    releases = ReleaseCache(str(folders / "releases"), min_age=0)
+
+    with app.app_context():
+        db.create_all()
+        kwargs = dict(scope="whole_file", content_hash="h1", releases=releases)
+        first = pipeline.run_analysis(str(src), "r1", **kwargs)
+        second = pipeline.run_analysis(str(src), "r2", **kwargs)
+        streamed = pipeline.run_analysis(str(src), "r3", stream=True, chunksize=7, **kwargs)
+        outputs = [pd.read_csv(pipeline.output_store.find(f, f"privatized_{f}.csv")) for f in ("r1", "r2", "r3")]
+
+        assert first["columns_reused"] == []
+        assert second["columns_reused"] == streamed["columns_reused"] == ["Age", "Dept"]
+        assert outputs[0].equals(outputs[1]) and outputs[0].equals(outputs[2])
+
+        # An uncharged column that is not cached is never sampled
+        with pytest.raises(pipeline.ReleaseBusy):
+            pipeline.run_analysis(str(src), "r4", scope="whole_file", content_hash="h2", releases=releases,
+                                  charged_columns=["Age"])
+
+        # A column the mechanism rejected is never cached, streamed or not
+        for stream in (False, True):
+            for file_id in (f"g{stream}1", f"g{stream}2"):
+                failed = pipeline.run_analysis(str(src), file_id, scope="single_column", columns=["Age"],
+                                               mechanism="gaussian", epsilon=2.0, content_hash="h1",
+                                               releases=releases, stream=stream)
+                assert list(failed["columns_failed"]) == ["Age"] and failed["columns_reused"] == []
+        assert releases.stats()["releases"] == 2
+
+        releases.max_bytes = 1
+        assert releases.evict() == 2
+        assert releases.stats()["releases"] == 0
+
+
+@pytest.fixture
+def job_app(folders, monkeypatch):
+    import json
+    from flask import Flask
+    from src.dp import jobs
+    from src.dp.budget import BudgetAccountant
+    from src.models import db
+
+    monkeypatch.setattr(jobs, "output_store", pipeline.output_store)
+    monkeypatch.setattr(jobs, "plot_store", pipeline.plot_store)
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", DP_JOB_WORKERS=1)
+    db.init_app(app)
+    app.extensions["privacy_budget"] = BudgetAccountant(app, flush_interval=3600)
+    src = folders / "in.csv"
+    pd.DataFrame({"Age": range(30), "Dept": ["Sales", "R&D", "Ops"] * 10}).to_csv(src, index=False)
+
+    def run(file_id, columns, scope="single_column", output_format="csv"):
+        params = {"mechanism": "laplace", "epsilon": 1.0, "delta": 1e-5, "scope": scope, "columns": columns,
+                  "content_hash": "h1", "input_format": "csv", "output_format": output_format}
+        with app.app_context():
+            charge = app.extensions["privacy_budget"].charge(None, "h1", 1.0, operation="dp.analyze")
+            jobs.submit_job(app, file_id, str(src), params, charge=charge)
+        for _ in range(200):
+            with app.app_context():
+                job = jobs.get_job(file_id)
+                state = {"status": job.status, "done": job.progress_done, "total": job.progress_total,
+                         "result": json.loads(job.result) if job.result else None, "error": job.error}
+            if state["status"] in ("finished", "failed"):
+                return state
+            time.sleep(0.05)
+        raise AssertionError(f"job {file_id} did not finish")
+
+    with app.app_context():
+        db.create_all()
+    return app, run
+
+
+def _spent(app):
+    with app.app_context():
+        return app.extensions["privacy_budget"].remaining(dataset_id="h1")["dataset"]["epsilon_spent"]
+
+
+def test_job_reports_progress_and_result(job_app):
+    app, run = job_app
+    state = run("j1", [], scope="whole_file")
+    assert state["status"] == "finished" and state["error"] is None
+    assert state["done"] == state["total"] == 2
+    assert state["result"]["columns_processed"] == ["Age", "Dept"]
+    assert pipeline.output_store.find("j1", "privatized_j1.csv")
+    assert _spent(app) == pytest.approx(1.0)
+
+
+def test_failed_job_is_refunded_after_its_output_is_removed(job_app, monkeypatch):
+    from src.dp import jobs
+
+    app, run = job_app
+    state = run("j2", ["Age"], output_format="xlsx")
+    assert state["status"] == "failed" and "xlsx" in state["error"]
+    assert _spent(app) == pytest.approx(0.0)
+
+    # Failing once the output exists: it is deleted before the refund
+    def fail(result):
+        raise RuntimeError("metrics backend down")
+
+    monkeypatch.setattr(jobs, "record_analysis", fail)
+    state = run("j3", ["Age"])
+    assert state["status"] == "failed" and state["error"] == "metrics backend down"
+    assert pipeline.output_store.find("j3", "privatized_j3.csv") is None
+    assert _spent(app) == pytest.approx(0.0)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_process_columns_keeps_order_and_isolates_failures(workers):
+    df = pd.DataFrame({"Age": [31, 45, 27, 52], "Empty": [None] * 4, "Dept": ["HR", "R&D", "HR", "Ops"]})
+    try:
+        results = pipeline.process_columns(df, ["Dept", "Empty", "Age"], "laplace", 1.0, 1e-5, auto=True,
+                                           workers=workers)
+    finally:
+        pipeline.discard_column_pool()
+    assert [r[0] for r in results] == ["Dept", "Empty", "Age"]
+    (_, dept, _, dept_error), (_, empty, _, empty_error), (_, age, _, age_error) = results
+    assert dept_error is None and set(dept) <= {"HR", "R&D", "Ops"}
+    assert age_error is None and len(age) == 4
+    assert empty is None and "Empty" in empty_error
+
+
+def test_mechanism_errors_fail_the_column_instead_of_passing_it_through():
+    df = pd.DataFrame({"Salary": [3000.0, 4000.0], "Dept": ["HR", "R&D"]})
+    with pytest.raises(pipeline.PrivatizationError):
+        pipeline.privatize_column_series(df["Salary"], "gaussian", 2.0, 1e-5)  # gaussian needs epsilon <= 1
+    with pytest.raises(pipeline.PrivatizationError):
+        pipeline.privatize_column_series(df["Dept"], "laplace", 1.0, 1e-5)
@@ -0,0 +1,63 @@
+import io
+from src.dp import pipeline
+from src.models import db, DPResult
+
+
+def _analyze(client, **form):
+    data = {"file": (io.BytesIO(b"Age\n31\n45\n27\n"), "people.csv"), "columns": "Age", "epsilon": "0.5", **form}
+    return client.post("/dp/analyze", data=data, content_type="multipart/form-data")
+
+
+def test_missing_artifacts_are_gone_only_for_finished_jobs(dp_app):
+    app, outputs = dp_app
+    client = app.test_client()
+    finished = _analyze(client).json["file_id"]
+    outputs.discard(finished)  # what the janitor does once the TTL is up
+    pipeline.plot_store.discard(finished)
+    with app.app_context():
+        for file_id, status in (("q1", "queued"), ("r1", "running"), ("f1", "failed")):
+            db.session.add(DPResult(file_id=file_id, columns="[]", mechanism="laplace", epsilon=0.5,
+                                    status=status))
+        db.session.commit()
+
+    assert client.get(f"/dp/download/{finished}").status_code == 410
+    assert client.get(f"/dp/hist/{finished}/Age").status_code == 410
+    for file_id in ("q1", "r1"):
+        resp = client.get(f"/dp/download/{file_id}")
+        assert resp.status_code == 202 and resp.headers["Location"].endswith(f"/dp/jobs/{file_id}")
+        assert client.get(f"/dp/plot/{file_id}/Age").status_code == 202
+    assert client.get("/dp/download/f1").status_code == 404  # failed: never written
+    assert client.get("/dp/download/unknown").status_code == 404
+
+
+def test_plots_are_drawn_on_first_request_from_the_stored_histograms(dp_app, monkeypatch):
+    from src.dp import plots
+
+    app, _ = dp_app
+    client = app.test_client()
+    data = {"file": (io.BytesIO(b"Age,Dept\n31,HR\n45,HR\n27,Ops\n"), "people.csv"),
+            "columns": ["Age", "Dept"], "scope": "whole_file", "epsilon": "0.5"}
+    result = client.post("/dp/analyze", data=data, content_type="multipart/form-data").json
+    file_id = result["file_id"]
+    assert result["histograms"]["Age"] == f"/dp/hist/{file_id}/Age"
+    assert pipeline.plot_store.find(file_id, f"{file_id}_Age.png") is None  # analyze draws nothing
+
+    age = client.get(result["histograms"]["Age"]).json
+    assert age["file_id"] == file_id and age["column"] == "Age" and age["kind"] == "numeric"
+    assert len(age["edges"]) == plots.HIST_BINS + 1 and sum(age["original"]) == 3
+    assert len(age["privatized"]) == plots.HIST_BINS
+    dept = client.get(result["histograms"]["Dept"]).json
+    assert dept["kind"] == "categorical" and set(dept["categories"]) >= {"HR", "Ops"}
+    assert len(dept["original"]) == len(dept["privatized"]) == len(dept["categories"])
+
+    rendered = []
+    render = plots.render_histogram
+    monkeypatch.setattr(plots, "render_histogram", lambda summary, column: rendered.append(column) or
+                        render(summary, column))
+    for _ in range(2):
+        resp = client.get(f"/dp/plot/{file_id}/Age")
+        assert resp.status_code == 200 and resp.mimetype == "image/png"
+        assert resp.data.startswith(b"\x89PNG")
+    assert rendered == ["Age"]  # the second request is served from the cached PNG
+    assert client.get(f"/dp/plot/{file_id}/Salary").status_code == 404
+    assert client.get(f"/dp/hist/{file_id}/Salary").status_code == 404
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.dp.synthesis import OTHER_CATEGORY, SynthesisError, default_pairs, fit_marginals, sample_rows
+
+
+def test_sampled_rows_keep_two_way_relationships():
+    rng = np.random.default_rng(0)
+    dept = rng.choice(["HR", "R&D", "Sales"], 5000, p=[0.2, 0.5, 0.3])
+    income = np.where(dept == "R&D", 8000.0, 3000.0) + rng.normal(0, 300, 5000)
+    age = rng.integers(18, 65, 5000).astype(float)
+    age[:50] = np.nan
+    # integer output follows the dtype (nullable Int64 here), never the values
+    df = pd.DataFrame({"Dept": dept, "Income": income, "Age": pd.Series(age).astype("Int64")})
+
+    columns = ["Dept", "Income", "Age"]
+    model = fit_marginals(df, columns, default_pairs(columns), epsilon=1e4, rng=rng)
+    out = sample_rows(model, 20000, rng)
+
+    assert model["pairs"] == [["Dept", "Income"], ["Income", "Age"]]
+    assert abs(model["rows"] - 5000) <= 1
+    assert list(out.columns) == columns and len(out) == 20000
+    means = out.groupby("Dept")["Income"].mean()
+    assert means["R&D"] > 7000 and means["HR"] < 4000
+    assert abs((out["Dept"] == "R&D").mean() - 0.5) < 0.02
+    assert 0 < out["Age"].isna().mean() < 0.03
+    assert str(out["Age"].dtype) == "Int64"
+
+
+def test_pairs_must_form_a_forest():
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"], "c": ["p", "q"]})
+    with pytest.raises(SynthesisError):
+        fit_marginals(df, ["a", "b", "c"], [["a", "c"], ["b", "c"]], 1.0)
+    with pytest.raises(SynthesisError):
+        fit_marginals(df, ["a", "b"], [["a", "b"], ["b", "a"]], 1.0)
+
+
+def test_domain_never_reveals_outliers_or_rare_labels():
+    # One extreme income and one unique name among 20000 rows
+    df = pd.DataFrame({"Income": [3000.0] * 19999 + [987654.0], "Name": ["Staff"] * 19999 + ["Jane Q. Doe"]})
+    for seed in range(5):
+        rng = np.random.default_rng(seed)
+        model = fit_marginals(df, ["Income", "Name"], [], epsilon=0.1, rng=rng)
+        income, name = model["specs"]["Income"], model["specs"]["Name"]
+        assert income["domain"] == name["domain"] == "noisy"
+        assert max(income["edges"]) < 987654 and 3000 < max(income["edges"])
+        assert name["labels"] == ["Staff", OTHER_CATEGORY]
+        out = sample_rows(model, 1000, rng)
+        assert out["Income"].max() < 987654 and "Jane Q. Doe" not in set(out["Name"])
+    assert model["domain_epsilon"] == pytest.approx(0.02) and model["delta"] > 0
+
+    # Public domains are used as given and cost no epsilon
+    model = fit_marginals(df, ["Income", "Name"], [], epsilon=0.1, bounds={"Income": [0, 10000]},
+                          categories={"Name": ["Staff"]}, rng=np.random.default_rng(0))
+    assert model["specs"]["Income"]["edges"][0] == 0 and model["specs"]["Income"]["edges"][-1] == 10000
+    assert model["domain_epsilon"] == 0 and model["delta"] == 0
+    with pytest.raises(SynthesisError):
+        fit_marginals(df, ["Income"], [], 1.0, bounds={"Income": [5, 5]})
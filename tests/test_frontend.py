@@ -0,0 +1,28 @@
+import gzip
+from flask import Flask
+from src.utils.frontend import IMMUTABLE, FrontendManifest
+
+
+def test_manifest_serves_compressed_immutable_assets(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_text("<html></html>")
+    js = "console.log('hello');\n" * 100
+    (tmp_path / "assets" / "index-Cs1cYeNC.js").write_text(js)
+    manifest = FrontendManifest(str(tmp_path))
+    app = Flask(__name__)
+
+    with app.test_request_context("/assets/index-Cs1cYeNC.js", headers={"Accept-Encoding": "gzip"}):
+        resp = manifest.response("assets/index-Cs1cYeNC.js")
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert resp.headers["Cache-Control"] == IMMUTABLE
+        assert gzip.decompress(resp.get_data()).decode() == js
+        etag = resp.get_etag()[0]
+
+    with app.test_request_context("/assets/index-Cs1cYeNC.js", headers={"Accept-Encoding": "gzip",
+                                                                     "If-None-Match": f'"{etag}"'}):
+        assert manifest.response("assets/index-Cs1cYeNC.js").status_code == 304
+
+    with app.test_request_context("/some/route"):
+        resp = manifest.response("some/route")
+        assert resp.get_data() == b"<html></html>"
+        assert resp.headers["Cache-Control"] == "no-cache"
@@ -0,0 +1,46 @@
+from flask import Flask
+from src.utils.metrics import Histogram, server_timing
+from src.utils.timing import stage, stages
+
+
+def test_histogram_render_is_cumulative():
+    h = Histogram("t_seconds", "test", labels=("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        h.observe(value, route="/x")
+    lines = h.render()
+    assert 't_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{route="/x",le="1"} 2' in lines
+    assert 't_seconds_bucket{route="/x",le="+Inf"} 3' in lines
+    assert 't_seconds_count{route="/x"} 3' in lines
+
+
+def test_stages_accumulate_per_app_context():
+    with stage("outside"):
+        pass  # no app context: not recorded, no error
+    with Flask(__name__).app_context():
+        with stage("parse"):
+            pass
+        with stage("parse"):
+            pass
+        assert list(stages()) == ["parse"]
+        assert server_timing({"parse": 0.0123}, 0.05) == "parse;dur=12.3, total;dur=50.0"
+
+
+def test_metrics_endpoint_gated_by_config():
+    from flask_sqlalchemy import SQLAlchemy
+    from src.utils.metrics import init_metrics
+
+    def client(**config):
+        app = Flask(__name__)
+        app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", **config)
+        init_metrics(app, SQLAlchemy(app))
+        return app.test_client()
+
+    assert client().get("/metrics").status_code == 404  # off by default
+    assert client(METRICS_ENABLED=True).get("/metrics").status_code == 200
+
+    guarded = client(METRICS_ENABLED=True, METRICS_TOKEN="scrape-secret")
+    assert guarded.get("/metrics").status_code == 401
+    assert guarded.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    resp = guarded.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert resp.status_code == 200 and b"# TYPE" in resp.data
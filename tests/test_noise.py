@@ -0,0 +1,26 @@
+import numpy as np
+from src.utils import noise
+
+
+def test_scalar_and_array_draws():
+    assert isinstance(noise.laplace(scale=2.0), float)
+    assert isinstance(noise.geometric(scale=2.0), int)
+    # crosses pool refills and the direct-read path for large draws
+    for size in (1, noise.POOL_WORDS - 1, 3, noise.POOL_WORDS * 2):
+        u = noise.uniform(size)
+        assert u.shape == (size,) and (u >= 0).all() and (u < 1).all()
+
+
+def test_sampler_variances():
+    n = 400_000
+    assert abs(noise.laplace(n, 2.0).var() / (2 * 2.0**2) - 1) < 0.05
+    assert abs(noise.gaussian(n, 3.0).var() / 3.0**2 - 1) < 0.05
+    # two-sided geometric with alpha = exp(-1/scale): var = 2 alpha / (1 - alpha)^2
+    alpha = np.exp(-1 / 2.0)
+    g = noise.geometric(n, 2.0)
+    assert g.dtype == np.int64
+    assert abs(g.var() / (2 * alpha / (1 - alpha) ** 2) - 1) < 0.05
+    scalars = np.array([noise.geometric(scale=2.0) for _ in range(100_000)])
+    assert abs(scalars.var() / (2 * alpha / (1 - alpha) ** 2) - 1) < 0.1
+    scalars = np.array([noise.laplace(scale=2.0) for _ in range(100_000)])
+    assert abs(scalars.var() / (2 * 2.0**2) - 1) < 0.1
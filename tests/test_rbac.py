@@ -0,0 +1,81 @@
+def _app():
+    from flask import Flask, jsonify
+    from extensions import db, jwt
+    from src.rbac.decorators import permission_required
+
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", JWT_SECRET_KEY="test-secret-key-of-enough-length")
+    db.init_app(app)
+    jwt.init_app(app)
+
+    @app.get("/audit")
+    @permission_required("view_audit")
+    def audit():
+        return jsonify(ok=True)
+
+    return app
+
+
+def test_permission_bits_follow_code_rank_not_id():
+    from extensions import db
+    from src.models import Permission, Role
+    from src.rbac.permissions import permission_map
+
+    app = _app()
+    with app.app_context():
+        db.create_all()
+        # Sparse ids must not widen the mask
+        view = Permission(id=900, code="view_audit")
+        manage = Permission(id=40, code="manage_users")
+        db.session.add_all([view, manage, Role(name="admin", permissions=[view, manage]),
+                            Role(name="user", permissions=[view])])
+        db.session.commit()
+
+        assert permission_map.mask("admin") == 0b11
+        assert permission_map.mask("user") == 0b10  # "manage_users" < "view_audit"
+        assert permission_map.permissions("user") == {"view_audit"}
+        assert permission_map.mask_has(0b10, "view_audit")
+        assert not permission_map.mask_has(0b10, "manage_users")
+        assert not permission_map.mask_has(0b11, "unknown")
+
+        signature = permission_map.signature()
+        db.session.add(Permission(code="export"))
+        db.session.commit()  # invalidates the map in this process
+        assert permission_map.mask("user") == 0b100
+        assert permission_map.signature() != signature
+
+
+def test_permission_required_uses_mask_or_role():
+    from flask_jwt_extended import create_access_token
+    from extensions import db
+    from src.models import Permission, Role
+    from src.rbac.permissions import permission_map
+
+    app = _app()
+    with app.app_context():
+        db.create_all()
+        view = Permission(code="view_audit")
+        db.session.add_all([view, Permission(code="manage_users"),
+                            Role(name="auditor", permissions=[view]), Role(name="user")])
+        db.session.commit()
+
+        def headers(role, **claims):
+            token = create_access_token(identity="1", additional_claims={"role": role, **claims})
+            return {"Authorization": "Bearer " + token}
+
+        auditor, user = headers("auditor"), headers("user")
+        masked = headers("user", perms=permission_map.mask("auditor"), perms_sig=permission_map.signature())
+        stale = headers("auditor", perms=permission_map.mask("auditor"), perms_sig="0" * 12)
+    client = app.test_client()
+
+    assert client.get("/audit").status_code == 401
+    assert client.get("/audit", headers=auditor).status_code == 200
+    assert client.get("/audit", headers=user).status_code == 403
+    assert client.get("/audit", headers=masked).status_code == 200  # the mask is authoritative
+    assert client.get("/audit", headers=stale).status_code == 200  # other layout: role lookup
+
+    with app.app_context():
+        role = Role.query.filter_by(name="user").one()
+        role.permissions.append(Permission.query.filter_by(code="view_audit").one())
+        db.session.commit()
+    assert client.get("/audit", headers=user).status_code == 200
@@ -0,0 +1,23 @@
+from src.utils import security
+
+
+def test_verify_and_update_rehashes_outdated_cost():
+    security.configure_hashing(rounds=4, workers=0)
+    old = security.hash_password("pw")
+    assert old.startswith("$2b$04$")
+
+    security.configure_hashing(rounds=5, workers=0)
+    ok, new_hash = security.verify_and_update_password("pw", old)
+    assert ok and new_hash.startswith("$2b$05$")
+    assert security.verify_and_update_password("pw", new_hash) == (True, None)
+    assert security.verify_and_update_password("nope", new_hash) == (False, None)
+
+
+def test_pool_matches_inline():
+    security.configure_hashing(rounds=4, workers=1)
+    try:
+        hashed = security.hash_password("pw")
+        assert security.verify_password("pw", hashed)
+        assert not security.verify_password("other", hashed)
+    finally:
+        security.configure_hashing(rounds=4, workers=0)
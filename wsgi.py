@@ -1,2 +1,12 @@
 from app import app as application
-# For production WSGI servers like gunicorn: `gunicorn wsgi:application`
+# For production WSGI servers like gunicorn: `gunicorn -c gunicorn.conf.py wsgi:application`
+
+
+def warmup():
+    # Load the DP stack ahead of the first /dp request: pandas, pyarrow,
+    # diffprivlib (scikit-learn, scipy) and matplotlib with its font cache.
+    # Run in the gunicorn master with preload_app so all workers share it.
+    from src.dp import aggregates, pipeline, plots, synthesis  # noqa: F401
+    from src.utils import dp  # noqa: F401
+    from matplotlib.figure import Figure
+    Figure().subplots()